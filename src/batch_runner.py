@@ -0,0 +1,136 @@
+import argparse
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from bytecode_vm import run_program
+from front_end import strip_source
+from output import Output
+from program_cache import interpret_cached
+from simple_interpreter import SimpleInterpreter
+
+# Настройки рабочего процесса (задаются один раз в _init_worker)
+_worker_settings = {}
+
+
+def collect_files(path):
+    """
+    Список файлов .code для пакетного запуска
+    path - каталог (файлы .code ищутся рекурсивно) или манифест:
+    текстовый файл с путями по одному на строку (# - комментарий),
+    относительные пути считаются от каталога манифеста
+    """
+    if os.path.isdir(path):
+        files = []
+        for root, _, names in os.walk(path):
+            files.extend(os.path.join(root, name) for name in names if name.endswith(".code"))
+        return sorted(files)
+
+    base_dir = os.path.dirname(os.path.abspath(path))
+    files = []
+    with open(path, "r") as manifest:
+        for line in manifest:
+            line = line.split('#', 1)[0].strip()
+            if line:
+                files.append(line if os.path.isabs(line) else os.path.join(base_dir, line))
+    return files
+
+
+def _init_worker(engine, verbosity, cache, optimize=True):
+    """
+    Инициализация рабочего процесса: модули интерпретатора уже импортированы,
+    кэш скомпилированных выражений живет в процессе между программами
+    """
+    _worker_settings.update(engine=engine, verbosity=verbosity, cache=cache, optimize=optimize)
+
+
+def run_file(file_name):
+    """
+    Выполняет одну программу в рабочем процессе
+    Возвращает {'file', 'status', 'output', 'errors', 'seconds'}
+    status: 'ok', 'error' (программа сообщила об ошибках) или 'failed' (не удалось запустить)
+    """
+    start = time.perf_counter()
+    stream = io.StringIO()
+    output = Output(_worker_settings.get('verbosity', 'program'), stream=stream)
+
+    try:
+        with open(file_name, "r") as file:
+            source = file.read()
+
+        interpreter = SimpleInterpreter(output)
+        optimize = _worker_settings.get('optimize', True)
+        if _worker_settings.get('cache', True):
+            lines = interpret_cached(interpreter, file_name, source, optimize=optimize)
+        else:
+            lines = interpreter.interpretation(source, optimize=optimize)
+
+        source_lines = strip_source(source) if optimize else None
+        if _worker_settings.get('engine') == "vm":
+            run_program(interpreter, lines, source_lines)
+        else:
+            interpreter.execute_lines(lines, source_lines)
+        status = 'ok' if output.error_count == 0 else 'error'
+    except Exception as e:
+        output.error(f"❌ Не удалось выполнить {file_name}: {e}")
+        status = 'failed'
+
+    output.flush()
+    return {
+        'file': file_name,
+        'status': status,
+        'output': stream.getvalue(),
+        'errors': output.error_count,
+        'seconds': time.perf_counter() - start,
+    }
+
+
+def run_batch(path, workers=None, engine="interpreter", verbosity="program", cache=True, show_output=True,
+              optimize=True):
+    """
+    Выполняет все программы из каталога или манифеста в пуле процессов
+    Вывод каждой программы собирается отдельно и печатается после ее завершения,
+    в конце печатается общая статистика. Возвращает список результатов run_file
+    """
+    files = collect_files(path)
+    if not files:
+        print(f"Ошибка: не найдено файлов .code в {path}")
+        return []
+
+    start = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(engine, verbosity, cache, optimize)) as executor:
+        # chunksize уменьшает число обменов с процессами для больших пакетов
+        chunksize = max(1, len(files) // ((workers or os.cpu_count() or 1) * 4))
+        for result in executor.map(run_file, files, chunksize=chunksize):
+            results.append(result)
+            if show_output:
+                print(f"========= {result['file']} [{result['status']}, {result['seconds'] * 1000:.1f} мс] =========")
+                if result['output']:
+                    print(result['output'], end='')
+
+    elapsed = time.perf_counter() - start
+    ok = sum(1 for result in results if result['status'] == 'ok')
+    cpu_seconds = sum(result['seconds'] for result in results)
+    print("========= BATCH =========")
+    print(f"Файлов: {len(results)}, успешно: {ok}, с ошибками: {len(results) - ok}")
+    print(f"Время: {elapsed:.3f} с, суммарно в процессах: {cpu_seconds:.3f} с")
+    print(f"Пропускная способность: {len(results) / elapsed:.1f} файлов/с")
+    return results
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Пакетный запуск программ .code")
+    arg_parser.add_argument("path", help="каталог с файлами .code или файл-манифест")
+    arg_parser.add_argument("--workers", type=int, default=None, help="число процессов (по умолчанию - число CPU)")
+    arg_parser.add_argument("--engine", choices=["interpreter", "vm"], default="interpreter")
+    arg_parser.add_argument("--verbosity", choices=["silent", "program", "trace"], default="program")
+    arg_parser.add_argument("--no-cache", action="store_true", help="не использовать кэш __codecache__")
+    arg_parser.add_argument("--quiet", action="store_true", help="печатать только итоговую статистику")
+    arg_parser.add_argument("--no-optimize", action="store_true", help="не оптимизировать программы перед выполнением")
+    args = arg_parser.parse_args()
+
+    run_batch(args.path, args.workers, args.engine, args.verbosity, not args.no_cache, not args.quiet,
+              not args.no_optimize)
@@ -0,0 +1,69 @@
+class BlockIndex:
+    """
+    Индекс блоков в фигурных скобках, строится за один проход по строкам
+    Для каждой строки, открывающей блок, хранит строку закрывающей скобки
+    и строку родительского блока (-1 если нет).
+    Заменяет повторные сканирования find_matching_brace
+    """
+
+    def __init__(self, lines):
+        self.lines = lines
+        self.base = 0                   # смещение для представлений части строк (см. view)
+        self.ends = [-1] * len(lines)
+        self.parents = [-1] * len(lines)
+
+        depth = 0
+        open_blocks = []  # стек (строка, глубина до открытия)
+        for i, line in enumerate(lines):
+            opens = line.count('{')
+            closes = line.count('}')
+
+            if opens:
+                self.parents[i] = open_blocks[-1][0] if open_blocks else -1
+                open_blocks.append((i, depth))
+                depth += opens
+
+            if closes:
+                depth -= closes
+                # Закрываем все блоки, глубина которых вернулась к исходной
+                while open_blocks and depth <= open_blocks[-1][1]:
+                    self.ends[open_blocks.pop()[0]] = i
+
+    @classmethod
+    def from_tables(cls, lines, ends, parents):
+        """
+        Индекс из готовых таблиц ends и parents (например, из файла .phase1) без сканирования строк
+        """
+        index = cls.__new__(cls)
+        index.lines = lines
+        index.base = 0
+        index.ends = ends
+        index.parents = parents
+        return index
+
+    def view(self, offset):
+        """
+        Представление индекса для строк lines[offset:] без повторного сканирования
+        Индексы в представлении отсчитываются от offset
+        """
+        index = BlockIndex.__new__(BlockIndex)
+        index.lines = None
+        index.base = self.base + offset
+        index.ends = self.ends
+        index.parents = self.parents
+        return index
+
+    def end_of(self, start_index):
+        """
+        Индекс строки с закрывающей скобкой для блока, открытого на start_index
+        Возвращает -1 если строка не открывает блок или блок не закрыт
+        """
+        end = self.ends[self.base + start_index]
+        return end - self.base if end != -1 else -1
+
+    def parent_of(self, start_index):
+        """
+        Индекс строки, открывающей родительский блок (-1 для блоков верхнего уровня)
+        """
+        parent = self.parents[self.base + start_index]
+        return parent - self.base if parent >= self.base else -1
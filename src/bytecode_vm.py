@@ -0,0 +1,621 @@
+from array import array
+from bisect import bisect_right
+
+from frame import Frame
+from front_end import parse_call, split_statement
+from objects import parse_field, parse_new
+from rope_strings import is_string_literal
+from typed_arrays import (BUILTINS, BUILTIN_FUNCTIONS, binary, build_array, index, parse_array_literal,
+                          parse_builtin_call, parse_subscript, slice_array, split_words)
+
+# Коды операций. Каждая инструкция - пара (код, операнд) в array('i')
+LOAD_CONST = 0       # operand: индекс в consts, значение - пара (значение, тип)
+LOAD_LOCAL = 1       # operand: слот кадра (если слот пуст - глобальная переменная с тем же именем)
+LOAD_GLOBAL = 2      # operand: индекс имени в names
+STORE_LOCAL = 3      # operand: слот кадра
+STORE_GLOBAL = 4     # operand: индекс имени в names
+BINARY_ADD = 5
+BINARY_SUB = 6
+BINARY_MUL = 7
+BINARY_DIV = 8
+BINARY_UNKNOWN = 9   # operand: индекс сообщения об ошибке в consts
+CONVERT = 10         # operand: индекс имени типа в consts
+PRINT_LOCAL = 11     # operand: слот кадра
+PRINT_GLOBAL = 12    # operand: индекс имени в names
+CALL = 13            # operand: индекс функции в таблице функций программы
+RETURN_VALUE = 14    # call - инструкция, поэтому результат сразу выводится (если функция не void)
+RETURN_NONE = 15
+ERROR = 16           # operand: индекс сообщения в consts, выполнение продолжается
+RAISE = 17           # operand: индекс сообщения в consts, выбрасывает ValueError
+HALT = 18
+BUILD_ARRAY = 19     # operand: число элементов на стеке
+BUILTIN = 20         # operand: индекс пары (имя, число аргументов) в consts
+INDEX = 21           # a[i]
+SLICE = 22           # a[i:j]; опущенная граница - константа (None, None)
+
+OPCODE_NAMES = {value: name for name, value in globals().items() if name.isupper() and isinstance(value, int)}
+
+NUMERIC_TYPES = ('int', 'float')
+
+# Объекты классов (new, поля, методы) в байткод не компилируются
+OBJECTS_UNSUPPORTED = "Ошибка: объекты классов поддерживаются только движком 'interpreter'"
+
+BINARY_OPCODES = {
+    '+': BINARY_ADD,
+    '-': BINARY_SUB,
+    '*': BINARY_MUL,
+    '/': BINARY_DIV,
+}
+
+
+class CodeObject:
+    """
+    Скомпилированный байткод функции или основной программы
+    """
+    __slots__ = ('name', 'code', 'consts', 'names', 'const_index', 'name_indexes', 'layout', 'slots',
+                 'frame_types', 'argc', 'return_type', 'fixed_types', 'line_starts', 'line_info', 'memo')
+
+    def __init__(self, name, func_info=None):
+        self.name = name
+        self.code = array('i')
+        self.consts = []
+        self.names = []
+        self.const_index = {}
+        self.name_indexes = {}
+
+        # Раскладка слотов кадра берется из func_info (см. SimpleInterpreter.compile_function)
+        self.layout = func_info['layout'] if func_info else ()
+        self.slots = func_info['slots'] if func_info else {}
+        self.frame_types = func_info['frame_types'] if func_info else []
+        self.argc = len(func_info['params']) if func_info else 0
+        self.return_type = func_info['return_type'] if func_info else 'void'
+        # Кэш результатов чистой функции (общий с интерпретатором, см. SimpleInterpreter.is_pure_function)
+        self.memo = func_info.get('memo') if func_info else None
+
+        # Слоты с типом, известным при компиляции (параметры, которые не переобъявляются в теле)
+        self.fixed_types = {}
+
+        # Таблица строк основной программы: начало инструкций строки -> (номер строки, текст)
+        self.line_starts = []
+        self.line_info = []
+
+    def emit(self, opcode, operand=0):
+        self.code.append(opcode)
+        self.code.append(operand)
+
+    def const(self, value):
+        index = self.const_index.get(value)
+        if index is None:
+            index = self.const_index[value] = len(self.consts)
+            self.consts.append(value)
+        return index
+
+    def name_index(self, name):
+        index = self.name_indexes.get(name)
+        if index is None:
+            index = self.name_indexes[name] = len(self.names)
+            self.names.append(name)
+        return index
+
+    def mark_line(self, line_number, text):
+        self.line_starts.append(len(self.code))
+        self.line_info.append((line_number, text))
+
+    def line_at(self, pc):
+        """Строка основной программы, к которой относится инструкция на pc"""
+        position = bisect_right(self.line_starts, pc) - 1
+        return self.line_info[position] if position >= 0 else (0, '')
+
+
+class BytecodeCompiler:
+    """
+    Компилирует программу (после SimpleInterpreter.interpretation) в байткод
+    Вызовы функций разрешаются при компиляции: имя и число аргументов проверяются один раз
+    """
+
+    def __init__(self, interpreter):
+        self.interpreter = interpreter
+        self.function_index = {name: index for index, name in enumerate(interpreter.functions)}
+        self.functions = [None] * len(self.function_index)
+
+    def compile_program(self, lines):
+        """
+        Возвращает (основной код, список кодов функций)
+        """
+        for name, index in self.function_index.items():
+            self.functions[index] = self.compile_function(self.interpreter.functions[name])
+
+        main_code = CodeObject('<main>')
+        block_index = self.interpreter.get_block_index(lines)
+
+        i = 0
+        while i < len(lines):
+            stripped_line = lines[i].strip()
+
+            # Пропускаем тела функций/классов, как execute_lines
+            if '{' in stripped_line:
+                words = stripped_line.split()
+                if words and words[0] in ['function', 'method', 'class', 'pure']:
+                    end_index = block_index.end_of(i)
+                    i = end_index + 1 if end_index != -1 else len(lines)
+                    continue
+
+            main_code.mark_line(i + 1, stripped_line)
+            self.compile_statement(main_code, split_statement(stripped_line))
+            i += 1
+
+        main_code.emit(HALT)
+        return main_code, self.functions
+
+    def compile_function(self, func_info):
+        if func_info.get('code') is None:
+            self.interpreter.compile_function(func_info)
+
+        code_obj = CodeObject(func_info['name'], func_info)
+
+        declared = set()
+        for words in func_info['body_words']:
+            if len(words) >= 4 and words[0] in self.interpreter.valid_types and words[2] == '=':
+                declared.add(words[1])
+        for param_name, param_type in func_info['params'].items():
+            if param_name not in declared:
+                code_obj.fixed_types[code_obj.slots[param_name]] = param_type
+
+        for words in func_info['body_words']:
+            if self.compile_statement(code_obj, words):
+                # Инструкции после return не выполняются
+                return code_obj
+
+        code_obj.emit(RETURN_NONE)
+        return code_obj
+
+    def compile_statement(self, code_obj, words):
+        """
+        Компилирует одну инструкцию языка (words - ее слова, см. front_end.split_statement);
+        возвращает True для return
+        """
+        valid_types = self.interpreter.valid_types
+
+        if not words:
+            return False
+
+        if (words[0] in self.interpreter.classes or (len(words) >= 3 and words[1] == '=' and parse_field(words[0]))
+                or (words[0] == 'call' and len(words) > 1 and parse_field(words[1].split('(')[0]))):
+            code_obj.emit(ERROR, code_obj.const(OBJECTS_UNSUPPORTED))
+            return False
+
+        # Объявление переменной: тип имя = выражение
+        if words[0] in valid_types and words[0] != 'void':
+            if len(words) < 4 or words[2] != '=':
+                code_obj.emit(ERROR, code_obj.const("Ошибка: неправильный синтаксис объявления переменной"))
+                return False
+            value_type = self.compile_expression(code_obj, ' '.join(words[3:]))
+            self.compile_convert(code_obj, value_type, words[0])
+            if words[1] in code_obj.slots:
+                code_obj.emit(STORE_LOCAL, code_obj.slots[words[1]])
+            else:
+                code_obj.emit(STORE_GLOBAL, code_obj.name_index(words[1]))
+
+        elif words[0] == 'print':
+            if len(words) < 2:
+                code_obj.emit(ERROR, code_obj.const("Ошибка: не указана переменная для вывода"))
+            elif words[1] in code_obj.slots:
+                code_obj.emit(PRINT_LOCAL, code_obj.slots[words[1]])
+            else:
+                code_obj.emit(PRINT_GLOBAL, code_obj.name_index(words[1]))
+
+        elif words[0] == 'call':
+            self.compile_call(code_obj, ' '.join(words[1:]))
+
+        elif words[0] == 'return':
+            # return вне функции игнорируется, как в интерпретаторе
+            if code_obj.name == '<main>':
+                return False
+            if len(words) > 1:
+                value_type = self.compile_expression(code_obj, ' '.join(words[1:]))
+                if code_obj.return_type != 'void':
+                    self.compile_convert(code_obj, value_type, code_obj.return_type)
+                    code_obj.emit(RETURN_VALUE)
+                    return True
+            code_obj.emit(RETURN_NONE)
+            return True
+
+        return False
+
+    def compile_call(self, code_obj, func_call_str):
+        call = parse_call(func_call_str)
+        if call is None:
+            code_obj.emit(ERROR, code_obj.const("Ошибка: неправильный формат вызова функции"))
+            return
+
+        func_name, args = call
+
+        if func_name not in self.function_index:
+            code_obj.emit(ERROR, code_obj.const(f"Ошибка: функция {func_name} не найдена"))
+            return
+
+        param_types = list(self.interpreter.functions[func_name]['params'].values())
+        if len(args) != len(param_types):
+            code_obj.emit(ERROR, code_obj.const(
+                f"Ошибка: функция {func_name} ожидает {len(param_types)} аргументов, получено {len(args)}"))
+            return
+
+        for arg, param_type in zip(args, param_types):
+            value_type = self.compile_expression(code_obj, arg)
+            self.compile_convert(code_obj, value_type, param_type)
+
+        code_obj.emit(CALL, self.function_index[func_name])
+
+    def compile_convert(self, code_obj, value_type, target_type):
+        """
+        Преобразование типа нужно только если тип значения не известен заранее или отличается
+        """
+        if value_type != target_type:
+            code_obj.emit(CONVERT, code_obj.const(target_type))
+
+    def compile_expression(self, code_obj, expression_str):
+        """
+        Компилирует выражение (правила те же, что в expression_compiler)
+        Возвращает тип результата, если он известен при компиляции, иначе None
+        """
+        expression = expression_str.strip()
+
+        if is_string_literal(expression):
+            code_obj.emit(LOAD_CONST, code_obj.const((expression[1:-1], 'string')))
+            return 'string'
+
+        parts = split_words(expression)
+
+        if parse_new(parts) is not None or (len(parts) == 1 and parse_field(parts[0]) is not None):
+            code_obj.emit(RAISE, code_obj.const(OBJECTS_UNSUPPORTED))
+            return None
+
+        if len(parts) == 1:
+            return self.compile_word(code_obj, parts[0])
+
+        elif len(parts) == 3:
+            left_type = self.compile_expression(code_obj, parts[0])
+            right_type = self.compile_expression(code_obj, parts[2])
+            opcode = BINARY_OPCODES.get(parts[1])
+            if opcode is None:
+                code_obj.emit(BINARY_UNKNOWN, code_obj.const(f"Не удалось вычислить выражение: '{expression}'"))
+                return None
+            code_obj.emit(opcode)
+            # Деление может дать и int, и float; остальные операции над числами - float, если есть float
+            if opcode != BINARY_DIV and left_type in NUMERIC_TYPES and right_type in NUMERIC_TYPES:
+                return 'float' if 'float' in (left_type, right_type) else 'int'
+            return None
+
+        code_obj.emit(RAISE, code_obj.const(f"Не удалось вычислить выражение: '{expression}'"))
+        return None
+
+    def compile_word(self, code_obj, word):
+        items = parse_array_literal(word)
+        if items is not None:
+            for item in items:
+                self.compile_expression(code_obj, item)
+            code_obj.emit(BUILD_ARRAY, len(items))
+            return None
+
+        builtin_call = parse_builtin_call(word)
+        if builtin_call is not None:
+            name, arguments = builtin_call
+            if len(arguments) not in BUILTINS[name]:
+                code_obj.emit(RAISE, code_obj.const(f"Неверное число аргументов в '{word}'"))
+                return None
+            for argument in arguments:
+                self.compile_expression(code_obj, argument)
+            code_obj.emit(BUILTIN, code_obj.const((name, len(arguments))))
+            return None
+
+        subscript = parse_subscript(word)
+        if subscript is not None:
+            name, bounds = subscript
+            self.compile_expression(code_obj, name)
+            for bound in bounds:
+                if bound:
+                    self.compile_expression(code_obj, bound)
+                else:
+                    code_obj.emit(LOAD_CONST, code_obj.const((None, None)))
+            code_obj.emit(INDEX if len(bounds) == 1 else SLICE)
+            return None
+
+        if word.isdigit() or (word.startswith('-') and word[1:].isdigit()):
+            code_obj.emit(LOAD_CONST, code_obj.const((int(word), 'int')))
+            return 'int'
+        elif word.replace('.', '', 1).replace('-', '', 1).isdigit() and word.count('.') == 1:
+            code_obj.emit(LOAD_CONST, code_obj.const((float(word), 'float')))
+            return 'float'
+        elif word.lower() in ['true', 'false']:
+            code_obj.emit(LOAD_CONST, code_obj.const((word.lower() == 'true', 'bool')))
+            return 'bool'
+        elif word in code_obj.slots:
+            slot = code_obj.slots[word]
+            code_obj.emit(LOAD_LOCAL, slot)
+            return code_obj.fixed_types.get(slot)
+        else:
+            code_obj.emit(LOAD_GLOBAL, code_obj.name_index(word))
+            return None
+
+
+class BytecodeVM:
+    """
+    Стековая виртуальная машина для байткода BytecodeCompiler
+    Использует состояние интерпретатора: глобальные переменные, стек кадров и вывод
+    Вызовы функций не используют рекурсию Python - кадры хранятся в списке
+    """
+
+    def __init__(self, interpreter):
+        self.interpreter = interpreter
+
+    def run(self, main_code, functions, source_lines=None):
+        """
+        source_lines - строки исходного текста для сообщений об ошибках (см. execute_lines)
+        """
+        interpreter = self.interpreter
+        output = interpreter.output
+        self.main_pc = 0
+        try:
+            self.execute(main_code, functions)
+        except Exception as e:
+            # Как и execute_lines: сообщаем строку основной программы и останавливаемся
+            line_number, text = main_code.line_at(self.main_pc)
+            if source_lines is not None and line_number:
+                text = source_lines[line_number - 1].strip()
+            output.error(f"\n❌ Ошибка на строке {line_number}: {text}\n"
+                         f"📌 Сообщение об ошибке: {e}\n")
+            del interpreter.call_stack[:]
+        output.flush()
+
+    def execute(self, main_code, functions):
+        interpreter = self.interpreter
+        output = interpreter.output
+        variables = interpreter.variables
+        call_stack = interpreter.call_stack
+        convert_value = interpreter.convert_value
+        tracing = output.tracing
+
+        code_obj = main_code
+        code = code_obj.code
+        consts = code_obj.consts
+        names = code_obj.names
+        values = types = None
+
+        callers = []   # сохраненные (code_obj, pc) вызывающих функций
+        stack = []
+        pc = 0
+
+        try:
+            while True:
+                opcode = code[pc]
+                operand = code[pc + 1]
+                pc += 2
+
+                # Ветки упорядочены по частоте выполнения
+                if opcode == LOAD_LOCAL:
+                    var_type = types[operand]
+                    if var_type is None:
+                        var_name = code_obj.layout[operand]
+                        var_info = variables.get(var_name)
+                        if var_info is None:
+                            raise NameError(f"Переменная '{var_name}' не найдена")
+                        stack.append((var_info['value'], var_info['type']))
+                    else:
+                        stack.append((values[operand], var_type))
+
+                elif opcode == LOAD_CONST:
+                    stack.append(consts[operand])
+
+                elif opcode == STORE_LOCAL:
+                    value, types[operand] = stack.pop()
+                    values[operand] = value
+                    if tracing:
+                        output.trace(f"Создана переменная {code_obj.layout[operand]}: {types[operand]} = {value}")
+
+                elif opcode == LOAD_GLOBAL:
+                    var_info = variables.get(names[operand])
+                    if var_info is None:
+                        raise NameError(f"Переменная '{names[operand]}' не найдена")
+                    stack.append((var_info['value'], var_info['type']))
+
+                elif opcode == CONVERT:
+                    value, value_type = stack[-1]
+                    target_type = consts[operand]
+                    if value_type != target_type:
+                        stack[-1] = (convert_value(value, value_type, target_type), target_type)
+
+                elif opcode == BINARY_ADD:
+                    right_val, right_type = stack.pop()
+                    left_val, left_type = stack[-1]
+                    if left_type not in NUMERIC_TYPES or right_type not in NUMERIC_TYPES:
+                        stack[-1] = binary('+', stack[-1], (right_val, right_type))
+                        continue
+                    result = left_val + right_val
+                    stack[-1] = (result, 'float' if result.__class__ is float else 'int')
+
+                elif opcode == BINARY_SUB:
+                    right_val, right_type = stack.pop()
+                    left_val, left_type = stack[-1]
+                    if left_type not in NUMERIC_TYPES or right_type not in NUMERIC_TYPES:
+                        stack[-1] = binary('-', stack[-1], (right_val, right_type))
+                        continue
+                    result = left_val - right_val
+                    stack[-1] = (result, 'float' if result.__class__ is float else 'int')
+
+                elif opcode == BINARY_MUL:
+                    right_val, right_type = stack.pop()
+                    left_val, left_type = stack[-1]
+                    if left_type not in NUMERIC_TYPES or right_type not in NUMERIC_TYPES:
+                        stack[-1] = binary('*', stack[-1], (right_val, right_type))
+                        continue
+                    result = left_val * right_val
+                    stack[-1] = (result, 'float' if result.__class__ is float else 'int')
+
+                elif opcode == BINARY_DIV:
+                    right_val, right_type = stack.pop()
+                    left_val, left_type = stack[-1]
+                    if left_type not in NUMERIC_TYPES or right_type not in NUMERIC_TYPES:
+                        stack[-1] = binary('/', stack[-1], (right_val, right_type))
+                        continue
+                    if right_val == 0:
+                        raise ZeroDivisionError("Деление на ноль")
+                    result = left_val / right_val
+                    if result.is_integer():
+                        stack[-1] = (int(result), 'int')
+                    else:
+                        stack[-1] = (result, 'float')
+
+                elif opcode == CALL:
+                    callee = functions[operand]
+                    argc = callee.argc
+                    if callee.memo is not None:
+                        key = tuple(item[0] for item in stack[len(stack) - argc:])
+                        result = callee.memo.get(key)
+                        if result is not None:
+                            if argc:
+                                del stack[-argc:]
+                            if tracing:
+                                output.trace(f"Результат {callee.name}({', '.join(map(str, key))}) взят из кэша")
+                            if result[1] != 'void':
+                                output.program(f"Функция вернула ({result[1]}): {result[0]}")
+                            continue
+
+                    # Та же граница глубины, что в SimpleInterpreter.new_frame
+                    max_call_depth = interpreter.max_call_depth
+                    if max_call_depth is not None and len(call_stack) >= max_call_depth:
+                        raise RecursionError(f"Превышена максимальная глубина вызовов ({max_call_depth})")
+
+                    frame = Frame(callee.slots, callee.frame_types)
+                    if callee.memo is not None:
+                        frame.memo_key = key
+                    if argc:
+                        values = frame.values
+                        for i in range(argc):
+                            values[i] = stack[i - argc][0]
+                        del stack[-argc:]
+                    if tracing:
+                        output.trace(f"Вызов функции {callee.name} с параметрами: {frame.items()}")
+
+                    callers.append((code_obj, pc))
+                    call_stack.append(frame)
+
+                    code_obj = callee
+                    code = callee.code
+                    consts = callee.consts
+                    names = callee.names
+                    values = frame.values
+                    types = frame.types
+                    pc = 0
+
+                elif opcode == RETURN_VALUE or opcode == RETURN_NONE:
+                    if opcode == RETURN_VALUE:
+                        value, value_type = stack.pop()
+                    else:
+                        value, value_type = None, code_obj.return_type
+                    if value_type != 'void':
+                        output.program(f"Функция вернула ({value_type}): {value}")
+
+                    frame = call_stack.pop()
+                    if frame.memo_key is not None:
+                        code_obj.memo.put(frame.memo_key, (value, value_type))
+                    code_obj, pc = callers.pop()
+                    code = code_obj.code
+                    consts = code_obj.consts
+                    names = code_obj.names
+                    if call_stack:
+                        values = call_stack[-1].values
+                        types = call_stack[-1].types
+                    else:
+                        values = types = None
+
+                elif opcode == STORE_GLOBAL:
+                    value, value_type = stack.pop()
+                    variables[names[operand]] = {'value': value, 'type': value_type}
+                    if tracing:
+                        output.trace(f"Создана переменная {names[operand]}: {value_type} = {value}")
+
+                elif opcode == PRINT_LOCAL or opcode == PRINT_GLOBAL:
+                    if opcode == PRINT_LOCAL and types[operand] is not None:
+                        var_name = code_obj.layout[operand]
+                        output.program(f"{var_name} ({types[operand]}): {values[operand]}")
+                    else:
+                        var_name = code_obj.layout[operand] if opcode == PRINT_LOCAL else names[operand]
+                        var_info = variables.get(var_name)
+                        if var_info is not None:
+                            output.program(f"{var_name} ({var_info['type']}): {var_info['value']}")
+                        else:
+                            output.error(f"Ошибка: переменная {var_name} не найдена")
+
+                elif opcode == BUILTIN:
+                    name, argc = consts[operand]
+                    arguments = stack[-argc:]
+                    del stack[-argc:]
+                    stack.append(BUILTIN_FUNCTIONS[name](*arguments))
+
+                elif opcode == INDEX:
+                    position = stack.pop()
+                    stack[-1] = index(stack[-1], position)
+
+                elif opcode == SLICE:
+                    stop = stack.pop()
+                    start = stack.pop()
+                    stack[-1] = slice_array(stack[-1], start, stop)
+
+                elif opcode == BUILD_ARRAY:
+                    if operand:
+                        items = stack[-operand:]
+                        del stack[-operand:]
+                    else:
+                        items = []
+                    stack.append(build_array(items))
+
+                elif opcode == BINARY_UNKNOWN:
+                    # Операнды уже вычислены, как в интерпретаторе
+                    del stack[-2:]
+                    raise ValueError(consts[operand])
+
+                elif opcode == ERROR:
+                    output.error(consts[operand])
+
+                elif opcode == RAISE:
+                    raise ValueError(consts[operand])
+
+                elif opcode == HALT:
+                    return
+        except Exception:
+            # Запоминаем инструкцию основной программы, на которой произошла ошибка
+            self.main_pc = (callers[0][1] if callers else pc) - 2
+            raise
+
+
+def disassemble(code_obj):
+    """
+    Текстовое представление байткода (для отладки)
+    """
+    result = []
+    code = code_obj.code
+    for pc in range(0, len(code), 2):
+        opcode, operand = code[pc], code[pc + 1]
+        name = OPCODE_NAMES.get(opcode, str(opcode))
+        if opcode in (LOAD_CONST, CONVERT, ERROR, RAISE, BINARY_UNKNOWN, BUILTIN):
+            detail = repr(code_obj.consts[operand])
+        elif opcode in (LOAD_GLOBAL, STORE_GLOBAL, PRINT_GLOBAL):
+            detail = code_obj.names[operand]
+        elif opcode in (LOAD_LOCAL, STORE_LOCAL, PRINT_LOCAL):
+            detail = f"{operand} ({code_obj.layout[operand]})"
+        elif opcode in (CALL, BUILD_ARRAY):
+            detail = str(operand)
+        else:
+            detail = ''
+        result.append(f"{pc:6d} {name:<16} {detail}")
+    return '\n'.join(result)
+
+
+def run_program(interpreter, lines, source_lines=None):
+    """
+    Компилирует программу в байткод и выполняет ее
+    lines - результат interpreter.interpretation(code)
+    source_lines - строки исходного текста для сообщений об ошибках (см. execute_lines)
+    """
+    main_code, functions = BytecodeCompiler(interpreter).compile_program(lines)
+    BytecodeVM(interpreter).run(main_code, functions, source_lines)
@@ -0,0 +1,297 @@
+from functools import lru_cache
+import operator
+
+from objects import InlineCache, field_entry, parse_field, parse_new, receiver_instance
+from rope_strings import is_string_literal
+from typed_arrays import (BUILTINS, BUILTIN_FUNCTIONS, binary, build_array, index, parse_array_literal,
+                          parse_builtin_call, parse_subscript, slice_array, split_words)
+
+# Максимальное число различных выражений в кэше скомпилированных функций
+EXPRESSION_CACHE_SIZE = 4096
+
+# Арифметические операторы: оператор -> функция Python
+ARITHMETIC_OPERATORS = {
+    '+': operator.add,
+    '-': operator.sub,
+    '*': operator.mul,
+}
+
+NUMERIC_TYPES = ('int', 'float')
+
+
+def _raise_later(error_type, message):
+    """
+    Возвращает функцию, которая выбрасывает ошибку при вычислении
+    (ошибки разбора сообщаются при выполнении, как и раньше)
+    """
+    def evaluate(interpreter):
+        raise error_type(message)
+    return evaluate
+
+
+def compile_variable(var_name, layout=()):
+    """
+    Компилирует чтение переменной в функцию load(interpreter),
+    возвращающую (значение, тип) или None если переменной нет
+    Если имя есть в layout (слоты локальных переменных функции),
+    значение читается из кадра по индексу, иначе - из глобальных переменных
+    """
+    load = _compile_variable(var_name, layout)
+    load.compiled_from = (compile_variable, (var_name, layout))
+    return load
+
+
+def _compile_variable(var_name, layout):
+    variables_load = _compile_global(var_name)
+    if var_name not in layout:
+        return variables_load
+
+    index = layout.index(var_name)
+
+    def load(interpreter):
+        frame = interpreter.call_stack[-1]
+        var_type = frame.types[index]
+        if var_type is None:
+            # Локальная переменная еще не объявлена - ищем глобальную
+            return variables_load(interpreter)
+        return frame.values[index], var_type
+    return load
+
+
+def _compile_global(var_name):
+    def load(interpreter):
+        var_info = interpreter.variables.get(var_name)
+        if var_info is None:
+            return None
+        return var_info['value'], var_info['type']
+    return load
+
+
+def _compile_word(word, layout):
+    """
+    Компилирует одно слово: литерал или имя переменной
+    """
+    if word.isdigit() or (word.startswith('-') and word[1:].isdigit()):
+        result = (int(word), 'int')
+        return lambda interpreter: result
+    elif word.replace('.', '', 1).replace('-', '', 1).isdigit() and word.count('.') == 1:
+        result = (float(word), 'float')
+        return lambda interpreter: result
+    elif word.lower() in ['true', 'false']:
+        result = (word.lower() == 'true', 'bool')
+        return lambda interpreter: result
+
+    # Это переменная - ищем при выполнении
+    load = compile_variable(word, layout)
+
+    def evaluate(interpreter):
+        result = load(interpreter)
+        if result is None:
+            raise NameError(f"Переменная '{word}' не найдена")
+        return result
+    return evaluate
+
+
+def _compile_binary(left, op, right, expression_str):
+    """
+    Компилирует бинарное выражение с заранее выбранным оператором
+    """
+    if op == '/':
+        def apply(left_val, right_val):
+            if right_val == 0:
+                raise ZeroDivisionError("Деление на ноль")
+            result = left_val / right_val
+            if isinstance(result, float) and result.is_integer():
+                result = int(result)
+            return result
+    elif op in ARITHMETIC_OPERATORS:
+        apply = ARITHMETIC_OPERATORS[op]
+    else:
+        def evaluate(interpreter):
+            # Операнды вычисляются до ошибки, как в исходном интерпретаторе
+            left(interpreter)
+            right(interpreter)
+            raise ValueError(f"Не удалось вычислить выражение: '{expression_str}'")
+        return evaluate
+
+    def evaluate(interpreter):
+        left_val, left_type = left(interpreter)
+        right_val, right_type = right(interpreter)
+        if left_type in NUMERIC_TYPES and right_type in NUMERIC_TYPES:
+            result = apply(left_val, right_val)
+            return result, 'float' if isinstance(result, float) else 'int'
+        # Массивы: поэлементная операция целиком (иначе TypeError, как для чисел)
+        return binary(op, (left_val, left_type), (right_val, right_type))
+    return evaluate
+
+
+def _compile_field(receiver_name, field_name, layout):
+    """
+    Чтение поля объекта p.x: слот поля берется из кэша, пока класс объекта не меняется
+    """
+    load = compile_variable(receiver_name, layout)
+    cache = InlineCache()
+
+    def evaluate(interpreter):
+        instance = receiver_instance(receiver_name, load(interpreter))
+        if cache.cls is not instance.cls:
+            cache.entry = field_entry(instance.cls, field_name)
+            cache.cls = instance.cls
+        slot, field_type = cache.entry
+        return instance.fields[slot], field_type
+    return evaluate
+
+
+def _compile_new(class_name, argument_strs, layout):
+    """
+    Создание объекта new Point(1, 2): аргументы - значения полей по порядку
+    """
+    arguments = [compile_expression(argument, layout) for argument in argument_strs]
+
+    def evaluate(interpreter):
+        return interpreter.new_instance(class_name, [argument(interpreter) for argument in arguments])
+    return evaluate
+
+
+def _compile_array_literal(items, layout):
+    """
+    Литерал массива [1, 2, x]: из одних чисел строится заранее
+    """
+    elements = [compile_expression(item, layout) for item in items]
+
+    def evaluate(interpreter):
+        return build_array([element(interpreter) for element in elements])
+
+    if all(item.replace('.', '', 1).replace('-', '', 1).isdigit() for item in items):
+        result = evaluate(None)
+        return lambda interpreter: result
+    return evaluate
+
+
+def _compile_builtin(name, argument_strs, layout, expression_str):
+    """
+    Встроенная функция над массивами: sum(a), dot(a, b), range(n) ...
+    """
+    if len(argument_strs) not in BUILTINS[name]:
+        return _raise_later(TypeError, f"Неверное число аргументов в '{expression_str}'")
+    function = BUILTIN_FUNCTIONS[name]
+    arguments = [compile_expression(argument, layout) for argument in argument_strs]
+
+    if len(arguments) == 1:
+        argument = arguments[0]
+        return lambda interpreter: function(argument(interpreter))
+
+    def evaluate(interpreter):
+        return function(*[argument(interpreter) for argument in arguments])
+    return evaluate
+
+
+def _compile_subscript(name, bounds, layout):
+    """
+    Индекс a[i] или срез a[i:j] (границы среза можно опускать)
+    """
+    container = compile_expression(name, layout)
+    if len(bounds) == 1:
+        position = compile_expression(bounds[0], layout)
+        return lambda interpreter: index(container(interpreter), position(interpreter))
+
+    missing = (None, None)
+    start = compile_expression(bounds[0], layout) if bounds[0] else lambda interpreter: missing
+    stop = compile_expression(bounds[1], layout) if bounds[1] else lambda interpreter: missing
+
+    def evaluate(interpreter):
+        return slice_array(container(interpreter), start(interpreter), stop(interpreter))
+    return evaluate
+
+
+def expression_names(expression_str):
+    """
+    Имена переменных, которые читает выражение (для статического анализа тел функций)
+    """
+    expression = expression_str.strip()
+    if is_string_literal(expression):
+        return set()
+
+    names = set()
+    parts = split_words(expression)
+    if len(parts) == 3:
+        return expression_names(parts[0]) | expression_names(parts[2])
+    new_call = parse_new(parts)
+    if new_call is not None:
+        for argument in new_call[1]:
+            names |= expression_names(argument)
+        return names
+    for word in parts:
+        items = parse_array_literal(word)
+        builtin_call = parse_builtin_call(word)
+        subscript = parse_subscript(word)
+        if items is not None:
+            for item in items:
+                names |= expression_names(item)
+        elif builtin_call is not None:
+            for argument in builtin_call[1]:
+                names |= expression_names(argument)
+        elif subscript is not None:
+            names.add(subscript[0])
+            for bound in subscript[1]:
+                if bound:
+                    names |= expression_names(bound)
+        elif parse_field(word) is not None:
+            names.add(parse_field(word)[0])
+        elif not (word.replace('.', '', 1).replace('-', '', 1).isdigit() or word.lower() in ['true', 'false']
+                  or word.startswith('"')):
+            names.add(word)
+    return names
+
+
+@lru_cache(maxsize=EXPRESSION_CACHE_SIZE)
+def compile_expression(expression_str, layout=()):
+    """
+    Компилирует строку выражения в функцию evaluate(interpreter),
+    возвращающую пару (значение, тип)
+    layout - кортеж имен локальных переменных функции по слотам (см. frame.build_layout)
+    Литералы преобразуются заранее, оператор выбирается один раз.
+    Результаты кэшируются по тексту выражения и layout (LRU, EXPRESSION_CACHE_SIZE)
+    Атрибут compiled_from позволяет пересобрать функцию при загрузке из кэша (см. program_cache)
+    """
+    evaluate = _compile_expression(expression_str, layout)
+    evaluate.compiled_from = (compile_expression, (expression_str, layout))
+    return evaluate
+
+
+def _compile_expression(expression_str, layout):
+    expression = expression_str.strip()
+
+    # Строковый литерал
+    if is_string_literal(expression):
+        result = (expression[1:-1], 'string')
+        return lambda interpreter: result
+
+    # Скобки [] и () не разрываются: '[1, 2]', 'dot(a, b)' - одно слово
+    parts = split_words(expression)
+
+    if len(parts) == 1:
+        word = parts[0]
+        items = parse_array_literal(word)
+        if items is not None:
+            return _compile_array_literal(items, layout)
+        builtin_call = parse_builtin_call(word)
+        if builtin_call is not None:
+            return _compile_builtin(*builtin_call, layout, expression)
+        subscript = parse_subscript(word)
+        if subscript is not None:
+            return _compile_subscript(*subscript, layout)
+        field = parse_field(word)
+        if field is not None:
+            return _compile_field(*field, layout)
+        return _compile_word(word, layout)
+
+    elif len(parts) == 2 and parse_new(parts) is not None:
+        return _compile_new(*parse_new(parts), layout)
+
+    elif len(parts) == 3:
+        left = compile_expression(parts[0], layout)
+        right = compile_expression(parts[2], layout)
+        return _compile_binary(left, parts[1], right, expression)
+
+    return _raise_later(ValueError, f"Не удалось вычислить выражение: '{expression}'")
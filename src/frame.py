@@ -0,0 +1,52 @@
+class Frame:
+    """
+    Кадр вызова функции: локальные переменные хранятся по слотам
+    Индексы слотов назначаются при компиляции функции (см. build_layout),
+    значения и типы лежат в двух плоских списках.
+    Тип None означает, что слот еще не инициализирован
+    function и pc - выполняемая функция и следующая инструкция (для SimpleInterpreter.run_frames)
+    memo_key - аргументы вызова чистой функции, по которым сохраняется результат
+    """
+    __slots__ = ('slots', 'values', 'types', 'function', 'pc', 'memo_key')
+
+    def __init__(self, slots, types):
+        self.slots = slots                    # {'name': индекс слота}, общий для всех вызовов функции
+        self.values = [None] * len(types)
+        self.types = list(types)              # копия шаблона типов функции
+        self.function = None
+        self.pc = 0
+        self.memo_key = None
+
+    def get(self, var_name):
+        """
+        Возвращает (значение, тип) локальной переменной или None
+        """
+        index = self.slots.get(var_name)
+        if index is None or self.types[index] is None:
+            return None
+        return self.values[index], self.types[index]
+
+    def items(self):
+        """
+        Инициализированные локальные переменные в порядке слотов: [(имя, значение)]
+        """
+        return [(name, self.values[index]) for name, index in self.slots.items()
+                if self.types[index] is not None]
+
+
+def build_layout(params, body_declarations):
+    """
+    Назначает слоты: сначала параметры по порядку, затем объявленные локальные переменные
+    Возвращает (layout, slots, types):
+        layout - кортеж имен по слотам (используется как ключ компиляции выражений)
+        slots - словарь имя -> индекс
+        types - шаблон типов: типы параметров, None для остальных локальных
+    """
+    layout = list(params)
+    for var_name in body_declarations:
+        if var_name not in layout:
+            layout.append(var_name)
+    layout = tuple(layout)
+    slots = {name: index for index, name in enumerate(layout)}
+    types = [params.get(name) for name in layout]
+    return layout, slots, types
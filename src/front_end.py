@@ -0,0 +1,183 @@
+from block_index import BlockIndex
+from typed_arrays import split_arguments
+
+# Ключевые слова, открывающие блоки определений
+DEFINITION_KEYWORDS = ['function', 'method', 'class', 'pure']
+
+
+def strip_source(code):
+    """
+    Строки программы без комментариев (//...) и пустых строк, с отступами
+    Номер строки в сообщениях об ошибках - индекс в этом списке + 1
+    """
+    lines = []
+    for line in code.strip().split('\n'):
+        comment_pos = line.find('//')
+        if comment_pos != -1:
+            line = line[:comment_pos]
+        line = line.rstrip()
+        if line.strip():
+            lines.append(line)
+    return lines
+
+
+def split_statement(line):
+    """
+    Слова инструкции: 'print x;' -> ['print', 'x']
+    """
+    return line.rstrip(';').strip().split()
+
+
+def is_function_header(words):
+    return bool(words) and (words[0] == 'function' or words[:2] == ['pure', 'function'])
+
+
+class ParsedProgram:
+    """
+    Результат однократного разбора исходного кода, общий для интерпретатора,
+    байткод-VM, LexicalAnalysis, транспилятора и оптимизатора:
+    lines - строки программы (см. strip_source), words - слова каждой строки,
+    block_index - индекс блоков, definitions - определения верхнего уровня
+    (вид 'class' или 'function', строка заголовка, строка закрывающей скобки или -1),
+    main - индексы инструкций основной программы
+    source_lines, source_words - строки исходного текста и их слова: отличаются от lines
+    и words, если инструкции переписал оптимизатор (replace_line); по ним сообщаются ошибки
+    """
+    __slots__ = ('lines', 'words', 'block_index', 'definitions', 'main', 'source_lines', 'source_words')
+
+    def __init__(self, lines):
+        self.lines = lines
+        self.source_lines = lines
+        self.words = [split_statement(line) for line in lines]
+        self.source_words = self.words
+        self.block_index = BlockIndex(lines)
+        self.definitions = []
+        self.main = []
+
+        i = 0
+        while i < len(lines):
+            words = self.words[i]
+            kind = 'class' if words and words[0] == 'class' else 'function' if is_function_header(words) else None
+
+            if words and words[0] in DEFINITION_KEYWORDS and '{' in lines[i]:
+                end_index = self.block_index.end_of(i)
+                if kind is not None:
+                    self.definitions.append((kind, i, end_index))
+                if end_index == -1:
+                    break
+                i = end_index + 1
+                continue
+
+            if kind is not None:
+                # Заголовок без блока - ошибка сообщается при регистрации
+                self.definitions.append((kind, i, -1))
+            self.main.append(i)
+            i += 1
+
+    @classmethod
+    def from_tables(cls, lines, words, block_index, definitions, main):
+        """
+        Программа из готовых таблиц (например, из файла .phase1, см. phase1_format) без разбора строк
+        """
+        program = cls.__new__(cls)
+        program.lines = lines
+        program.source_lines = lines
+        program.words = words
+        program.source_words = words
+        program.block_index = block_index
+        program.definitions = definitions
+        program.main = main
+        return program
+
+    def replace_line(self, index, line):
+        """
+        Заменяет инструкцию (без изменения структуры блоков, см. program_optimizer)
+        Исходный текст остается в source_lines и source_words
+        """
+        if self.source_lines is self.lines:
+            self.source_lines = list(self.lines)
+            self.source_words = list(self.words)
+        self.lines[index] = line
+        self.words[index] = split_statement(line)
+
+
+def parse_program(code):
+    return ParsedProgram(strip_source(code))
+
+
+def parse_function_header(line, valid_types=None):
+    """
+    Разбирает заголовок функции или метода
+    Формат: [pure] function name(param1: type1, param2: type2) -> return_type {
+    Возвращает (func_info, None) или (None, сообщение об ошибке)
+    valid_types - допустимые типы (None - типы не проверяются)
+    """
+    # Убираем { в конце если есть
+    line = line.replace('{', '').strip()
+
+    parts = line.split()
+    if len(parts) < 2:
+        return None, None
+
+    # pure function - явная пометка чистой функции (см. SimpleInterpreter.is_pure_function)
+    pure = parts[0] == 'pure'
+    if pure:
+        parts = parts[1:]
+
+    keyword = parts[0]  # function или method
+    func_declaration = ' '.join(parts[1:])
+
+    # Разделяем на имя с параметрами и тип возврата
+    if '->' not in func_declaration:
+        return None, "Ошибка: не указан тип возвращаемого значения (используйте ->)"
+    func_part, return_type = func_declaration.split('->', 1)
+    return_type = return_type.strip()
+
+    # Парсим имя функции и параметры
+    paren_pos = func_part.find('(')
+    if paren_pos == -1:
+        return None, "Ошибка: неправильный формат объявления функции"
+
+    func_name = func_part[:paren_pos].strip()
+    params_str = func_part[paren_pos + 1:func_part.rfind(')')].strip()
+
+    # Парсим параметры
+    params = {}
+    if params_str:
+        for param in [p.strip() for p in params_str.split(',')]:
+            if ':' not in param:
+                return None, f"Ошибка: параметр '{param}' должен иметь тип (используйте name: type)"
+            param_name, param_type = param.split(':', 1)
+            param_name = param_name.strip()
+            param_type = param_type.strip()
+
+            if valid_types is not None and param_type not in valid_types:
+                return None, f"Ошибка: неизвестный тип '{param_type}' для параметра '{param_name}'"
+
+            params[param_name] = param_type
+
+    if valid_types is not None and return_type not in valid_types:
+        return None, f"Ошибка: неизвестный тип возврата '{return_type}'"
+
+    return {
+        'name': func_name,
+        'params': params,
+        'return_type': return_type,
+        'body': [],
+        'is_method': keyword == 'method',
+        'pure': pure
+    }, None
+
+
+def parse_call(func_call_str):
+    """
+    Разбирает вызов name(arg1, arg2) -> (имя, [строки аргументов]) или None
+    Аргументы делятся по запятым верхнего уровня: f(dot(a, b), 1) -> ['dot(a, b)', '1']
+    """
+    func_call_str = func_call_str.strip()
+    paren_pos = func_call_str.find('(')
+    if paren_pos == -1:
+        return None
+    func_name = func_call_str[:paren_pos].strip()
+    args_str = func_call_str[paren_pos + 1:-1].strip()
+    return func_name, split_arguments(args_str) if args_str else []
@@ -1,6 +1,19 @@
+from block_index import BlockIndex
+from front_end import parse_program, split_statement
+from objects import build_class_layout
+from output import Output
+from simple_interpreter import SimpleInterpreter
+
+
 class LexicalAnalysis:
     # Класс для лексического анализа кода на нашем языке
-    def __init__(self):
+
+    # Разбор заголовков функций и методов и регистрация определений общие с интерпретатором
+    parse_function_declaration = SimpleInterpreter.parse_function_declaration
+    parse_field_declaration = SimpleInterpreter.parse_field_declaration
+    load_program = SimpleInterpreter.load_program
+
+    def __init__(self, output=None):
         # Словарь для хранения переменных: {'name': {'value': val, 'type': type}}
         self.variables = {}
 
@@ -14,99 +27,74 @@ class LexicalAnalysis:
         self.call_stack = []
 
         # Поддерживаемые типы данных
-        self.valid_types = ['int', 'float', 'string', 'bool', 'void']
+        self.valid_types = ['int', 'float', 'string', 'bool', 'void', 'int[]', 'float[]']
 
         # Флаг - находимся ли мы внутри класса при парсинге
         self.current_class = None
 
+        # Разобранная программа последнего invoke (front_end.ParsedProgram, см. phase1_format)
+        self.program = None
+
+        # Вывод служебных сообщений (см. output.py)
+        self.output = output if output is not None else Output()
+
     def invoke(self, code):
         """
-        Главная функция - выполняет код нашего языка
+        Главная функция - разбирает код нашего языка (front_end.parse_program)
+        и находит функции и классы без компиляции тел
         """
-        lines = code.strip().split('\n')
-        lines = [line.rstrip() for line in lines]  # Убираем пробелы справа
-
-        # Удаляем комментарии и пустые строки
-        processed_lines = []
-        for line in lines:
-            # Убираем комментарии (все что после //)
-            comment_pos = line.find('//')
-            if comment_pos != -1:
-                line = line[:comment_pos].rstrip()
-
-            # Добавляем строку только если она не пустая
-            if line.strip():
-                processed_lines.append(line)
-
-        lines = processed_lines
-
         # ФАЗА 1: Парсинг функций и классов
-        i = 0
-        while i < len(lines):
-            line = lines[i].strip()
-            if not line:
-                i += 1
-                continue
-
-            words = line.split()
-            if not words:
-                i += 1
-                continue
+        self.program = parse_program(code)
+        return self.load_program(self.program)
 
-            # Обработка объявления класса
-            if words[0] == 'class':
-                if len(words) < 2:
-                    print("Ошибка: не указано имя класса")
-                    i += 1
-                    continue
-
-                class_name = words[1]
-                self.current_class = class_name
-                self.classes[class_name] = {'methods': {}, 'variables': {}}
-                print(f"Найден класс: {class_name}")
+    def register_function(self, func_info, body_lines, body_words=None):
+        """
+        Добавляет функцию в таблицу functions (тело не компилируется)
+        body_words не сохраняются: в файл .phase1 записываются только строки тела
+        """
+        func_info['body'] = [body_line.strip() for body_line in body_lines if body_line.strip()]
+        self.functions[func_info['name']] = func_info
+        if self.output.tracing:
+            self.output.trace(
+                f"Найдена функция {func_info['name']}({', '.join([f'{name}: {type_}' for name, type_ in func_info['params'].items()])}) -> {func_info['return_type']}")
 
-                # Найти конец класса по скобкам
-                end_index = self.find_matching_brace(lines, i)
-                if end_index == -1:
-                    print("Ошибка: не найдена закрывающая скобка для класса")
-                    break
+    def parse_class_content(self, class_lines, block_index=None):
+        """
+        Находит поля и методы класса (без компиляции тел и значений по умолчанию - это делает интерпретатор)
+        block_index - индекс блоков для class_lines (обычно view общего индекса файла)
+        """
+        if block_index is None:
+            block_index = BlockIndex(class_lines)
 
-                # Парсим содержимое класса
-                class_content = lines[i + 1:end_index]
-                self.parse_class_content(class_content)
+        fields = []
 
-                self.current_class = None
-                i = end_index + 1
-                continue
+        i = 0
+        while i < len(class_lines):
+            words = class_lines[i].split()
 
-            # Обработка объявления функции
-            elif words[0] == 'function':
-                func_info = self.parse_function_declaration(line)
+            if words and words[0] == 'method':
+                func_info = self.parse_function_declaration(class_lines[i].strip())
                 if func_info is None:
                     i += 1
                     continue
 
-                # Найти тело функции по скобкам
-                end_index = self.find_matching_brace(lines, i)
+                end_index = block_index.end_of(i)
                 if end_index == -1:
-                    print("Ошибка: не найдена закрывающая скобка для функции")
+                    self.output.error("Ошибка: не найдена закрывающая скобка для метода")
                     break
 
-                # Читаем тело функции
-                func_body = []
-                for body_line in lines[i + 1:end_index]:
-                    body_line = body_line.strip()
-                    if body_line:
-                        func_body.append(body_line)
-
-                func_info['body'] = func_body
-                self.functions[func_info['name']] = func_info
-                print(
-                    f"Найдена функция {func_info['name']}({', '.join([f'{name}: {type_}' for name, type_ in func_info['params'].items()])}) -> {func_info['return_type']}")
+                func_info['body'] = [body_line.strip() for body_line in class_lines[i + 1:end_index]
+                                     if body_line.strip()]
+                self.classes[self.current_class]['methods'][func_info['name']] = func_info
+                if self.output.tracing:
+                    self.output.trace(
+                        f"Найден метод {self.current_class}.{func_info['name']}({', '.join([f'{name}: {type_}' for name, type_ in func_info['params'].items()])}) -> {func_info['return_type']}")
 
                 i = end_index + 1
-                continue
-
-            i += 1
+            else:
+                field = self.parse_field_declaration(split_statement(class_lines[i]))
+                if field is not None:
+                    fields.append(field)
+                i += 1
 
-        return lines
+        build_class_layout(self.classes[self.current_class], fields)
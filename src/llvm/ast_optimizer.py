@@ -0,0 +1,267 @@
+from src.llvm.nodes.ast_nodes import (
+    AssignNode, BinaryOpNode, CallNode, ForNode, FunctionDefNode, IfNode, NumberNode, PrintNode, ReturnNode,
+    UnaryOpNode, VariableNode, WhileNode
+)
+
+# Целые в сгенерированном коде - i32 (см. CodeGenerator), свертка повторяет их переполнение
+INT32_MIN = -2 ** 31
+INT32_MASK = 2 ** 32 - 1
+
+# Сравнения и логические операторы дают 0 или 1, как zext результата icmp в CodeGenerator
+COMPARISONS = {
+    'EQUAL': lambda left, right: left == right,
+    'NOT_EQUAL': lambda left, right: left != right,
+    'LESS': lambda left, right: left < right,
+    'GREATER': lambda left, right: left > right,
+    'LESS_EQUAL': lambda left, right: left <= right,
+    'GREATER_EQUAL': lambda left, right: left >= right,
+    'AND': lambda left, right: left != 0 and right != 0,
+    'OR': lambda left, right: left != 0 or right != 0,
+}
+
+
+def wrap_int32(value):
+    value &= INT32_MASK
+    return value - 2 ** 32 if value > 2 ** 31 - 1 else value
+
+
+def fold_binary(op, left, right):
+    """
+    Значение операции над константами i32 или None, если она должна выполниться в рантайме
+    (в том числе для операндов не int: 1.5 + 2 не сворачивается)
+    """
+    if left.__class__ is not int or right.__class__ is not int:
+        return None
+    if op == 'PLUS':
+        return wrap_int32(left + right)
+    elif op == 'MINUS':
+        return wrap_int32(left - right)
+    elif op == 'MULTIPLY':
+        return wrap_int32(left * right)
+    elif op == 'DIVIDE':
+        # Деление на ноль и переполнение sdiv оставляем рантайму
+        if right == 0 or (left == INT32_MIN and right == -1):
+            return None
+        quotient = abs(left) // abs(right)
+        return quotient if (left < 0) == (right < 0) else -quotient
+    elif op in COMPARISONS:
+        return int(COMPARISONS[op](left, right))
+    return None
+
+
+def assigned_names(statements):
+    """
+    Переменные, которым присваивается значение в инструкциях (включая вложенные блоки;
+    тела функций - отдельная область видимости)
+    """
+    names = set()
+    for node in statements:
+        if isinstance(node, AssignNode):
+            names.add(node.name)
+        elif isinstance(node, IfNode):
+            names |= assigned_names(node.then_body)
+            if node.else_body is not None:
+                names |= assigned_names(node.else_body)
+        elif isinstance(node, WhileNode):
+            names |= assigned_names(node.body)
+        elif isinstance(node, ForNode):
+            names |= assigned_names([part for part in (node.init, node.update) if part is not None])
+            names |= assigned_names(node.body)
+    return names
+
+
+class AstOptimizer:
+    """
+    Оптимизация AST перед генерацией LLVM IR:
+    - свертка константных выражений (2 * 3 -> NumberNode(6), 1 < 2 -> NumberNode(1))
+    - подстановка переменных с известным значением
+    - удаление присваиваний, значение которых не читается
+    Значения, известные после if, - общие для обеих ветвей; переменные, которым
+    присваивается значение в цикле, в цикле и после него неизвестны
+    """
+
+    def __init__(self):
+        self.folded = 0
+        self.propagated = 0
+        self.removed = 0
+
+    def optimize(self, ast):
+        statements = self.visit_statements(ast, {})
+        return self.remove_dead_assignments(statements, set(), self.declarations(statements))
+
+    def visit_statements(self, statements, known):
+        return [self.visit_statement(node, known) for node in statements]
+
+    def visit_statement(self, node, known):
+        if isinstance(node, AssignNode):
+            value = self.fold(node.value, known)
+            if isinstance(value, NumberNode):
+                known[node.name] = value.value
+            else:
+                known.pop(node.name, None)
+            return AssignNode(node.name, value)
+        elif isinstance(node, PrintNode):
+            return PrintNode(self.fold(node.value, known))
+        elif isinstance(node, IfNode):
+            condition = self.fold(node.condition, known)
+            then_known = dict(known)
+            then_body = self.visit_statements(node.then_body, then_known)
+            else_known = dict(known)
+            else_body = None
+            if node.else_body is not None:
+                else_body = self.visit_statements(node.else_body, else_known)
+            merged = {name: value for name, value in then_known.items() if else_known.get(name) == value}
+            known.clear()
+            known.update(merged)
+            return IfNode(condition, then_body, else_body)
+        elif isinstance(node, WhileNode):
+            self.forget(known, assigned_names(node.body))
+            condition = self.fold(node.condition, known)
+            return WhileNode(condition, self.visit_statements(node.body, dict(known)))
+        elif isinstance(node, ForNode):
+            init = None if node.init is None else self.visit_statement(node.init, known)
+            self.forget(known, assigned_names([node]))
+            condition = None if node.condition is None else self.fold(node.condition, known)
+            body_known = dict(known)
+            body = self.visit_statements(node.body, body_known)
+            update = None if node.update is None else self.visit_statement(node.update, body_known)
+            return ForNode(init, condition, update, body)
+        elif isinstance(node, FunctionDefNode):
+            # Тело функции - своя область видимости: значения main в ней неизвестны
+            body = self.visit_statements(node.body, {})
+            body = self.remove_dead_assignments(body, set(), self.declarations(body))
+            return FunctionDefNode(node.name, node.params, body)
+        elif isinstance(node, ReturnNode):
+            return ReturnNode(None if node.value is None else self.fold(node.value, known))
+        return self.fold(node, known)
+
+    def forget(self, known, names):
+        for name in names:
+            known.pop(name, None)
+
+    def fold(self, node, known):
+        if isinstance(node, VariableNode) and node.name in known:
+            self.propagated += 1
+            return NumberNode(known[node.name])
+        elif isinstance(node, BinaryOpNode):
+            left = self.fold(node.left, known)
+            right = self.fold(node.right, known)
+            if isinstance(left, NumberNode) and isinstance(right, NumberNode):
+                value = fold_binary(node.op, left.value, right.value)
+                if value is not None:
+                    self.folded += 1
+                    return NumberNode(value)
+            return BinaryOpNode(left, node.op, right)
+        elif isinstance(node, UnaryOpNode):
+            operand = self.fold(node.operand, known)
+            if node.op == 'NOT' and isinstance(operand, NumberNode) and operand.value.__class__ is int:
+                self.folded += 1
+                return NumberNode(int(operand.value == 0))
+            return UnaryOpNode(node.op, operand)
+        elif isinstance(node, CallNode):
+            return CallNode(node.name, [self.fold(arg, known) for arg in node.args])
+        return node
+
+    def declarations(self, statements):
+        """
+        Первые в тексте присваивания переменных, которые где-либо читаются (id узлов):
+        CodeGenerator создает переменную при первом присваивании в тексте, поэтому
+        такие присваивания не удаляются, даже если значение не читается
+        """
+        first = {}
+
+        def walk(nodes):
+            for node in nodes:
+                if isinstance(node, AssignNode):
+                    first.setdefault(node.name, node)
+                elif isinstance(node, IfNode):
+                    walk(node.then_body)
+                    walk(node.else_body or [])
+                elif isinstance(node, WhileNode):
+                    walk(node.body)
+                elif isinstance(node, ForNode):
+                    walk([node.init] if node.init is not None else [])
+                    walk(node.body)
+                    walk([node.update] if node.update is not None else [])
+
+        walk(statements)
+        reads = self.reads_all(statements)
+        return {id(node) for name, node in first.items() if name in reads}
+
+    def remove_dead_assignments(self, statements, live, declarations):
+        """
+        Обратный проход: присваивание константы удаляется, если переменная не читается
+        до следующего присваивания (вычисление выражения с переменными может
+        завершиться ошибкой, такие присваивания остаются)
+        live - переменные, читаемые после statements; заменяется на читаемые до них
+        declarations - присваивания, которые нельзя удалять (см. declarations)
+        В теле цикла живы также все переменные, которые читает цикл (следующие итерации)
+        """
+        result = []
+        for node in reversed(statements):
+            if isinstance(node, AssignNode):
+                if node.name not in live and isinstance(node.value, NumberNode) and id(node) not in declarations:
+                    self.removed += 1
+                    continue
+                live.discard(node.name)
+                live |= self.reads(node.value)
+            elif isinstance(node, IfNode):
+                then_live = set(live)
+                then_body = self.remove_dead_assignments(node.then_body, then_live, declarations)
+                else_live = set(live)
+                else_body = None
+                if node.else_body is not None:
+                    else_body = self.remove_dead_assignments(node.else_body, else_live, declarations)
+                live.clear()
+                live |= then_live | else_live | self.reads(node.condition)
+                node = IfNode(node.condition, then_body, else_body)
+            elif isinstance(node, WhileNode):
+                live |= self.reads(node)
+                node = WhileNode(node.condition, self.remove_dead_assignments(node.body, set(live), declarations))
+            elif isinstance(node, ForNode):
+                live |= self.reads(ForNode(None, node.condition, node.update, node.body))
+                body = self.remove_dead_assignments(node.body, set(live), declarations)
+                init = [node.init] if node.init is not None else []
+                init = self.remove_dead_assignments(init, live, declarations)
+                node = ForNode(init[0] if init else None, node.condition, node.update, body)
+            elif isinstance(node, ReturnNode):
+                # После return инструкции не выполняются
+                live.clear()
+                live |= self.reads(node)
+            elif not isinstance(node, FunctionDefNode):
+                live |= self.reads(node)
+            result.append(node)
+        result.reverse()
+        return result
+
+    def reads(self, node):
+        """Переменные, которые читает узел (тела функций - отдельная область видимости)"""
+        if isinstance(node, VariableNode):
+            return {node.name}
+        elif isinstance(node, BinaryOpNode):
+            return self.reads(node.left) | self.reads(node.right)
+        elif isinstance(node, UnaryOpNode):
+            return self.reads(node.operand)
+        elif isinstance(node, (PrintNode, AssignNode, ReturnNode)):
+            return set() if node.value is None else self.reads(node.value)
+        elif isinstance(node, CallNode):
+            return self.reads_all(node.args)
+        elif isinstance(node, IfNode):
+            branches = self.reads_all(node.then_body) | self.reads_all(node.else_body or [])
+            return self.reads(node.condition) | branches
+        elif isinstance(node, WhileNode):
+            return self.reads(node.condition) | self.reads_all(node.body)
+        elif isinstance(node, ForNode):
+            parts = [part for part in (node.init, node.condition, node.update) if part is not None]
+            return self.reads_all(parts) | self.reads_all(node.body)
+        return set()
+
+    def reads_all(self, nodes):
+        names = set()
+        for node in nodes:
+            names |= self.reads(node)
+        return names
+
+
+def optimize_ast(ast):
+    return AstOptimizer().optimize(ast)
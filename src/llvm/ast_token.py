@@ -1,8 +1,72 @@
+# Виды токенов - небольшие целые (сравниваются в парсере как числа);
+# имена видов - TOKEN_TYPES[вид], используются в сообщениях об ошибках и в repr
+EOF = 0
+NEWLINE = 1
+NUMBER = 2
+STRING = 3
+IDENTIFIER = 4
+ASSIGN = 5
+PLUS = 6
+MINUS = 7
+MULTIPLY = 8
+DIVIDE = 9
+LPAREN = 10
+RPAREN = 11
+LBRACE = 12
+RBRACE = 13
+LESS = 14
+GREATER = 15
+NOT = 16
+EQUAL = 17
+NOT_EQUAL = 18
+LESS_EQUAL = 19
+GREATER_EQUAL = 20
+AND = 21
+OR = 22
+INCREMENT = 23
+DECREMENT = 24
+PRINT = 25
+IF = 26
+ELSE = 27
+WHILE = 28
+FOR = 29
+DEF = 30
+RETURN = 31
+TRUE = 32
+FALSE = 33
+NULL = 34
+SEMICOLON = 35
+COMMA = 36
+
+# Вид -> имя
+TOKEN_TYPES = (
+    'EOF', 'NEWLINE', 'NUMBER', 'STRING', 'IDENTIFIER', 'ASSIGN', 'PLUS', 'MINUS', 'MULTIPLY',
+    'DIVIDE', 'LPAREN', 'RPAREN', 'LBRACE', 'RBRACE', 'LESS', 'GREATER', 'NOT', 'EQUAL',
+    'NOT_EQUAL', 'LESS_EQUAL', 'GREATER_EQUAL', 'AND', 'OR', 'INCREMENT', 'DECREMENT', 'PRINT',
+    'IF', 'ELSE', 'WHILE', 'FOR', 'DEF', 'RETURN', 'TRUE', 'FALSE', 'NULL', 'SEMICOLON', 'COMMA',
+)
+
+# Имя -> вид
+TOKEN_KINDS = {name: kind for kind, name in enumerate(TOKEN_TYPES)}
+
+
 class Token:
+    """
+    Токен: вид (целое, см. TOKEN_TYPES), значение и номер строки
+    __slots__ - без словаря атрибутов у каждого токена
+    Вид можно передать именем ('NUMBER') или числом (NUMBER)
+    """
+    __slots__ = ('kind', 'value', 'line')
+
     def __init__(self, type_, value, line=1):
-        self.type = type_
+        self.kind = type_ if type_.__class__ is int else TOKEN_KINDS[type_]
         self.value = value
         self.line = line
 
+    @property
+    def type(self):
+        """Имя вида токена"""
+        return TOKEN_TYPES[self.kind]
+
     def __repr__(self):
-        return f"Token({self.type}, {self.value})"
\ No newline at end of file
+        return f"Token({self.type}, {self.value})"
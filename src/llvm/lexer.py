@@ -1,4 +1,30 @@
-from src.llvm.ast_token import Token
+import re
+
+from src.llvm.ast_token import IDENTIFIER, NEWLINE, NUMBER, STRING, TOKEN_KINDS, Token
+
+# Один проход регулярным выражением по исходному тексту (см. Lexer.tokenize):
+# пробелы перед токеном и сам токен - одно совпадение, группа - вид токена,
+# значения берутся срезами текста
+# Классы символов только ASCII: остальные случаи разбирает посимвольный Lexer.read_token
+TOKEN_PATTERN = re.compile(r"""
+    [ \t]*
+  (?:
+    (?P<NEWLINE>\n)
+  | (?P<NUMBER>[0-9]+(?:\.[0-9]*)?)
+  | (?P<IDENTIFIER>[A-Za-z_][A-Za-z0-9_]*)
+  | (?P<STRING>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+  | (?P<OPERATOR>==|!=|<=|>=|&&|\|\||\+\+|--|[-=+*/(){}<>!;,])
+  )
+""", re.VERBOSE | re.DOTALL)
+
+# Escape-последовательности строк (остальные символы после \ остаются как есть)
+ESCAPES = {'n': '\n', 't': '\t'}
+ESCAPE_PATTERN = re.compile(r'\\(.)', re.DOTALL)
+
+
+def _unescape(match):
+    char = match.group(1)
+    return ESCAPES.get(char, char)
 
 
 class Lexer:
@@ -30,6 +56,8 @@ class Lexer:
         '<': 'LESS',
         '>': 'GREATER',
         '!': 'NOT',
+        ';': 'SEMICOLON',
+        ',': 'COMMA',
         '\n': 'NEWLINE'
     }
 
@@ -138,49 +166,126 @@ class Lexer:
                 return self.make_token(token_type, two_char)
         return None
 
-    def tokenize(self):
+    def read_token(self):
+        """
+        Читает один токен с текущей позиции посимвольно
+        Возвращает Token или None для пробелов; SyntaxError для неизвестного символа
+        """
+        char = self.current_char()
+
+        # Пропускаем пробелы
+        if char in self.WHITESPACE:
+            self.skip_whitespace()
+            return None
+
+        # Числа
+        if char.isdigit():
+            return self.make_token('NUMBER', self.read_number())
+
+        # Строки
+        if char in ('"', "'"):
+            return self.make_token('STRING', self.read_string())
+
+        # Идентификаторы и ключевые слова
+        if char.isalpha() or char == '_':
+            ident = self.read_identifier()
+            token_type = self.KEYWORDS.get(ident, 'IDENTIFIER')
+            return self.make_token(token_type, ident)
+
+        # Пытаемся распознать многосимвольный оператор
+        multi_token = self.try_multi_char_token()
+        if multi_token:
+            return multi_token
+
+        # Односимвольные токены
+        if char in self.SINGLE_CHAR_TOKENS:
+            token_type = self.SINGLE_CHAR_TOKENS[char]
+            token = self.make_token(token_type, char)
+            self.advance()
+            return token
+
+        # Неизвестный символ
+        raise SyntaxError(f"Неизвестный символ '{char}' на строке {self.line}")
+
+    def tokenize_by_char(self):
+        """
+        Посимвольный разбор (read_token для каждого токена); результат тот же, что у tokenize
+        """
         tokens = []
 
         while self.current_char():
-            char = self.current_char()
+            token = self.read_token()
+            if token is not None:
+                tokens.append(token)
 
-            # Пропускаем пробелы
-            if char in self.WHITESPACE:
-                self.skip_whitespace()
-                continue
+        tokens.append(self.make_token('EOF', None))
+        return tokens
 
-            # Числа
-            if char.isdigit():
-                tokens.append(self.make_token('NUMBER', self.read_number()))
-                continue
+    def tokenize(self):
+        """
+        Список всех токенов (см. iter_tokens)
+        """
+        return list(self.iter_tokens())
 
-            # Строки
-            if char in ('"', "'"):
-                tokens.append(self.make_token('STRING', self.read_string()))
-                continue
+    def iter_tokens(self):
+        """
+        Генератор токенов по требованию: следующий токен разбирается, только когда
+        его запрашивает парсер (см. StreamingParser), поэтому весь список токенов
+        не хранится. Последний токен - EOF
+        Разбор одним регулярным выражением (TOKEN_PATTERN): значения - срезы текста,
+        без посимвольных вызовов и конкатенации. Токены, номера строк и ошибки те же,
+        что у tokenize_by_char: не-ASCII символы вне строк, незакрытые строки и
+        неизвестные символы разбирает read_token
+        """
+        text = self.text
+        length = len(text)
+        match_token = TOKEN_PATTERN.match
+        # Виды токенов числами (см. ast_token): слово или оператор -> вид
+        keywords = {word: TOKEN_KINDS[name] for word, name in self.KEYWORDS.items()}
+        operators = {operator: TOKEN_KINDS[name]
+                     for operator, name in {**self.SINGLE_CHAR_TOKENS, **self.MULTI_CHAR_TOKENS}.items()}
+        pos = self.pos
+        line = self.line
 
-            # Идентификаторы и ключевые слова
-            if char.isalpha() or char == '_':
-                ident = self.read_identifier()
-                token_type = self.KEYWORDS.get(ident, 'IDENTIFIER')
-                tokens.append(self.make_token(token_type, ident))
-                continue
+        while pos < length:
+            match = match_token(text, pos)
+            kind = match.lastgroup if match is not None else None
+            end = match.end() if match is not None else pos
 
-            # Пытаемся распознать многосимвольный оператор
-            multi_token = self.try_multi_char_token()
-            if multi_token:
-                tokens.append(multi_token)
-                continue
+            if kind in ('NUMBER', 'IDENTIFIER') and end < length and text[end] >= '\x80':
+                # Продолжение не-ASCII символом (буквой, цифрой) - по правилам isalnum/isdigit
+                kind = None
 
-            # Односимвольные токены
-            if char in self.SINGLE_CHAR_TOKENS:
-                token_type = self.SINGLE_CHAR_TOKENS[char]
-                tokens.append(self.make_token(token_type, char))
-                self.advance()
+            if kind == 'NEWLINE':
+                yield Token(NEWLINE, '\n', line)
+                line += 1
+            elif kind == 'IDENTIFIER':
+                value = match.group(kind)
+                yield Token(keywords.get(value, IDENTIFIER), value, line)
+            elif kind == 'NUMBER':
+                value = match.group(kind)
+                yield Token(NUMBER, float(value) if '.' in value else int(value), line)
+            elif kind == 'OPERATOR':
+                value = match.group(kind)
+                yield Token(operators[value], value, line)
+            elif kind == 'STRING':
+                value = match.group(kind)[1:-1]
+                line += value.count('\n')
+                if '\\' in value:
+                    value = ESCAPE_PATTERN.sub(_unescape, value)
+                yield Token(STRING, value, line)
+            else:
+                # Пробелы в конце текста и редкие случаи - посимвольный разбор одного токена
+                self.pos = pos
+                self.line = line
+                token = self.read_token()
+                if token is not None:
+                    yield token
+                pos = self.pos
+                line = self.line
                 continue
+            pos = end
 
-            # Неизвестный символ
-            raise SyntaxError(f"Неизвестный символ '{char}' на строке {self.line}")
-
-        tokens.append(self.make_token('EOF', None))
-        return tokens
\ No newline at end of file
+        self.pos = pos
+        self.line = line
+        yield self.make_token('EOF', None)
@@ -0,0 +1,152 @@
+from array import array
+
+from src.llvm.nodes.ast_nodes import (
+    AssignNode, BinaryOpNode, BooleanNode, CallNode, ForNode, FunctionDefNode, IfNode, NumberNode,
+    PrintNode, ReturnNode, StringNode, UnaryOpNode, VariableNode, WhileNode
+)
+
+# Виды полей узла в арене:
+#   VALUE - номер значения в таблице values (число, строка, имя, оператор)
+#   NODE  - номер дочернего узла, -1 для None
+#   LIST  - список номеров узлов: начало и длина в items (длина -1 для None)
+#   NAMES - список значений (параметры функции): начало и длина в items
+VALUE = 0
+NODE = 1
+LIST = 2
+NAMES = 3
+
+# Число int в data для поля каждого вида
+FIELD_WIDTHS = (1, 1, 2, 2)
+
+# Раскладка строки узла: поля класса (порядок __slots__) и их виды
+# Номер класса в этом кортеже - вид узла в арене (kinds)
+NODE_LAYOUTS = (
+    (NumberNode, (VALUE,)),
+    (VariableNode, (VALUE,)),
+    (BinaryOpNode, (NODE, VALUE, NODE)),
+    (AssignNode, (VALUE, NODE)),
+    (PrintNode, (NODE,)),
+    (StringNode, (VALUE,)),
+    (BooleanNode, (VALUE,)),
+    (UnaryOpNode, (VALUE, NODE)),
+    (IfNode, (NODE, LIST, LIST)),
+    (WhileNode, (NODE, LIST)),
+    (ForNode, (NODE, NODE, NODE, LIST)),
+    (FunctionDefNode, (VALUE, NAMES, LIST)),
+    (ReturnNode, (NODE,)),
+    (CallNode, (VALUE, LIST)),
+)
+
+
+class AstArena:
+    """
+    Плоское представление AST: узел - строка параллельных массивов, адресуемая
+    номером (int) вместо объекта. kinds - вид узла (см. NODE_LAYOUTS), starts - начало
+    полей узла в data; списки (тела блоков, аргументы) лежат в items, а значения
+    (числа, имена, операторы) - в таблице values, каждое один раз
+    Узлы создаются методами с именами классов ast_nodes и теми же аргументами
+    (arena.BinaryOpNode(left, op, right) -> номер узла), поэтому арену можно передать
+    парсеру вместо модуля ast_nodes: Parser(tokens, nodes=arena)
+    """
+
+    def __init__(self):
+        self.kinds = array('B')
+        self.starts = array('I')
+        self.data = array('i')
+        self.items = array('i')
+        self.values = []
+        self.value_ids = {}
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def value_id(self, value):
+        # Номера значений по типам: 1, 1.0 и True - разные значения
+        ids = self.value_ids.get(value.__class__)
+        if ids is None:
+            ids = self.value_ids[value.__class__] = {}
+        value_id = ids.get(value)
+        if value_id is None:
+            value_id = ids[value] = len(self.values)
+            self.values.append(value)
+        return value_id
+
+    def add(self, kind, args):
+        """
+        Добавляет узел вида kind с полями args (в порядке __slots__ класса); номер узла
+        """
+        node_id = len(self.kinds)
+        self.kinds.append(kind)
+        self.starts.append(len(self.data))
+        data = self.data
+        for field_kind, arg in zip(NODE_LAYOUTS[kind][1], args):
+            if field_kind == VALUE:
+                data.append(self.value_id(arg))
+            elif field_kind == NODE:
+                data.append(-1 if arg is None else arg)
+            elif arg is None:
+                data.extend((0, -1))
+            else:
+                data.extend((len(self.items), len(arg)))
+                self.items.extend(arg if field_kind == LIST else map(self.value_id, arg))
+        return node_id
+
+    def node(self, node_id):
+        """
+        Узел-объект класса ast_nodes для строки node_id; дочерние узлы остаются номерами
+        Объект временный: CodeGenerator создает его на время посещения узла
+        """
+        cls, field_kinds = NODE_LAYOUTS[self.kinds[node_id]]
+        node = cls.__new__(cls)
+        data = self.data
+        position = self.starts[node_id]
+        for name, field_kind in zip(cls.__slots__, field_kinds):
+            if field_kind == VALUE:
+                value = self.values[data[position]]
+            elif field_kind == NODE:
+                value = data[position]
+                if value == -1:
+                    value = None
+            else:
+                start, count = data[position], data[position + 1]
+                if count == -1:
+                    value = None
+                elif field_kind == LIST:
+                    value = self.items[start:start + count].tolist()
+                else:
+                    value = [self.values[value_id] for value_id in self.items[start:start + count]]
+            setattr(node, name, value)
+            position += FIELD_WIDTHS[field_kind]
+        return node
+
+    def to_nodes(self, node_id):
+        """
+        Дерево объектов ast_nodes для узла node_id (например, для AstOptimizer)
+        """
+        node = self.node(node_id)
+        for name, field_kind in zip(node.__slots__, NODE_LAYOUTS[self.kinds[node_id]][1]):
+            value = getattr(node, name)
+            if value is None:
+                continue
+            if field_kind == NODE:
+                setattr(node, name, self.to_nodes(value))
+            elif field_kind == LIST:
+                setattr(node, name, [self.to_nodes(child) for child in value])
+        return node
+
+
+def _factory(kind):
+    cls = NODE_LAYOUTS[kind][0]
+    size = len(cls.__slots__)
+
+    def make(self, *args):
+        # Необязательные поля (else_body, значение return) - None, как в __init__ класса
+        return self.add(kind, args + (None,) * (size - len(args)))
+
+    make.__name__ = cls.__name__
+    make.__doc__ = f"Узел {cls.__name__}: номер строки в арене"
+    return make
+
+
+for _kind, (_cls, _) in enumerate(NODE_LAYOUTS):
+    setattr(AstArena, _cls.__name__, _factory(_kind))
@@ -1,63 +1,110 @@
+class Node:
+    """
+    Базовый класс узлов AST: поля перечислены в __slots__ каждого класса
+    (без словаря атрибутов у каждого узла)
+    """
+    __slots__ = ()
+
+    def fields(self):
+        """Поля узла: имя -> значение"""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
 # Базовые узлы
-class NumberNode:
+class NumberNode(Node):
+    __slots__ = ('value',)
+
     def __init__(self, value):
         self.value = value
 
-class VariableNode:
+class VariableNode(Node):
+    __slots__ = ('name',)
+
     def __init__(self, name):
         self.name = name
 
-class BinaryOpNode:
+class BinaryOpNode(Node):
+    __slots__ = ('left', 'op', 'right')
+
     def __init__(self, left, op, right):
         self.left = left
         self.op = op
         self.right = right
 
-class AssignNode:
+class AssignNode(Node):
+    __slots__ = ('name', 'value')
+
     def __init__(self, name, value):
         self.name = name
         self.value = value
 
-class PrintNode:
+class PrintNode(Node):
+    __slots__ = ('value',)
+
     def __init__(self, value):
         self.value = value
 
 # Новые узлы для расширенной функциональности
-class StringNode:
+class StringNode(Node):
+    __slots__ = ('value',)
+
     def __init__(self, value):
         self.value = value
 
-class BooleanNode:
+class BooleanNode(Node):
+    __slots__ = ('value',)
+
     def __init__(self, value):
         self.value = value  # True или False
 
-class UnaryOpNode:
+class UnaryOpNode(Node):
+    __slots__ = ('op', 'operand')
+
     def __init__(self, op, operand):
         self.op = op        # 'MINUS', 'NOT'
         self.operand = operand
 
-class IfNode:
+class IfNode(Node):
+    __slots__ = ('condition', 'then_body', 'else_body')
+
     def __init__(self, condition, then_body, else_body=None):
         self.condition = condition
         self.then_body = then_body    # список statements
         self.else_body = else_body    # список statements или None
 
-class WhileNode:
+class WhileNode(Node):
+    __slots__ = ('condition', 'body')
+
     def __init__(self, condition, body):
         self.condition = condition
         self.body = body              # список statements
 
-class FunctionDefNode:
+class ForNode(Node):
+    __slots__ = ('init', 'condition', 'update', 'body')
+
+    def __init__(self, init, condition, update, body):
+        self.init = init              # инструкция до цикла или None
+        self.condition = condition    # выражение или None (бесконечный цикл)
+        self.update = update          # инструкция после каждой итерации или None
+        self.body = body              # список statements
+
+class FunctionDefNode(Node):
+    __slots__ = ('name', 'params', 'body')
+
     def __init__(self, name, params, body):
         self.name = name              # имя функции
         self.params = params          # список параметров
         self.body = body              # список statements
 
-class ReturnNode:
+class ReturnNode(Node):
+    __slots__ = ('value',)
+
     def __init__(self, value=None):
         self.value = value            # выражение или None
 
-class CallNode:
+class CallNode(Node):
+    __slots__ = ('name', 'args')
+
     def __init__(self, name, args):
         self.name = name              # имя функции
-        self.args = args              # список аргументов
\ No newline at end of file
+        self.args = args              # список аргументов
@@ -1,36 +1,46 @@
-from src.llvm.nodes.ast_nodes import (
-    AssignNode, BinaryOpNode, NumberNode, VariableNode, PrintNode,
-    StringNode, BooleanNode  # Добавляем новые узлы если есть
+from collections import deque
+
+from src.llvm.ast_token import (
+    AND, ASSIGN, COMMA, DECREMENT, DEF, DIVIDE, ELSE, EOF, EQUAL, FALSE, FOR, GREATER, GREATER_EQUAL,
+    IDENTIFIER, IF, INCREMENT, LBRACE, LESS, LESS_EQUAL, LPAREN, MINUS, MULTIPLY, NEWLINE, NOT, NOT_EQUAL,
+    NULL, NUMBER, OR, PLUS, PRINT, RBRACE, RETURN, RPAREN, SEMICOLON, STRING, TOKEN_TYPES, TRUE, WHILE
 )
+from src.llvm.nodes import ast_nodes
 
 
 class Parser:
-    """Синтаксический анализатор - строит AST"""
+    """
+    Синтаксический анализатор - строит AST
+    nodes - фабрика узлов: модуль ast_nodes (узлы-объекты) или AstArena (узлы - номера
+    строк плоской арены, см. nodes/ast_arena)
+    """
 
     # Приоритеты операторов (чем больше число, тем выше приоритет)
+    # Ключи - виды токенов (см. ast_token); в BinaryOpNode.op записывается имя вида
     BINARY_OPERATORS = {
         # Логические операторы (самый низкий приоритет)
-        'OR': 1,
-        'AND': 2,
+        OR: 1,
+        AND: 2,
 
         # Операторы сравнения
-        'EQUAL': 3,
-        'NOT_EQUAL': 3,
-        'LESS': 4,
-        'GREATER': 4,
-        'LESS_EQUAL': 4,
-        'GREATER_EQUAL': 4,
+        EQUAL: 3,
+        NOT_EQUAL: 3,
+        LESS: 4,
+        GREATER: 4,
+        LESS_EQUAL: 4,
+        GREATER_EQUAL: 4,
 
         # Арифметические операторы
-        'PLUS': 5,
-        'MINUS': 5,
-        'MULTIPLY': 6,
-        'DIVIDE': 6
+        PLUS: 5,
+        MINUS: 5,
+        MULTIPLY: 6,
+        DIVIDE: 6
     }
 
-    def __init__(self, tokens):
+    def __init__(self, tokens, nodes=None):
         self.tokens = tokens
         self.pos = 0
+        self.nodes = ast_nodes if nodes is None else nodes
 
     def current_token(self):
         if self.pos >= len(self.tokens):
@@ -48,22 +58,22 @@ class Parser:
         if self.pos < len(self.tokens) - 1:
             self.pos += 1
 
-    def consume(self, expected_type):
-        """Проверяем и потребляем токен ожидаемого типа"""
+    def consume(self, expected_kind):
+        """Проверяем и потребляем токен ожидаемого вида (число, см. ast_token)"""
         token = self.current_token()
-        if token.type != expected_type:
-            raise SyntaxError(f"Ожидался {expected_type}, получен {token.type} на строке {token.line}")
+        if token.kind != expected_kind:
+            raise SyntaxError(f"Ожидался {TOKEN_TYPES[expected_kind]}, получен {token.type} на строке {token.line}")
         self.advance()
         return token
 
     def parse(self):
         statements = []
-        while self.current_token().type != 'EOF':
-            if self.current_token().type == 'NEWLINE':
+        while self.current_token().kind != EOF:
+            if self.current_token().kind == NEWLINE:
                 self.advance()
                 continue
             stmt = self.parse_statement()
-            if stmt:
+            if stmt is not None:
                 statements.append(stmt)
         return statements
 
@@ -71,65 +81,127 @@ class Parser:
         """Парсит различные типы инструкций"""
         token = self.current_token()
 
-        if token.type == 'IDENTIFIER':
-            # Проверяем следующий токен для определения типа инструкции
-            next_token = self.peek_token()
-            if next_token.type == 'ASSIGN':
-                return self.parse_assignment()
-            else:
-                # Это выражение-инструкция (например, вызов функции)
-                expr = self.parse_expression()
-                return expr
-
-        elif token.type == 'PRINT':
+        if token.kind == PRINT:
             return self.parse_print()
-
-        # Добавляем поддержку новых конструкций
-        elif token.type == 'IF':
+        elif token.kind == IF:
             return self.parse_if()
-        elif token.type == 'WHILE':
+        elif token.kind == WHILE:
             return self.parse_while()
-        elif token.type == 'DEF':
+        elif token.kind == FOR:
+            return self.parse_for()
+        elif token.kind == DEF:
             return self.parse_function_def()
-
-        else:
-            # Выражение-инструкция
-            return self.parse_expression()
+        elif token.kind == RETURN:
+            return self.parse_return()
+        return self.parse_simple_statement()
+
+    def parse_simple_statement(self):
+        """
+        Присваивание, i++ / i-- или выражение-инструкция (например, вызов функции);
+        такие инструкции допустимы и в заголовке for
+        """
+        if self.current_token().kind == IDENTIFIER:
+            # Проверяем следующий токен для определения типа инструкции
+            next_kind = self.peek_token().kind
+            if next_kind == ASSIGN:
+                return self.parse_assignment()
+            elif next_kind == INCREMENT or next_kind == DECREMENT:
+                return self.parse_increment()
+        return self.parse_expression()
 
     def parse_assignment(self):
         """Парсит присваивание: identifier = expression"""
-        name = self.consume('IDENTIFIER').value
-        self.consume('ASSIGN')
+        name = self.consume(IDENTIFIER).value
+        self.consume(ASSIGN)
         value = self.parse_expression()
-        return AssignNode(name, value)
+        return self.nodes.AssignNode(name, value)
+
+    def parse_increment(self):
+        """Парсит i++ и i-- как присваивание i = i + 1 (i - 1)"""
+        name = self.consume(IDENTIFIER).value
+        op = 'PLUS' if self.current_token().kind == INCREMENT else 'MINUS'
+        self.advance()
+        nodes = self.nodes
+        return nodes.AssignNode(name, nodes.BinaryOpNode(nodes.VariableNode(name), op, nodes.NumberNode(1)))
 
     def parse_print(self):
         """Парсит print statement"""
-        self.consume('PRINT')
+        self.consume(PRINT)
         value = self.parse_expression()
-        return PrintNode(value)
+        return self.nodes.PrintNode(value)
 
     def parse_if(self):
-        """Парсит if statement (заглушка для будущего расширения)"""
-        # TODO: Реализовать when добавим IfNode
-        self.consume('IF')
+        """Парсит if условие { ... } [else { ... } | else if ...]"""
+        self.consume(IF)
         condition = self.parse_expression()
-        # Пока просто возвращаем condition как выражение
-        return condition
+        then_body = self.parse_block()
+        else_body = None
+
+        # else может стоять на следующей строке после }
+        self.skip_newlines()
+        if self.current_token().kind == ELSE:
+            self.advance()
+            if self.current_token().kind == IF:
+                else_body = [self.parse_if()]
+            else:
+                else_body = self.parse_block()
+        return self.nodes.IfNode(condition, then_body, else_body)
 
     def parse_while(self):
-        """Парсит while statement (заглушка)"""
-        # TODO: Реализовать when добавим WhileNode
-        self.consume('WHILE')
+        """Парсит while условие { ... }"""
+        self.consume(WHILE)
         condition = self.parse_expression()
-        return condition
+        body = self.parse_block()
+        return self.nodes.WhileNode(condition, body)
+
+    def parse_for(self):
+        """
+        Парсит for init; условие; update { ... } (части заголовка можно опустить)
+        Например: for i = 0; i < 10; i++ { print i }
+        """
+        self.consume(FOR)
+        init = None if self.current_token().kind == SEMICOLON else self.parse_simple_statement()
+        self.consume(SEMICOLON)
+        condition = None if self.current_token().kind == SEMICOLON else self.parse_expression()
+        self.consume(SEMICOLON)
+        update = None if self.current_token().kind == LBRACE else self.parse_simple_statement()
+        body = self.parse_block()
+        return self.nodes.ForNode(init, condition, update, body)
 
     def parse_function_def(self):
-        """Парсит function definition (заглушка)"""
-        # TODO: Реализовать when добавим FunctionDefNode
-        self.consume('DEF')
-        name = self.consume('IDENTIFIER').value
-        return VariableNode(name)  # Временная заглушка
+        """Парсит def name(a, b) { ... }"""
+        self.consume(DEF)
+        name = self.consume(IDENTIFIER).value
+        self.consume(LPAREN)
+        params = []
+        if self.current_token().kind != RPAREN:
+            params.append(self.consume(IDENTIFIER).value)
+            while self.current_token().kind == COMMA:
+                self.advance()
+                params.append(self.consume(IDENTIFIER).value)
+        self.consume(RPAREN)
+        body = self.parse_block()
+        return self.nodes.FunctionDefNode(name, params, body)
+
+    def parse_return(self):
+        """Парсит return [выражение]"""
+        self.consume(RETURN)
+        if self.current_token().kind in (NEWLINE, RBRACE, EOF):
+            return self.nodes.ReturnNode()
+        return self.nodes.ReturnNode(self.parse_expression())
+
+    def parse_call(self):
+        """Парсит вызов name(arg1, arg2)"""
+        name = self.consume(IDENTIFIER).value
+        self.consume(LPAREN)
+        args = []
+        if self.current_token().kind != RPAREN:
+            args.append(self.parse_expression())
+            while self.current_token().kind == COMMA:
+                self.advance()
+                args.append(self.parse_expression())
+        self.consume(RPAREN)
+        return self.nodes.CallNode(name, args)
 
     def parse_expression(self):
         """Парсит выражение с учетом приоритета операторов"""
@@ -141,10 +213,10 @@ class Parser:
 
         while True:
             token = self.current_token()
-            if token.type not in self.BINARY_OPERATORS:
+            if token.kind not in self.BINARY_OPERATORS:
                 break
 
-            precedence = self.BINARY_OPERATORS[token.type]
+            precedence = self.BINARY_OPERATORS[token.kind]
             if precedence < min_precedence:
                 break
 
@@ -154,7 +226,7 @@ class Parser:
             # Для правоассоциативных операторов (если будут) используем precedence
             # Для левоассоциативных - precedence + 1
             right = self.parse_binary_expression(precedence + 1)
-            left = BinaryOpNode(left, op, right)
+            left = self.nodes.BinaryOpNode(left, op, right)
 
         return left
 
@@ -162,15 +234,14 @@ class Parser:
         """Парсит унарные выражения"""
         token = self.current_token()
 
-        if token.type in ['MINUS', 'NOT']:  # Унарные операторы
+        if token.kind == MINUS or token.kind == NOT:  # Унарные операторы
             op = token.type
             self.advance()
             operand = self.parse_unary_expression()
-            # TODO: Добавить UnaryOpNode когда будет нужен
             if op == 'MINUS':
-                # Временно представляем как 0 - operand
-                return BinaryOpNode(NumberNode(0), 'MINUS', operand)
-            return operand  # Пока просто возвращаем операнд для NOT
+                # -x представляем как 0 - x
+                return self.nodes.BinaryOpNode(self.nodes.NumberNode(0), 'MINUS', operand)
+            return self.nodes.UnaryOpNode(op, operand)
 
         return self.parse_primary()
 
@@ -178,53 +249,111 @@ class Parser:
         """Парсит первичные выражения"""
         token = self.current_token()
 
-        if token.type == 'NUMBER':
+        if token.kind == NUMBER:
             self.advance()
-            return NumberNode(token.value)
+            return self.nodes.NumberNode(token.value)
 
-        elif token.type == 'STRING':
+        elif token.kind == STRING:
             self.advance()
             # TODO: Добавить StringNode если нужен
-            return NumberNode(0)  # Временная заглушка
+            return self.nodes.NumberNode(0)  # Временная заглушка
 
-        elif token.type == 'TRUE':
+        elif token.kind == TRUE:
             self.advance()
             # TODO: Добавить BooleanNode если нужен
-            return NumberNode(1)  # true как 1
+            return self.nodes.NumberNode(1)  # true как 1
 
-        elif token.type == 'FALSE':
+        elif token.kind == FALSE:
             self.advance()
-            return NumberNode(0)  # false как 0
+            return self.nodes.NumberNode(0)  # false как 0
 
-        elif token.type == 'NULL':
+        elif token.kind == NULL:
             self.advance()
-            return NumberNode(0)  # null как 0
+            return self.nodes.NumberNode(0)  # null как 0
 
-        elif token.type == 'IDENTIFIER':
+        elif token.kind == IDENTIFIER:
+            if self.peek_token().kind == LPAREN:
+                return self.parse_call()
             self.advance()
-            return VariableNode(token.value)
+            return self.nodes.VariableNode(token.value)
 
-        elif token.type == 'LPAREN':
+        elif token.kind == LPAREN:
             self.advance()
             expr = self.parse_expression()
-            self.consume('RPAREN')
+            self.consume(RPAREN)
             return expr
 
         else:
             raise SyntaxError(f"Неожиданный токен: {token.type} ({token.value}) на строке {token.line}")
 
+    def skip_newlines(self):
+        while self.current_token().kind == NEWLINE:
+            self.advance()
+
     def parse_block(self):
-        """Парсит блок кода в фигурных скобках (для будущего использования)"""
+        """Парсит блок кода в фигурных скобках"""
         statements = []
-        self.consume('LBRACE')
+        self.consume(LBRACE)
 
-        while self.current_token().type != 'RBRACE' and self.current_token().type != 'EOF':
-            if self.current_token().type == 'NEWLINE':
+        while self.current_token().kind != RBRACE and self.current_token().kind != EOF:
+            if self.current_token().kind == NEWLINE:
                 self.advance()
                 continue
             stmt = self.parse_statement()
-            if stmt:
+            if stmt is not None:
                 statements.append(stmt)
 
-        self.consume('RBRACE')
-        return statements
\ No newline at end of file
+        self.consume(RBRACE)
+        return statements
+
+
+class StreamingParser(Parser):
+    """
+    Парсер потока токенов (например, Lexer.iter_tokens()): токены читаются по мере
+    разбора в небольшое окно просмотра вперед, поэтому в памяти одновременно только
+    AST и несколько токенов, а разбор начинается до окончания лексического анализа
+    Результат parse() тот же, что у Parser для списка токенов
+    """
+
+    # Наибольший просмотр вперед (peek_token) в правилах грамматики
+    LOOKAHEAD = 2
+
+    def __init__(self, tokens, nodes=None):
+        super().__init__([], nodes)
+        self.stream = iter(tokens)
+        self.window = deque()
+        self.eof = None
+        self.fill(self.LOOKAHEAD)
+
+    def fill(self, size):
+        """
+        Дочитывает токены из потока, пока в окне меньше size токенов; после EOF
+        окно дополняется тем же токеном EOF, как индексы за концом списка в Parser
+        """
+        window = self.window
+        while len(window) < size:
+            if self.eof is None:
+                token = next(self.stream)
+                if token.kind == EOF:
+                    self.eof = token
+                window.append(token)
+            else:
+                window.append(self.eof)
+
+    def current_token(self):
+        return self.window[0]
+
+    def peek_token(self, offset=1):
+        """Смотрим следующий токен без продвижения"""
+        if offset >= len(self.window):
+            self.fill(offset + 1)
+        return self.window[offset]
+
+    def advance(self):
+        # Как в Parser: позиция не уходит дальше EOF
+        window = self.window
+        if window[0].kind != EOF:
+            window.popleft()
+            self.pos += 1
+            if len(window) < self.LOOKAHEAD:
+                self.fill(self.LOOKAHEAD)
@@ -6,21 +6,32 @@
 - Арифметические операции (+, -, *, /)
 - Переменные
 - Вывод (print)
+- Сравнения (==, !=, <, >, <=, >=) и логические операторы (&&, || с коротким вычислением, !)
+- if/else, while, for init; условие; update { ... }
+- Функции: def name(a, b) { ... return a + b }
 
 Пример программы:
 x = 10
 y = 20
 z = x + y * 2
 print z
+for i = 0; i < 3; i++ {
+    print i
+}
 """
 
 import llvmlite.binding as llvm
 import llvmlite.ir as ir
 from llvmlite import binding
 
+from ast_optimizer import AstOptimizer
 from lexer import Lexer
-from parser import Parser
-from src.llvm.nodes.ast_nodes import NumberNode, VariableNode, BinaryOpNode, AssignNode, PrintNode
+from parser import Parser, StreamingParser
+from src.llvm.nodes.ast_arena import AstArena
+from src.llvm.nodes.ast_nodes import (
+    AssignNode, BinaryOpNode, CallNode, ForNode, FunctionDefNode, IfNode, NumberNode, PrintNode, ReturnNode,
+    UnaryOpNode, VariableNode, WhileNode
+)
 
 # Инициализация LLVM
 llvm.initialize()
@@ -28,51 +39,143 @@ llvm.initialize_native_target()
 llvm.initialize_native_asmprinter()
 
 
+# Целые языка - i32; условия (i1) приводятся к 0/1
+I32 = ir.IntType(32)
+I1 = ir.IntType(1)
+
+# Операторы сравнения -> предикат icmp (знаковое сравнение)
+COMPARISONS = {
+    'EQUAL': '==',
+    'NOT_EQUAL': '!=',
+    'LESS': '<',
+    'GREATER': '>',
+    'LESS_EQUAL': '<=',
+    'GREATER_EQUAL': '>=',
+}
+
+
 class CodeGenerator:
-    """Генератор LLVM IR кода"""
+    """
+    Генератор LLVM IR кода
+    arena - AstArena, если AST построен в плоской арене: тогда узлы - номера строк арены
+    Управляющие конструкции (if/else, while, for, && и ||) - базовые блоки и переходы,
+    функции (def) - отдельные функции LLVM с параметрами i32
+    """
+
+    def __init__(self, arena=None):
+        self.arena = arena
 
-    def __init__(self):
         # Создаем модуль LLVM
         self.module = ir.Module("my_language")
 
         # Создаем главную функцию
-        func_type = ir.FunctionType(ir.IntType(32), [])
+        func_type = ir.FunctionType(I32, [])
         self.main_func = ir.Function(self.module, func_type, "main")
         self.block = self.main_func.append_basic_block("entry")
         self.builder = ir.IRBuilder(self.block)
 
-        # Словарь для переменных (указатели на память)
+        # Текущая функция и ее переменные (указатели на память в entry-блоке функции)
+        self.function = self.main_func
         self.variables = {}
 
+        # Функции программы: имя -> ir.Function
+        self.functions = {}
+
         # Объявляем функцию printf для вывода
-        printf_type = ir.FunctionType(ir.IntType(32), [ir.IntType(8).as_pointer()], var_arg=True)
+        printf_type = ir.FunctionType(I32, [ir.IntType(8).as_pointer()], var_arg=True)
         self.printf = ir.Function(self.module, printf_type, "printf")
 
+        # Строка формата для printf - одна константа модуля на все print
+        fmt_str = "%d\n\0"
+        fmt_arg = ir.Constant(ir.ArrayType(ir.IntType(8), len(fmt_str)),
+                              bytearray(fmt_str.encode("utf8")))
+        self.fmt = ir.GlobalVariable(self.module, fmt_arg.type, name="fmt")
+        self.fmt.linkage = 'internal'
+        self.fmt.global_constant = True
+        self.fmt.initializer = fmt_arg
+
     def generate(self, ast):
         """Генерирует код для списка инструкций"""
+        # Функции верхнего уровня объявляются заранее: вызов может стоять до определения
         for node in ast:
-            self.visit(node)
+            node = self.resolve(node)
+            if isinstance(node, FunctionDefNode):
+                self.declare_function(node)
+
+        self.visit_statements(ast)
 
         # Возвращаем 0 из main
-        self.builder.ret(ir.Constant(ir.IntType(32), 0))
+        if not self.builder.block.is_terminated:
+            self.builder.ret(ir.Constant(I32, 0))
 
         return str(self.module)
 
+    def resolve(self, node):
+        """Узел-объект; узел арены - временный объект, дочерние узлы остаются номерами"""
+        if node.__class__ is int:
+            return self.arena.node(node)
+        return node
+
     def visit(self, node):
         """Диспетчер для разных типов узлов AST"""
+        node = self.resolve(node)
         if isinstance(node, NumberNode):
             return self.visit_number(node)
         elif isinstance(node, VariableNode):
             return self.visit_variable(node)
         elif isinstance(node, BinaryOpNode):
             return self.visit_binary_op(node)
+        elif isinstance(node, UnaryOpNode):
+            return self.visit_unary_op(node)
         elif isinstance(node, AssignNode):
             return self.visit_assign(node)
         elif isinstance(node, PrintNode):
             return self.visit_print(node)
+        elif isinstance(node, IfNode):
+            return self.visit_if(node)
+        elif isinstance(node, WhileNode):
+            return self.visit_while(node)
+        elif isinstance(node, ForNode):
+            return self.visit_for(node)
+        elif isinstance(node, FunctionDefNode):
+            return self.visit_function_def(node)
+        elif isinstance(node, ReturnNode):
+            return self.visit_return(node)
+        elif isinstance(node, CallNode):
+            return self.visit_call(node)
+
+    def visit_statements(self, statements):
+        """
+        Инструкции блока; инструкции после return недостижимы и попадают в отдельный
+        блок без входов (переменные в них все равно объявляются, LLVM удаляет такой блок)
+        """
+        for node in statements:
+            if self.builder.block.is_terminated:
+                self.builder.position_at_end(self.append_block('unreachable'))
+            self.visit(node)
+
+    def append_block(self, name):
+        return self.function.append_basic_block(name)
+
+    def truth(self, value):
+        """Условие i1 из значения i32 (не ноль - истина)"""
+        return self.builder.icmp_signed('!=', value, ir.Constant(I32, 0))
+
+    def variable_pointer(self, name):
+        """
+        Память переменной в текущей функции; создается в entry-блоке до его перехода
+        (alloca в теле цикла выделяла бы стек на каждой итерации), начальное значение 0
+        """
+        pointer = self.variables.get(name)
+        if pointer is None:
+            with self.builder.goto_entry_block():
+                pointer = self.builder.alloca(I32, name=name)
+                self.builder.store(ir.Constant(I32, 0), pointer)
+            self.variables[name] = pointer
+        return pointer
 
     def visit_number(self, node):
-        return ir.Constant(ir.IntType(32), node.value)
+        return ir.Constant(I32, node.value)
 
     def visit_variable(self, node):
         if node.name not in self.variables:
@@ -80,10 +183,16 @@ class CodeGenerator:
         return self.builder.load(self.variables[node.name])
 
     def visit_binary_op(self, node):
+        if node.op == 'AND' or node.op == 'OR':
+            return self.visit_logical_op(node)
+
         left = self.visit(node.left)
         right = self.visit(node.right)
 
-        if node.op == 'PLUS':
+        if node.op in COMPARISONS:
+            condition = self.builder.icmp_signed(COMPARISONS[node.op], left, right)
+            return self.builder.zext(condition, I32)
+        elif node.op == 'PLUS':
             return self.builder.add(left, right)
         elif node.op == 'MINUS':
             return self.builder.sub(left, right)
@@ -92,54 +201,212 @@ class CodeGenerator:
         elif node.op == 'DIVIDE':
             return self.builder.sdiv(left, right)
 
+    def visit_logical_op(self, node):
+        """
+        a && b и a || b с коротким вычислением: b вычисляется в отдельном блоке,
+        только если a не определяет результат; результат (0 или 1) - phi в блоке слияния
+        """
+        builder = self.builder
+        left = self.truth(self.visit(node.left))
+        left_block = builder.block
+        right_block = self.append_block('logic.right')
+        end_block = self.append_block('logic.end')
+        if node.op == 'AND':
+            builder.cbranch(left, right_block, end_block)
+        else:
+            builder.cbranch(left, end_block, right_block)
+
+        builder.position_at_end(right_block)
+        right = self.truth(self.visit(node.right))
+        # Правая часть сама может состоять из нескольких блоков
+        right_block = builder.block
+        builder.branch(end_block)
+
+        builder.position_at_end(end_block)
+        result = builder.phi(I1)
+        result.add_incoming(ir.Constant(I1, int(node.op == 'OR')), left_block)
+        result.add_incoming(right, right_block)
+        return builder.zext(result, I32)
+
+    def visit_unary_op(self, node):
+        operand = self.visit(node.operand)
+        if node.op == 'NOT':
+            return self.builder.zext(self.builder.icmp_signed('==', operand, ir.Constant(I32, 0)), I32)
+        elif node.op == 'MINUS':
+            return self.builder.neg(operand)
+
     def visit_assign(self, node):
         value = self.visit(node.value)
 
-        # Создаем переменную если её ещё нет
-        if node.name not in self.variables:
-            var_ptr = self.builder.alloca(ir.IntType(32), name=node.name)
-            self.variables[node.name] = var_ptr
-
-        # Сохраняем значение
-        self.builder.store(value, self.variables[node.name])
+        # Сохраняем значение (переменная создается при первом присваивании)
+        self.builder.store(value, self.variable_pointer(node.name))
 
     def visit_print(self, node):
         value = self.visit(node.value)
 
-        # Создаем строку формата для printf
-        fmt_str = "%d\n\0"
-        fmt_arg = ir.Constant(ir.ArrayType(ir.IntType(8), len(fmt_str)),
-                              bytearray(fmt_str.encode("utf8")))
-        fmt_ptr = self.builder.alloca(fmt_arg.type)
-        self.builder.store(fmt_arg, fmt_ptr)
-        fmt_ptr = self.builder.gep(fmt_ptr, [ir.Constant(ir.IntType(32), 0),
-                                             ir.Constant(ir.IntType(32), 0)])
+        zero = ir.Constant(I32, 0)
+        fmt_ptr = self.builder.gep(self.fmt, [zero, zero], inbounds=True)
 
         # Вызываем printf
         self.builder.call(self.printf, [fmt_ptr, value])
 
-
-def compile_and_run(source_code):
-    """Компилирует и выполняет код"""
+    def visit_if(self, node):
+        builder = self.builder
+        condition = self.truth(self.visit(node.condition))
+        then_block = self.append_block('if.then')
+        else_block = self.append_block('if.else') if node.else_body is not None else None
+        end_block = self.append_block('if.end')
+        builder.cbranch(condition, then_block, else_block or end_block)
+
+        builder.position_at_end(then_block)
+        self.visit_statements(node.then_body)
+        if not builder.block.is_terminated:
+            builder.branch(end_block)
+
+        if else_block is not None:
+            builder.position_at_end(else_block)
+            self.visit_statements(node.else_body)
+            if not builder.block.is_terminated:
+                builder.branch(end_block)
+
+        builder.position_at_end(end_block)
+
+    def visit_while(self, node):
+        builder = self.builder
+        cond_block = self.append_block('while.cond')
+        body_block = self.append_block('while.body')
+        end_block = self.append_block('while.end')
+        builder.branch(cond_block)
+
+        builder.position_at_end(cond_block)
+        builder.cbranch(self.truth(self.visit(node.condition)), body_block, end_block)
+
+        builder.position_at_end(body_block)
+        self.visit_statements(node.body)
+        if not builder.block.is_terminated:
+            builder.branch(cond_block)
+
+        builder.position_at_end(end_block)
+
+    def visit_for(self, node):
+        builder = self.builder
+        if node.init is not None:
+            self.visit(node.init)
+
+        cond_block = self.append_block('for.cond')
+        body_block = self.append_block('for.body')
+        update_block = self.append_block('for.update')
+        end_block = self.append_block('for.end')
+        builder.branch(cond_block)
+
+        builder.position_at_end(cond_block)
+        if node.condition is None:
+            builder.branch(body_block)
+        else:
+            builder.cbranch(self.truth(self.visit(node.condition)), body_block, end_block)
+
+        builder.position_at_end(body_block)
+        self.visit_statements(node.body)
+        if not builder.block.is_terminated:
+            builder.branch(update_block)
+
+        builder.position_at_end(update_block)
+        if node.update is not None:
+            self.visit(node.update)
+        builder.branch(cond_block)
+
+        builder.position_at_end(end_block)
+
+    def declare_function(self, node):
+        if node.name in self.module.globals:
+            raise NameError(f"Функция '{node.name}' уже определена")
+        func_type = ir.FunctionType(I32, [I32] * len(node.params))
+        function = ir.Function(self.module, func_type, node.name)
+        self.functions[node.name] = function
+        return function
+
+    def visit_function_def(self, node):
+        """
+        Тело функции генерируется в ее собственные блоки; переменные функции - ее
+        параметры и локальные присваивания (переменные main не видны)
+        """
+        function = self.functions.get(node.name)
+        if function is None or not function.is_declaration:
+            function = self.declare_function(node)
+
+        saved = self.function, self.builder, self.variables
+        self.function = function
+        self.builder = ir.IRBuilder(function.append_basic_block('entry'))
+        self.variables = {}
+        try:
+            for name, argument in zip(node.params, function.args):
+                argument.name = name
+                self.builder.store(argument, self.variable_pointer(name))
+
+            self.visit_statements(node.body)
+            if not self.builder.block.is_terminated:
+                self.builder.ret(ir.Constant(I32, 0))
+        finally:
+            self.function, self.builder, self.variables = saved
+
+    def visit_return(self, node):
+        value = ir.Constant(I32, 0) if node.value is None else self.visit(node.value)
+        self.builder.ret(value)
+
+    def visit_call(self, node):
+        function = self.functions.get(node.name)
+        if function is None:
+            raise NameError(f"Функция '{node.name}' не определена")
+        if len(node.args) != len(function.args):
+            raise TypeError(f"Функция '{node.name}' ожидает {len(function.args)} аргументов, "
+                            f"передано {len(node.args)}")
+        return self.builder.call(function, [self.visit(arg) for arg in node.args])
+
+
+def format_node(node):
+    return f"{type(node).__name__}: {node.fields()}"
+
+
+def compile_and_run(source_code, optimize=True, stream=False, arena=False):
+    """
+    Компилирует и выполняет код (optimize - свертка констант и удаление мертвых присваиваний
+    в AST, затем оптимизация LLVM IR уровня O2 перед JIT)
+    stream - токены читаются парсером по мере разбора (Lexer.iter_tokens, StreamingParser),
+    список токенов не строится и не печатается
+    arena - AST строится в плоской арене (AstArena) и обходится генератором без дерева
+    объектов; AstOptimizer работает с узлами-объектами, поэтому AST не оптимизируется
+    """
     print("=== Исходный код ===")
     print(source_code)
-    print("\n=== Токены ===")
 
     # Лексический анализ
     lexer = Lexer(source_code)
-    tokens = lexer.tokenize()
-    print([t for t in tokens if t.type != 'EOF'])
+    nodes = AstArena() if arena else None
+    if stream:
+        parser = StreamingParser(lexer.iter_tokens(), nodes)
+    else:
+        print("\n=== Токены ===")
+        tokens = lexer.tokenize()
+        print([t for t in tokens if t.type != 'EOF'])
+        parser = Parser(tokens, nodes)
 
     print("\n=== AST (упрощенно) ===")
     # Синтаксический анализ
-    parser = Parser(tokens)
     ast = parser.parse()
     for node in ast:
-        print(f"{type(node).__name__}: {node.__dict__}")
+        print(format_node(nodes.node(node) if arena else node))
+
+    if optimize and not arena:
+        optimizer = AstOptimizer()
+        ast = optimizer.optimize(ast)
+        print(f"\n=== AST после оптимизации (свернуто {optimizer.folded}, "
+              f"подставлено {optimizer.propagated}, удалено {optimizer.removed}) ===")
+        for node in ast:
+            print(format_node(node))
 
     print("\n=== LLVM IR ===")
     # Генерация кода
-    generator = CodeGenerator()
+    generator = CodeGenerator(nodes)
     llvm_ir = generator.generate(ast)
     print(llvm_ir)
 
@@ -148,6 +415,15 @@ def compile_and_run(source_code):
     try:
         # Создаем LLVM модуль
         llvm_module = binding.parse_assembly(llvm_ir)
+        llvm_module.verify()
+
+        if optimize:
+            # Переменные циклов из памяти (alloca) переходят в регистры (mem2reg) и т.д.
+            pass_builder = binding.PassManagerBuilder()
+            pass_builder.opt_level = 2
+            pass_manager = binding.ModulePassManager()
+            pass_builder.populate(pass_manager)
+            pass_manager.run(llvm_module)
 
         # Создаем движок выполнения
         target = binding.Target.from_default_triple()
@@ -184,6 +460,17 @@ print z
 print x
 result = z - x
 print result
+
+def fib(n) {
+    if n < 2 {
+        return n
+    }
+    return fib(n - 1) + fib(n - 2)
+}
+
+for i = 0; i < 10 && result > 0; i++ {
+    print fib(i)
+}
 """
 
     compile_and_run(code)
@@ -1,37 +1,90 @@
+from batch_runner import run_batch  # пакетный запуск: run_batch("каталог или манифест")
+from bytecode_vm import run_program
+from front_end import strip_source
 from lexical_analysis import LexicalAnalysis
+from output import Output
+from phase1_format import load_phase1, save_phase1
+from profiler import Profiler
+from program_cache import interpret_cached
 from simple_interpreter import SimpleInterpreter
 import os
 
 from transpiler_functions import example_usage
 
 
-def run(file_name):
+def run(file_name, verbosity="trace", engine="interpreter", cache=True, profile=False, optimize=True,
+        stream=False):
+    """
+    verbosity: 'silent', 'program' (только вывод программы) или 'trace'
+    engine: 'interpreter' (построчный SimpleInterpreter) или 'vm' (байткод, см. bytecode_vm.py)
+    cache: использовать кэш разобранной программы в __codecache__ (см. program_cache.py)
+    profile: профилировать выполнение (только для 'interpreter'); отчет печатается,
+             данные сохраняются в <имя>.profile.json и <имя>.collapsed (для flame graph)
+    optimize: свертка констант и удаление мертвого кода перед выполнением (см. program_optimizer.py)
+    stream: потоковое выполнение без чтения всего файла (SimpleInterpreter.execute_stream) -
+            для очень больших программ; функции должны быть определены до вызова,
+            cache, optimize и engine='vm' в этом режиме не используются
+    """
+    if engine not in ("interpreter", "vm"):
+        print(f"Ошибка: неизвестный движок '{engine}' (используйте 'interpreter' или 'vm')")
+        return
     if not file_name.endswith(".code"):
         print("Ошибка: файл должен иметь расширение .code")
         return
-    interpreter = SimpleInterpreter()
-
+    output = Output(verbosity)
+    interpreter = SimpleInterpreter(output)
+
+    if stream:
+        if engine == "vm":
+            print("Предупреждение: потоковый режим поддерживается только для движка 'interpreter'")
+        profiler = Profiler().attach(interpreter) if profile else None
+        output.trace("================== RUN TIME (stream) ==================")
+        with open(file_name, "r") as file:
+            interpreter.execute_stream(file)
+        if profiler is not None:
+            print(profiler.report())
+        return
 
     with open(file_name, "r") as file:
         test_code = file.read()
 
-    lines = interpreter.interpretation(test_code)
-    print("================== RUN TIME ==================")
-    interpreter.execute_lines(lines)
-
-
-def compile_to_py(file_name):
+    if cache:
+        lines = interpret_cached(interpreter, file_name, test_code, optimize=optimize)
+    else:
+        lines = interpreter.interpretation(test_code, optimize=optimize)
+    # Оптимизатор переписывает строки (свернутые константы), ошибки цитируют исходный текст
+    source_lines = strip_source(test_code) if optimize else None
+    output.trace("================== RUN TIME ==================")
+    if engine == "vm":
+        if profile:
+            print("Предупреждение: профилирование поддерживается только для движка 'interpreter'")
+        run_program(interpreter, lines, source_lines)
+    else:
+        profiler = Profiler().attach(interpreter) if profile else None
+        interpreter.execute_lines(lines, source_lines)
+        if profiler is not None:
+            base_name = os.path.splitext(file_name)[0]
+            print(profiler.report())
+            profiler.save_json(base_name + ".profile.json")
+            profiler.save_collapsed(base_name + ".collapsed")
+
+
+def compile_to_py(file_name, verbosity="trace", cache=True):
     if not file_name.endswith(".code"):
         print("Ошибка: файл должен иметь расширение .code")
         return
 
-    interpreter = SimpleInterpreter()
+    output = Output(verbosity)
+    interpreter = SimpleInterpreter(output)
 
     with open(file_name, "r") as file:
         test_code = file.read()
 
-    print("========= COMPILE TIME =========")
-    compiled_code = interpreter.interpretation(test_code)
+    output.trace("========= COMPILE TIME =========")
+    if cache:
+        compiled_code = interpret_cached(interpreter, file_name, test_code)
+    else:
+        compiled_code = interpreter.interpretation(test_code)
 
     # Имя выходного файла
     output_file = os.path.splitext(file_name)[0] + ".py"
@@ -41,49 +94,57 @@ def compile_to_py(file_name):
         for line in compiled_code:
             file.write(line + "\n")
 
-    print(f"Компиляция завершена: {output_file}")
+    output.trace(f"Компиляция завершена: {output_file}")
+    output.flush()
 
-def process_to_phase1(file_name):
+def process_to_phase1(file_name, verbosity="trace"):
+    """
+    ФАЗА 1: LexicalAnalysis и запись результата в двоичный файл .phase1 (см. phase1_format.py)
+    """
     if not file_name.endswith(".code"):
         print("Ошибка: файл должен иметь расширение .code")
         return
 
-    analisys = LexicalAnalysis()
+    output = Output(verbosity)
+    analisys = LexicalAnalysis(output)
 
     with open(file_name, "r") as file:
         test_code = file.read()
 
-    print("========= PHASE 1 LexicalAnalysis =========")
-    compiled_code = analisys.invoke(test_code)
+    output.trace("========= PHASE 1 LexicalAnalysis =========")
+    analisys.invoke(test_code)
 
     # Имя выходного файла
     output_file = os.path.splitext(file_name)[0] + ".phase1"
-
-    # Запись всех строк в новый .py файл
-    with open(output_file, "w") as file:
-        for line in compiled_code:
-            file.write(line + "\n")
-
-def process_to_phase2(file_name):
+    save_phase1(output_file, analisys.program, analisys.functions, analisys.classes)
+    output.trace(f"Результат фазы 1 сохранен: {output_file}")
+    output.flush()
+
+def process_to_phase2(file_name, verbosity="trace", execute=True):
+    """
+    ФАЗА 2: загружает .phase1 (с отображением в память, без повторного разбора текста),
+    компилирует тела функций и выполняет программу (execute=False - только загрузка)
+    Возвращает интерпретатор и строки программы
+    """
     if not file_name.endswith(".phase1"):
         print("Ошибка: файл должен иметь расширение .phase1")
         return
 
-    interpreter = SimpleInterpreter()
+    output = Output(verbosity)
+    interpreter = SimpleInterpreter(output)
 
-    with open(file_name, "r") as file:
-        test_code = file.read()
-
-    print("========= PHASE 2 =========")
-    compiled_code = interpreter.interpretation(test_code)
-
-    # Имя выходного файла
-    output_file = os.path.splitext(file_name)[0] + ".phase1"
+    try:
+        phase1 = load_phase1(file_name)
+    except ValueError as e:
+        print(f"Ошибка: {e}")
+        return
 
-    # Запись всех строк в новый .py файл
-    with open(output_file, "w") as file:
-        for line in compiled_code:
-            file.write(line + "\n")
+    output.trace("========= PHASE 2 =========")
+    lines = interpreter.load_phase1(phase1)
+    if execute:
+        output.trace("================== RUN TIME ==================")
+        interpreter.execute_lines(lines)
+    return interpreter, lines
 
 
 if __name__ == "__main__":
@@ -0,0 +1,52 @@
+from collections import OrderedDict
+
+# Число результатов в кэше одной чистой функции по умолчанию
+MEMO_CACHE_SIZE = 1024
+
+# Типы параметров, по которым можно кэшировать (значения хэшируемые и неизменяемые)
+MEMO_PARAM_TYPES = ('int', 'float', 'string', 'bool')
+
+
+class MemoCache:
+    """
+    Кэш результатов чистой функции: кортеж аргументов -> (значение, тип)
+    Ограничен по размеру, при переполнении вытесняется давно не использованный результат (LRU)
+    Аргументы уже преобразованы к типам параметров, поэтому кортеж значений однозначно
+    задает типизированный вызов
+    """
+    __slots__ = ('maxsize', 'results', 'hits', 'misses')
+
+    def __init__(self, maxsize=MEMO_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.results = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        result = self.results.get(key)
+        if result is None:
+            self.misses += 1
+            return None
+        self.results.move_to_end(key)
+        self.hits += 1
+        return result
+
+    def put(self, key, result):
+        self.results[key] = result
+        if len(self.results) > self.maxsize:
+            self.results.popitem(last=False)
+
+    def clear(self):
+        self.results.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self.results), 'maxsize': self.maxsize}
+
+    def __getstate__(self):
+        # В кэш программы (program_cache) результаты не сохраняются
+        return (self.maxsize,)
+
+    def __setstate__(self, state):
+        self.__init__(*state)
@@ -0,0 +1,113 @@
+import copy
+
+from front_end import parse_call
+
+
+class Instance:
+    """
+    Объект класса: ссылка на описание класса и значения полей по слотам
+    Слоты назначаются при разборе класса (см. build_class_layout), поэтому объект -
+    плоский список значений без словаря имен; типы полей хранятся в классе
+    """
+    __slots__ = ('cls', 'fields')
+
+    def __init__(self, cls, fields):
+        self.cls = cls
+        self.fields = fields
+
+    def __str__(self):
+        names = self.cls['field_names']
+        return f"{self.cls['name']}(" + ', '.join(f"{name}={value}" for name, value in zip(names, self.fields)) + ")"
+
+    def __repr__(self):
+        return str(self)
+
+    def __deepcopy__(self, memo):
+        # Описание класса общее, копируются только значения полей (см. snapshot)
+        clone = Instance(self.cls, None)
+        memo[id(self)] = clone
+        clone.fields = copy.deepcopy(self.fields, memo)
+        return clone
+
+
+class InlineCache:
+    """
+    Кэш места вызова или обращения к полю: класс последнего объекта и найденный для него
+    результат (метод или (слот, тип поля)). Пока объекты в этом месте одного класса
+    (мономорфный вызов), поиск по словарям класса не выполняется
+    В кэш программы (program_cache) содержимое не сохраняется
+    """
+    __slots__ = ('cls', 'entry')
+
+    def __init__(self):
+        self.cls = None
+        self.entry = None
+
+    def __reduce__(self):
+        return InlineCache, ()
+
+
+def parse_field(word):
+    """
+    Обращение к полю 'p.x' -> ('p', 'x') или None (числа вида 1.5 - не поля)
+    """
+    receiver, dot, field_name = word.partition('.')
+    if dot and receiver.isidentifier() and field_name.isidentifier():
+        return receiver, field_name
+    return None
+
+
+def parse_new(parts):
+    """
+    Создание объекта 'new Point(1, 2)' (слова выражения) -> ('Point', ['1', '2']) или None
+    """
+    if len(parts) != 2 or parts[0] != 'new' or not parts[1].endswith(')'):
+        return None
+    return parse_call(parts[1])
+
+
+def build_class_layout(class_info, fields):
+    """
+    Раскладка полей класса: fields - объявления [(имя, тип, выражение по умолчанию)]
+    в порядке класса; повторное объявление поля заменяет тип и значение по умолчанию
+    """
+    field_slots = {}
+    field_types = []
+    defaults = []
+    for name, field_type, default in fields:
+        if name in field_slots:
+            field_types[field_slots[name]] = field_type
+            defaults[field_slots[name]] = default
+            continue
+        field_slots[name] = len(field_types)
+        field_types.append(field_type)
+        defaults.append(default)
+
+    class_info['fields'] = list(fields)
+    class_info['field_names'] = tuple(field_slots)
+    class_info['field_slots'] = field_slots
+    class_info['field_types'] = field_types
+    class_info['variables'] = dict(zip(field_slots, field_types))
+    return defaults
+
+
+def field_entry(class_info, field_name):
+    """
+    (слот, тип) поля класса; AttributeError, если поля нет
+    """
+    slot = class_info['field_slots'].get(field_name)
+    if slot is None:
+        raise AttributeError(f"У класса {class_info['name']} нет поля '{field_name}'")
+    return slot, class_info['field_types'][slot]
+
+
+def receiver_instance(receiver_name, receiver):
+    """
+    Объект из пары (значение, тип) переменной receiver_name
+    """
+    if receiver is None:
+        raise NameError(f"Переменная '{receiver_name}' не найдена")
+    instance = receiver[0]
+    if instance.__class__ is not Instance:
+        raise TypeError(f"Переменная '{receiver_name}' типа '{receiver[1]}' не является объектом")
+    return instance
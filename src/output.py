@@ -0,0 +1,73 @@
+import sys
+
+# Уровни подробности вывода
+SILENT = 0      # ничего не выводить
+PROGRAM = 1     # только вывод самой программы (print, результаты call) и ошибки
+TRACE = 2       # плюс служебные сообщения интерпретатора (создание переменных, вызовы, найденные функции)
+
+LEVELS = {
+    'silent': SILENT,
+    'program': PROGRAM,
+    'trace': TRACE,
+}
+
+# Размер буфера (в символах), после которого вывод сбрасывается в поток
+DEFAULT_BUFFER_SIZE = 64 * 1024
+
+
+class Output:
+    """
+    Буферизованный вывод интерпретатора с уровнями подробности
+    Строки копятся в списке и записываются в поток одним вызовом write
+    при переполнении буфера или при явном flush()
+    """
+
+    def __init__(self, level=TRACE, stream=None, buffer_size=DEFAULT_BUFFER_SIZE):
+        if isinstance(level, str):
+            if level not in LEVELS:
+                raise ValueError(f"Неизвестный уровень вывода '{level}' (допустимые: {', '.join(LEVELS)})")
+            level = LEVELS[level]
+
+        self.level = level
+        self.stream = stream            # None - текущий sys.stdout на момент сброса
+        self.buffer_size = buffer_size
+        self.buffer = []
+        self.buffered = 0
+
+        # Число сообщений об ошибках (считаются на всех уровнях, в том числе silent)
+        self.error_count = 0
+
+        # Флаги для проверки перед форматированием дорогих сообщений
+        self.tracing = level >= TRACE
+        self.enabled = level >= PROGRAM
+
+    def write(self, text):
+        self.buffer.append(text)
+        self.buffered += len(text)
+        if self.buffered >= self.buffer_size:
+            self.flush()
+
+    def program(self, message):
+        """Вывод программы: print и результаты call"""
+        if self.enabled:
+            self.write(message + '\n')
+
+    def error(self, message):
+        """Сообщения об ошибках (выводятся на всех уровнях, кроме silent)"""
+        self.error_count += 1
+        if self.enabled:
+            self.write(message + '\n')
+
+    def trace(self, message):
+        """Служебные сообщения интерпретатора"""
+        if self.tracing:
+            self.write(message + '\n')
+
+    def flush(self):
+        if not self.buffer:
+            return
+        stream = self.stream if self.stream is not None else sys.stdout
+        stream.write(''.join(self.buffer))
+        stream.flush()
+        self.buffer = []
+        self.buffered = 0
@@ -0,0 +1,251 @@
+import mmap
+import struct
+import sys
+from array import array
+
+from block_index import BlockIndex
+from front_end import ParsedProgram
+
+# Двоичный формат .phase1 (результат LexicalAnalysis для фазы 2):
+#   заголовок: сигнатура, версия формата, число секций, длины секций
+#   секции - массивы int32 (порядок байт little-endian), кроме байтов строк:
+#     строки: все строки программы (строки, слова, имена, типы) в UTF-8 через '\n'
+#             (строки программы не содержат перевода строки), каждая хранится один раз,
+#             остальные секции ссылаются на них по номеру
+#     строки программы, начала слов каждой строки, слова,
+#     индекс блоков (ends, parents), определения, основная программа,
+#     таблицы функций и классов (поля класса и методы)
+PHASE1_MAGIC = b'PH1\x00'
+PHASE1_VERSION = 2
+
+_HEADER = struct.Struct('<4sHH')
+_SECTIONS = ('string_data', 'lines', 'word_starts', 'words',
+             'block_ends', 'block_parents', 'definitions', 'main', 'tables')
+_LENGTHS = struct.Struct('<' + 'I' * len(_SECTIONS))
+
+_DEFINITION_KINDS = ('class', 'function')
+
+# Флаги записи функции в таблице
+_IS_METHOD = 1
+_PURE = 2
+
+
+class Phase1Program:
+    """
+    Загруженный .phase1: разобранная программа (front_end.ParsedProgram)
+    и таблицы функций и классов фазы 1 (тела функций не скомпилированы)
+    """
+    __slots__ = ('program', 'functions', 'classes')
+
+    def __init__(self, program, functions, classes):
+        self.program = program
+        self.functions = functions
+        self.classes = classes
+
+
+class _StringTable:
+    def __init__(self):
+        self.ids = {}
+        self.strings = []
+
+    def id_of(self, string):
+        string_id = self.ids.get(string)
+        if string_id is None:
+            string_id = self.ids[string] = len(self.strings)
+            self.strings.append(string)
+        return string_id
+
+
+def _int_array(values):
+    data = array('i', values)
+    if sys.byteorder != 'little':
+        data.byteswap()
+    return data
+
+
+def _write_function(tables, strings, func_info):
+    flags = (_IS_METHOD if func_info.get('is_method') else 0) | (_PURE if func_info.get('pure') else 0)
+    tables.extend((strings.id_of(func_info['name']), strings.id_of(func_info['return_type']), flags,
+                   len(func_info['params'])))
+    for param_name, param_type in func_info['params'].items():
+        tables.extend((strings.id_of(param_name), strings.id_of(param_type)))
+    tables.append(len(func_info['body']))
+    tables.extend(strings.id_of(body_line) for body_line in func_info['body'])
+
+
+def dumps_phase1(program, functions, classes):
+    """
+    Сериализует результат фазы 1: program - front_end.ParsedProgram,
+    functions и classes - таблицы LexicalAnalysis
+    """
+    strings = _StringTable()
+    lines = [strings.id_of(line) for line in program.lines]
+
+    word_starts = [0]
+    words = []
+    for line_words in program.words:
+        words.extend(strings.id_of(word) for word in line_words)
+        word_starts.append(len(words))
+
+    definitions = []
+    for kind, start, end_index in program.definitions:
+        definitions.extend((_DEFINITION_KINDS.index(kind), start, end_index))
+
+    tables = [len(functions)]
+    for func_info in functions.values():
+        _write_function(tables, strings, func_info)
+    tables.append(len(classes))
+    for class_name, class_info in classes.items():
+        fields = class_info.get('fields', [])
+        tables.extend((strings.id_of(class_name), len(fields)))
+        for field in fields:
+            tables.extend(map(strings.id_of, field))
+        tables.append(len(class_info['methods']))
+        for method_info in class_info['methods'].values():
+            _write_function(tables, strings, method_info)
+
+    # Секции int32 должны начинаться с границы 4 байт (для memoryview.cast на mmap)
+    string_data = '\n'.join(strings.strings).encode('utf-8')
+    string_data += b'\x00' * (-len(string_data) % 4)
+
+    block_index = program.block_index
+    sections = [string_data, _int_array(lines), _int_array(word_starts),
+                _int_array(words), _int_array(block_index.ends), _int_array(block_index.parents),
+                _int_array(definitions), _int_array(program.main), _int_array(tables)]
+    blobs = [section if isinstance(section, bytes) else section.tobytes() for section in sections]
+
+    return b''.join([_HEADER.pack(PHASE1_MAGIC, PHASE1_VERSION, len(_SECTIONS)),
+                     _LENGTHS.pack(*[len(blob) for blob in blobs])] + blobs)
+
+
+def save_phase1(path, program, functions, classes):
+    with open(path, 'wb') as file:
+        file.write(dumps_phase1(program, functions, classes))
+
+
+def _read_sections(buffer):
+    """
+    Секции .phase1 как memoryview поверх buffer (без копирования)
+    """
+    if len(buffer) < _HEADER.size + _LENGTHS.size:
+        raise ValueError("Файл .phase1 поврежден: нет заголовка")
+    magic, version, section_count = _HEADER.unpack_from(buffer, 0)
+    if magic != PHASE1_MAGIC:
+        raise ValueError("Файл не является файлом .phase1")
+    if version != PHASE1_VERSION or section_count != len(_SECTIONS):
+        raise ValueError(f"Файл .phase1 версии {version}, поддерживается версия {PHASE1_VERSION}")
+
+    view = memoryview(buffer)
+    offset = _HEADER.size + _LENGTHS.size
+    sections = {}
+    for name, length in zip(_SECTIONS, _LENGTHS.unpack_from(buffer, _HEADER.size)):
+        if offset + length > len(buffer) or (name != 'string_data' and length % 4):
+            raise ValueError("Файл .phase1 поврежден: неверная длина секции")
+        section = view[offset:offset + length]
+        sections[name] = section if name == 'string_data' else section.cast('i')
+        offset += length
+    return sections
+
+
+def _int_list(section):
+    values = section.tolist()
+    if sys.byteorder != 'little':
+        values = array('i', values)
+        values.byteswap()
+        values = values.tolist()
+    return values
+
+
+def _read_function(tables, position, strings):
+    name, return_type, flags, param_count = tables[position:position + 4]
+    position += 4
+    params = {}
+    for _ in range(param_count):
+        params[strings[tables[position]]] = strings[tables[position + 1]]
+        position += 2
+    body_count = tables[position]
+    position += 1
+    body = [strings[string_id] for string_id in tables[position:position + body_count]]
+    position += body_count
+    return {
+        'name': strings[name],
+        'params': params,
+        'return_type': strings[return_type],
+        'body': body,
+        'is_method': bool(flags & _IS_METHOD),
+        'pure': bool(flags & _PURE)
+    }, position
+
+
+def loads_phase1(buffer):
+    """
+    Загружает .phase1 из bytes или mmap; ValueError, если формат или версия не совпадают
+    Строки и слова не разбираются заново: они берутся из таблицы строк
+    """
+    sections = _read_sections(buffer)
+    try:
+        # Повторяющиеся имена и слова - один объект str на весь файл
+        string_data = bytes(sections['string_data']).rstrip(b'\x00')
+        strings = list(map(sys.intern, str(string_data, 'utf-8').split('\n')))
+
+        lines = list(map(strings.__getitem__, _int_list(sections['lines'])))
+        word_starts = _int_list(sections['word_starts'])
+        all_words = list(map(strings.__getitem__, _int_list(sections['words'])))
+        words = [all_words[start:end] for start, end in zip(word_starts, word_starts[1:])]
+
+        block_index = BlockIndex.from_tables(lines, _int_list(sections['block_ends']),
+                                             _int_list(sections['block_parents']))
+        definition_values = _int_list(sections['definitions'])
+        definitions = [(_DEFINITION_KINDS[definition_values[i]], definition_values[i + 1], definition_values[i + 2])
+                       for i in range(0, len(definition_values), 3)]
+        program = ParsedProgram.from_tables(lines, words, block_index, definitions, _int_list(sections['main']))
+
+        tables = _int_list(sections['tables'])
+        position = 1
+        functions = {}
+        for _ in range(tables[0]):
+            func_info, position = _read_function(tables, position, strings)
+            functions[func_info['name']] = func_info
+
+        classes = {}
+        class_count = tables[position]
+        position += 1
+        for _ in range(class_count):
+            class_name, field_count = strings[tables[position]], tables[position + 1]
+            position += 2
+            fields = []
+            for _ in range(field_count):
+                fields.append(tuple(strings[string_id] for string_id in tables[position:position + 3]))
+                position += 3
+            method_count = tables[position]
+            position += 1
+            methods = {}
+            for _ in range(method_count):
+                method_info, position = _read_function(tables, position, strings)
+                methods[method_info['name']] = method_info
+            classes[class_name] = {'name': class_name, 'methods': methods, 'variables': {}, 'fields': fields}
+    except (IndexError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Файл .phase1 поврежден: {e}") from None
+    finally:
+        for section in sections.values():
+            section.release()
+
+    return Phase1Program(program, functions, classes)
+
+
+def load_phase1(path, use_mmap=True):
+    """
+    Читает файл .phase1; use_mmap - отображать файл в память вместо чтения целиком
+    """
+    with open(path, 'rb') as file:
+        if not use_mmap:
+            return loads_phase1(file.read())
+        try:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Пустой файл нельзя отобразить в память
+            return loads_phase1(b'')
+    try:
+        return loads_phase1(buffer)
+    finally:
+        buffer.close()
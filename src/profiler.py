@@ -0,0 +1,304 @@
+import json
+from time import perf_counter
+
+from frame import Frame
+
+MAIN = '<main>'
+
+
+def function_label(func_info):
+    """
+    Имя функции в профиле; метод - 'Класс.метод'
+    """
+    class_name = func_info.get('class_name')
+    return func_info['name'] if class_name is None else f"{class_name}.{func_info['name']}"
+
+
+class Profiler:
+    """
+    Профилировщик SimpleInterpreter по строкам и функциям
+    Подключается через attach(): оборачивает методы конкретного экземпляра
+    (execute_line, execute_instruction, enter_function, enter_method, leave_function, evaluate_expression).
+    Методы учитываются как функции с именем 'Класс.метод'
+    Без attach() интерпретатор работает без каких-либо проверок и накладных расходов
+
+    Для строк и функций собираются: число выполнений, общее время и собственное
+    время (без времени вызванных функций). Также собираются ребра графа вызовов
+    и стеки вызовов в формате collapsed stacks для flame graph
+    Вызов чистой функции, результат которого взят из кэша (MemoCache), - тоже вызов
+    со своим временем (поиск в кэше); число таких вызовов - в 'memo_hits'
+    """
+
+    def __init__(self):
+        self.interpreter = None
+
+        # (функция, номер строки) -> {'text', 'hits', 'total', 'self'}
+        self.line_stats = {}
+        # имя функции -> {'calls', 'memo_hits', 'total', 'self'}
+        self.function_stats = {}
+        # (вызывающая, вызываемая) -> {'calls', 'total'}
+        self.edges = {}
+        # узел стека -> собственное время в секундах
+        # Стеки хранятся деревом узлов (родитель, имя); строки 'main;f;g' строятся
+        # только в collapsed_stacks, чтобы глубокая рекурсия не стоила O(глубина) на вызов
+        self.stacks = {}
+        self.stack_nodes = {}
+        self.node_parents = [(None, MAIN)]
+        # отдельные вычисления evaluate_expression: текст -> {'hits', 'total'}
+        self.expression_stats = {}
+
+        # Стек активных функций: [имя, время начала, время вызванных функций, строка вызова, узел стека]
+        # строка вызова - (ключ, текст, начало) для call в теле функции, иначе None
+        self.call_path = [[MAIN, perf_counter(), 0.0, None, 0]]
+        # имя функции -> число ее активных вызовов в call_path (для учета рекурсии)
+        self.active_calls = {}
+        self.main_total = 0.0
+
+        # id(инструкции) -> (функция, номер строки тела, текст)
+        self.instruction_lines = {}
+
+    def attach(self, interpreter):
+        """
+        Подключает профилировщик к интерпретатору (до запуска execute_lines)
+        """
+        self.interpreter = interpreter
+        execute_line = interpreter.execute_line
+        execute_instruction = interpreter.execute_instruction
+        enter_function = interpreter.enter_function
+        enter_method = interpreter.enter_method
+        leave_function = interpreter.leave_function
+        evaluate_expression = interpreter.evaluate_expression
+
+        def profiled_execute_line(line):
+            if interpreter.call_stack:
+                return execute_line(line)
+            key = (MAIN, interpreter.current_line)
+            start = self.begin_line()
+            try:
+                return execute_line(line)
+            finally:
+                elapsed = self.end_line(key, line.strip(), start)
+                self.main_total += elapsed
+
+        def profiled_execute_instruction(instruction):
+            # Инструкции основной программы учитываются в profiled_execute_line
+            if not interpreter.call_stack:
+                return execute_instruction(instruction)
+            func_name, line_number, text = self.instruction_line(instruction)
+            start = self.begin_line()
+            try:
+                return execute_instruction(instruction)
+            finally:
+                self.end_line((func_name, line_number), text, start)
+
+        def caller_line():
+            # Вызовы из тела функции не проходят через execute_instruction (см. run_frames):
+            # строку call учитываем здесь, до возврата из вызванной функции
+            if not interpreter.call_stack:
+                return None
+            caller_frame = interpreter.call_stack[-1]
+            instruction = caller_frame.function['code'][caller_frame.pc - 1]
+            caller_name, line_number, text = self.instruction_line(instruction)
+            return (caller_name, line_number), text, self.begin_line()
+
+        def begin_call(frame, call_line):
+            if frame.__class__ is Frame:
+                func_info = frame.function
+                func_name = function_label(func_info)
+                self.call_path.append([func_name, perf_counter(), 0.0, call_line,
+                                       self.stack_node(self.call_path[-1][4], func_name)])
+                self.active_calls[func_name] = self.active_calls.get(func_name, 0) + 1
+            elif call_line is not None:
+                self.end_line(*call_line)
+            return frame
+
+        def profiled_enter_function(func_name, args, binding=None):
+            call_line = caller_line()
+            start = perf_counter()
+            entered = enter_function(func_name, args, binding)
+            if entered is not None and entered.__class__ is not Frame:
+                # Результат из кэша чистой функции: кадр не создавался
+                self.memo_hit(function_label(interpreter.functions[func_name]), start)
+            return begin_call(entered, call_line)
+
+        def profiled_enter_method(receiver_name, load, method_name, args, cache):
+            call_line = caller_line()
+            return begin_call(enter_method(receiver_name, load, method_name, args, cache), call_line)
+
+        def profiled_leave_function(frame):
+            leave_function(frame)
+            call_line = self.call_path[-1][3]
+            self.end_function(self.call_path[-2][0])
+            if call_line is not None:
+                self.end_line(*call_line)
+
+        def profiled_evaluate_expression(expression_str):
+            start = perf_counter()
+            try:
+                return evaluate_expression(expression_str)
+            finally:
+                stats = self.expression_stats.setdefault(expression_str, {'hits': 0, 'total': 0.0})
+                stats['hits'] += 1
+                stats['total'] += perf_counter() - start
+
+        interpreter.execute_line = profiled_execute_line
+        interpreter.execute_instruction = profiled_execute_instruction
+        interpreter.enter_function = profiled_enter_function
+        interpreter.enter_method = profiled_enter_method
+        interpreter.leave_function = profiled_leave_function
+        interpreter.evaluate_expression = profiled_evaluate_expression
+        return self
+
+    def detach(self):
+        """
+        Восстанавливает исходные методы интерпретатора
+        """
+        for name in ('execute_line', 'execute_instruction', 'enter_function', 'enter_method', 'leave_function',
+                     'evaluate_expression'):
+            self.interpreter.__dict__.pop(name, None)
+
+    def instruction_line(self, instruction):
+        line = self.instruction_lines.get(id(instruction))
+        if line is None:
+            # Таблица строится лениво: функции регистрируются в interpretation
+            functions = list(self.interpreter.functions.values())
+            for class_info in self.interpreter.classes.values():
+                functions.extend(class_info['methods'].values())
+            for func_info in functions:
+                func_name = function_label(func_info)
+                for instr, body_index in zip(func_info.get('code', []), func_info.get('code_lines', [])):
+                    self.instruction_lines[id(instr)] = (func_name, body_index + 1, func_info['body'][body_index])
+            line = self.instruction_lines.get(id(instruction), (self.call_path[-1][0], 0, '?'))
+        return line
+
+    def begin_line(self):
+        # Запоминаем время вызовов текущей функции, чтобы вычесть его из собственного времени строки
+        return perf_counter(), self.call_path[-1][2]
+
+    def end_line(self, key, text, start):
+        elapsed = perf_counter() - start[0]
+        callees = self.call_path[-1][2] - start[1]
+        stats = self.line_stats.get(key)
+        if stats is None:
+            stats = self.line_stats[key] = {'text': text, 'hits': 0, 'total': 0.0, 'self': 0.0}
+        stats['hits'] += 1
+        stats['total'] += elapsed
+        stats['self'] += elapsed - callees
+        return elapsed
+
+    def end_function(self, caller):
+        func_name, start, callees, _, node = self.call_path.pop()
+        self.active_calls[func_name] -= 1
+        elapsed = perf_counter() - start
+        self.call_path[-1][2] += elapsed
+        self.add_call(caller, func_name, elapsed, callees, node)
+
+    def memo_hit(self, func_name, start):
+        """
+        Учитывает вызов func_name, результат которого взят из кэша: время от начала вызова
+        (start) - собственное время функции, вызванных функций нет
+        """
+        elapsed = perf_counter() - start
+        caller, _, _, _, parent = self.call_path[-1]
+        self.call_path[-1][2] += elapsed
+        self.add_call(caller, func_name, elapsed, 0.0, self.stack_node(parent, func_name))
+        self.function_stats[func_name]['memo_hits'] += 1
+
+    def add_call(self, caller, func_name, elapsed, callees, node):
+        stats = self.function_stats.get(func_name)
+        if stats is None:
+            stats = self.function_stats[func_name] = {'calls': 0, 'memo_hits': 0, 'total': 0.0, 'self': 0.0}
+        stats['calls'] += 1
+        stats['self'] += elapsed - callees
+        # Рекурсивные вызовы не добавляют общее время повторно
+        if not self.active_calls.get(func_name):
+            stats['total'] += elapsed
+
+        edge = self.edges.get((caller, func_name))
+        if edge is None:
+            edge = self.edges[(caller, func_name)] = {'calls': 0, 'total': 0.0}
+        edge['calls'] += 1
+        edge['total'] += elapsed
+
+        self.stacks[node] = self.stacks.get(node, 0.0) + elapsed - callees
+
+    def stack_node(self, parent, func_name):
+        node = self.stack_nodes.get((parent, func_name))
+        if node is None:
+            node = self.stack_nodes[(parent, func_name)] = len(self.node_parents)
+            self.node_parents.append((parent, func_name))
+        return node
+
+    def stack_path(self, node):
+        names = []
+        while node is not None:
+            node, func_name = self.node_parents[node]
+            names.append(func_name)
+        return ';'.join(reversed(names))
+
+    def main_self_time(self):
+        return max(self.main_total - self.call_path[0][2], 0.0)
+
+    def report(self, limit=20):
+        """
+        Текстовый отчет: функции и строки, отсортированные по собственному времени
+        """
+        result = ["========= PROFILE: функции ========="]
+        result.append(f"{'вызовы':>10} {'из кэша':>10} {'всего, мс':>12} {'свое, мс':>12}  функция")
+        functions = sorted(self.function_stats.items(), key=lambda item: item[1]['self'], reverse=True)
+        result.append(f"{1:>10} {0:>10} {self.main_total * 1000:>12.3f} {self.main_self_time() * 1000:>12.3f}  {MAIN}")
+        for func_name, stats in functions[:limit]:
+            result.append(f"{stats['calls']:>10} {stats['memo_hits']:>10} {stats['total'] * 1000:>12.3f} "
+                          f"{stats['self'] * 1000:>12.3f}  {func_name}")
+
+        result.append("")
+        result.append("========= PROFILE: строки =========")
+        result.append(f"{'выполнений':>10} {'всего, мс':>12} {'свое, мс':>12}  строка")
+        lines = sorted(self.line_stats.items(), key=lambda item: item[1]['self'], reverse=True)
+        for (func_name, line_number), stats in lines[:limit]:
+            location = f"{line_number}" if func_name == MAIN else f"{func_name}:+{line_number}"
+            result.append(f"{stats['hits']:>10} {stats['total'] * 1000:>12.3f} {stats['self'] * 1000:>12.3f}  "
+                          f"{location}: {stats['text']}")
+
+        result.append("")
+        result.append("========= PROFILE: граф вызовов =========")
+        edges = sorted(self.edges.items(), key=lambda item: item[1]['total'], reverse=True)
+        for (caller, callee), stats in edges[:limit]:
+            result.append(f"{caller} -> {callee}: {stats['calls']} вызовов, {stats['total'] * 1000:.3f} мс")
+
+        return '\n'.join(result)
+
+    def to_dict(self):
+        """
+        Данные профиля для JSON
+        """
+        return {
+            'main': {'total': self.main_total, 'self': self.main_self_time()},
+            'functions': self.function_stats,
+            'lines': [
+                {'function': func_name, 'line': line_number, **stats}
+                for (func_name, line_number), stats in self.line_stats.items()
+            ],
+            'edges': [
+                {'caller': caller, 'callee': callee, **stats}
+                for (caller, callee), stats in self.edges.items()
+            ],
+            'expressions': self.expression_stats,
+        }
+
+    def save_json(self, file_name):
+        with open(file_name, 'w', encoding='utf-8') as file:
+            json.dump(self.to_dict(), file, ensure_ascii=False, indent=2)
+
+    def collapsed_stacks(self):
+        """
+        Стеки в формате collapsed stacks (flamegraph.pl, speedscope): 'main;f;g <микросекунды>'
+        """
+        stacks = dict(self.stacks)
+        stacks[0] = stacks.get(0, 0.0) + self.main_self_time()
+        return '\n'.join(f"{self.stack_path(node)} {round(seconds * 1_000_000)}" for node, seconds in stacks.items()
+                         if round(seconds * 1_000_000) > 0)
+
+    def save_collapsed(self, file_name):
+        with open(file_name, 'w', encoding='utf-8') as file:
+            file.write(self.collapsed_stacks() + '\n')
@@ -0,0 +1,112 @@
+import hashlib
+import io
+import os
+import pickle
+import types
+
+from simple_interpreter import INTERPRETER_VERSION
+
+# Каталог кэша рядом с исходным файлом (аналог __pycache__)
+CACHE_DIR_NAME = "__codecache__"
+
+
+class _ProgramPickler(pickle.Pickler):
+    """
+    Скомпилированные выражения - замыкания Python, их нельзя сохранить напрямую.
+    Вместо них сохраняется рецепт compiled_from: (функция компиляции, аргументы)
+    """
+
+    def reducer_override(self, obj):
+        if isinstance(obj, types.FunctionType):
+            compiled_from = getattr(obj, 'compiled_from', None)
+            if compiled_from is not None:
+                return compiled_from
+        return NotImplemented
+
+
+def source_hash(source):
+    return hashlib.sha256(source.encode('utf-8')).hexdigest()
+
+
+def cache_path(file_name, cache_dir=None):
+    """
+    Путь к файлу кэша для исходного файла .code
+    """
+    directory = cache_dir if cache_dir is not None else os.path.join(
+        os.path.dirname(os.path.abspath(file_name)), CACHE_DIR_NAME)
+    base_name = os.path.splitext(os.path.basename(file_name))[0]
+    return os.path.join(directory, f"{base_name}.v{INTERPRETER_VERSION}.pickle")
+
+
+def save_program(path, source, interpreter, lines, optimize=False):
+    """
+    Сохраняет результат interpretation: таблицы функций и классов
+    (вместе со скомпилированными телами), строки программы и индекс блоков
+    optimize - программа разобрана с оптимизацией (строки уже переписаны оптимизатором)
+    Ошибки записи игнорируются - кэш необязателен
+    """
+    buffer = io.BytesIO()
+    try:
+        _ProgramPickler(buffer, protocol=pickle.HIGHEST_PROTOCOL).dump({
+            'version': INTERPRETER_VERSION,
+            'source_hash': source_hash(source),
+            'optimized': optimize,
+            'functions': interpreter.functions,
+            'classes': interpreter.classes,
+            'type_errors': interpreter.type_errors,
+            'lines': lines,
+            'block_index': interpreter.get_block_index(lines),
+        })
+    except (pickle.PicklingError, TypeError, AttributeError):
+        return
+
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(temp_path, 'wb') as file:
+            file.write(buffer.getvalue())
+        os.replace(temp_path, path)
+    except OSError:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def load_program(path, source, interpreter, optimize=False):
+    """
+    Загружает программу из кэша в интерпретатор
+    Возвращает строки программы или None, если кэша нет, он устарел
+    или сохранен с другим значением optimize
+    """
+    try:
+        with open(path, 'rb') as file:
+            data = pickle.load(file)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        return None
+
+    if data.get('version') != INTERPRETER_VERSION or data.get('source_hash') != source_hash(source):
+        return None
+    if data.get('optimized', False) != optimize:
+        return None
+
+    interpreter.functions = data['functions']
+    interpreter.classes = data['classes']
+    interpreter.type_errors = data['type_errors']
+    interpreter.block_index = data['block_index']
+    return data['lines']
+
+
+def interpret_cached(interpreter, file_name, source, cache_dir=None, optimize=False):
+    """
+    interpretation с кэшем на диске: при совпадении хэша исходника и версии
+    интерпретатора фаза разбора полностью пропускается
+    """
+    path = cache_path(file_name, cache_dir)
+    lines = load_program(path, source, interpreter, optimize)
+    if lines is not None:
+        interpreter.output.trace(f"Программа загружена из кэша: {path}")
+        interpreter.report_type_errors()
+        return lines
+
+    lines = interpreter.interpretation(source, optimize=optimize)
+    save_program(path, source, interpreter, lines, optimize)
+    return lines
@@ -0,0 +1,300 @@
+from expression_compiler import expression_names
+from front_end import parse_program
+from objects import parse_field
+from rope_strings import is_string_literal
+from typed_arrays import parse_array_literal, parse_builtin_call, parse_subscript, split_arguments, split_words
+
+# Пустая инструкция на месте удаленной (сохраняет нумерацию строк)
+EMPTY_STATEMENT = ';'
+
+# Операторы, которые вычисляются при оптимизации (те же правила, что в expression_compiler)
+FOLDABLE_OPERATORS = ('+', '-', '*', '/')
+
+DEFAULT_TYPES = ['int', 'float', 'string', 'bool', 'void', 'int[]', 'float[]']
+
+
+def _literal_value(word):
+    """
+    Значение числового или логического литерала (как в _compile_word) или None
+    """
+    if word.isdigit() or (word.startswith('-') and word[1:].isdigit()):
+        return int(word), 'int'
+    elif word.replace('.', '', 1).replace('-', '', 1).isdigit() and word.count('.') == 1:
+        return float(word), 'float'
+    elif word.lower() in ['true', 'false']:
+        return word.lower() == 'true', 'bool'
+    return None
+
+
+def _literal_text(value, value_type):
+    """
+    Запись значения литералом языка или None, если литерал не разберется так же
+    (например, 1e-05 или inf)
+    """
+    if value_type == 'bool':
+        return 'true' if value else 'false'
+    text = str(value) if value_type == 'int' else repr(value)
+    literal = _literal_value(text)
+    if literal is None or literal[1] != value_type:
+        return None
+    return text
+
+
+def _fold_binary(left, op, right):
+    """
+    Вычисляет операцию над константами; None, если результат должен получиться
+    при выполнении (ошибка типов, деление на ноль, неизвестный оператор)
+    """
+    (left_val, left_type), (right_val, right_type) = left, right
+    if op not in FOLDABLE_OPERATORS or left_type not in ('int', 'float') or right_type not in ('int', 'float'):
+        return None
+    if op == '+':
+        result = left_val + right_val
+    elif op == '-':
+        result = left_val - right_val
+    elif op == '*':
+        result = left_val * right_val
+    else:
+        if right_val == 0:
+            return None
+        result = left_val / right_val
+        if isinstance(result, float) and result.is_integer():
+            result = int(result)
+    return result, 'float' if isinstance(result, float) else 'int'
+
+
+def _declared_constant(constant, var_type):
+    """
+    Значение константы после преобразования к объявленному типу
+    или None, если преобразование не гарантированно успешно
+    """
+    value, value_type = constant
+    if value_type == var_type:
+        return constant
+    if var_type == 'float' and value_type == 'int':
+        return float(value), 'float'
+    if var_type == 'string':
+        return str(value), 'string'
+    return None
+
+
+class ProgramOptimizer:
+    """
+    Статическая оптимизация исходного кода перед выполнением:
+    - свертка константных подвыражений (2 * 3 -> 6)
+    - подстановка переменных с известным числовым/логическим значением
+    - удаление объявлений, результат которых не читается, и инструкций после return
+    Результат - исходный код с теми же строками: удаленные инструкции заменяются
+    пустой инструкцией ';' (пустые строки не нумеруются интерпретатором),
+    поэтому номера строк в сообщениях об ошибках не меняются
+    Глобальные переменные не подставляются в функции и не удаляются, если их имя
+    встречается в телах функций или методов: функция может быть вызвана в любой момент
+    Объявления переменных типа класса не удаляются (значение - объект, не константа)
+    """
+
+    def __init__(self, valid_types=None):
+        self.valid_types = valid_types if valid_types is not None else DEFAULT_TYPES
+        # Типы объявлений: встроенные и имена классов программы (см. optimize_program)
+        self.declaration_types = set(self.valid_types)
+        self.folded = 0
+        self.propagated = 0
+        self.removed = 0
+
+    def optimize(self, code):
+        """
+        Оптимизированный исходный код (строки без комментариев и пустых строк, см. front_end)
+        """
+        return '\n'.join(self.optimize_program(parse_program(code)).lines)
+
+    def optimize_program(self, program):
+        """
+        Оптимизирует разобранную программу (front_end.ParsedProgram) на месте
+        """
+        if any(end_index == -1 for _, _, end_index in program.definitions):
+            # Незакрытый блок или заголовок без тела - оставляем программу как есть
+            return program
+
+        statements = [line.strip() for line in program.lines]
+        function_scopes = [list(range(start + 1, end_index))
+                           for kind, start, end_index in program.definitions if kind == 'function']
+        class_scopes = [list(range(start + 1, end_index))
+                        for kind, start, end_index in program.definitions if kind == 'class']
+        self.declaration_types = set(self.valid_types)
+        self.declaration_types.update(program.words[scope[0] - 1][1] for scope in class_scopes
+                                      if len(program.words[scope[0] - 1]) >= 2)
+
+        # Имена, которые могут читаться функциями и методами как глобальные переменные
+        function_reads = set()
+        for scope in function_scopes + class_scopes:
+            for index in scope:
+                function_reads |= self.statement_reads(statements[index])
+
+        result = list(program.lines)
+        for scope in function_scopes:
+            self.optimize_scope(scope, statements, result, set(), is_function=True)
+        self.optimize_scope(program.main, statements, result, function_reads, is_function=False)
+
+        for index, line in enumerate(result):
+            if line != program.lines[index]:
+                program.replace_line(index, line)
+        return program
+
+    def statement_reads(self, statement):
+        """
+        Имена переменных, которые читает инструкция
+        """
+        words = statement.rstrip(';').split()
+        if not words:
+            return set()
+        if words[0] == 'print':
+            return {words[1]} if len(words) > 1 else set()
+        if words[0] == 'return':
+            return expression_names(' '.join(words[1:])) if len(words) > 1 else set()
+        if words[0] == 'call':
+            call = ' '.join(words[1:])
+            names = set()
+            method = parse_field(call[:call.find('(')]) if '(' in call else None
+            if method is not None:
+                names.add(method[0])
+            for argument in split_arguments(call[call.find('(') + 1:-1]) if '(' in call else []:
+                names |= expression_names(argument)
+            return names
+        if len(words) >= 4 and words[0] in self.declaration_types and words[2] == '=':
+            return expression_names(' '.join(words[3:]))
+        if len(words) >= 3 and words[1] == '=' and parse_field(words[0]) is not None:
+            # Присваивание полю p.x = выражение
+            return {parse_field(words[0])[0]} | expression_names(' '.join(words[2:]))
+        return set()
+
+    def optimize_scope(self, scope, statements, result, always_live, is_function):
+        """
+        Прямой проход: свертка и подстановка констант; обратный проход: удаление мертвых объявлений
+        """
+        known = {}
+        removable = set()
+        rewritten = {}
+        reachable = []
+
+        for index in scope:
+            statement = statements[index]
+            words = statement.rstrip(';').split()
+            if not words:
+                continue
+            reachable.append(index)
+            changes = self.folded + self.propagated
+
+            if len(words) >= 4 and words[0] in self.declaration_types and words[0] != 'void' and words[2] == '=':
+                var_type, var_name = words[0], words[1]
+                expression, constant = self.fold_expression(' '.join(words[3:]), known)
+                rewritten[index] = f"{var_type} {var_name} = {expression};"
+                constant = _declared_constant(constant, var_type) if constant is not None else None
+                if constant is not None:
+                    known[var_name] = constant
+                    removable.add(index)
+                else:
+                    known.pop(var_name, None)
+
+            elif words[0] == 'return' and len(words) > 1:
+                expression, _ = self.fold_expression(' '.join(words[1:]), known)
+                rewritten[index] = f"return {expression};"
+
+            elif words[0] == 'call':
+                call = ' '.join(words[1:])
+                paren_pos = call.find('(')
+                if paren_pos != -1 and call.endswith(')'):
+                    arguments = [self.fold_expression(argument, known)[0]
+                                 for argument in split_arguments(call[paren_pos + 1:-1])]
+                    rewritten[index] = f"call {call[:paren_pos]}({', '.join(arguments)});"
+
+            if self.folded + self.propagated == changes:
+                # Ничего не свернуто - строку не переписываем
+                rewritten.pop(index, None)
+
+            if is_function and words[0] == 'return':
+                # Инструкции после return в теле функции не выполняются
+                for dead_index in scope[scope.index(index) + 1:]:
+                    if statements[dead_index]:
+                        result[dead_index] = self.removed_line(result[dead_index])
+                        self.removed += 1
+                break
+
+        live = set(always_live)
+        for index in reversed(reachable):
+            words = statements[index].rstrip(';').split()
+            if index in removable and words[1] not in live:
+                result[index] = self.removed_line(result[index])
+                self.removed += 1
+                continue
+            if (len(words) >= 4 and words[0] in self.declaration_types and words[2] == '='
+                    and words[1] not in always_live):
+                live.discard(words[1])
+            live |= self.statement_reads(rewritten.get(index, statements[index]))
+
+        for index, statement in rewritten.items():
+            if result[index].strip() != EMPTY_STATEMENT:
+                result[index] = self.indent_of(result[index]) + statement
+
+    def indent_of(self, line):
+        return line[:len(line) - len(line.lstrip())]
+
+    def removed_line(self, line):
+        return self.indent_of(line) + EMPTY_STATEMENT
+
+    def fold_expression(self, expression_str, known):
+        """
+        Сворачивает выражение; возвращает (новый текст, константа (значение, тип) или None)
+        """
+        expression = expression_str.strip()
+        if is_string_literal(expression):
+            return expression, (expression[1:-1], 'string')
+
+        parts = split_words(expression)
+        if len(parts) == 1:
+            return self.fold_word(parts[0], known)
+
+        if len(parts) == 3:
+            left_text, left = self.fold_expression(parts[0], known)
+            right_text, right = self.fold_expression(parts[2], known)
+            if left is not None and right is not None:
+                folded = _fold_binary(left, parts[1], right)
+                text = _literal_text(*folded) if folded is not None else None
+                if text is not None:
+                    self.folded += 1
+                    return text, folded
+            return f"{left_text} {parts[1]} {right_text}", None
+
+        return expression, None
+
+    def fold_word(self, word, known):
+        constant = _literal_value(word)
+        if constant is not None:
+            return word, constant
+
+        if word in known:
+            text = _literal_text(*known[word]) if known[word][1] != 'string' else None
+            if text is not None:
+                self.propagated += 1
+                return text, known[word]
+            return word, None
+
+        # Аргументы встроенных функций, элементы литералов и индексы тоже сворачиваются
+        items = parse_array_literal(word)
+        if items is not None:
+            return '[' + ', '.join(self.fold_expression(item, known)[0] for item in items) + ']', None
+        builtin_call = parse_builtin_call(word)
+        if builtin_call is not None:
+            name, arguments = builtin_call
+            return f"{name}({', '.join(self.fold_expression(argument, known)[0] for argument in arguments)})", None
+        subscript = parse_subscript(word)
+        if subscript is not None:
+            name, bounds = subscript
+            folded_bounds = [self.fold_expression(bound, known)[0] if bound else '' for bound in bounds]
+            return f"{name}[{':'.join(folded_bounds)}]", None
+        return word, None
+
+
+def optimize_source(code, valid_types=None):
+    """
+    Оптимизированный исходный код (см. ProgramOptimizer)
+    """
+    return ProgramOptimizer(valid_types).optimize(code)
@@ -0,0 +1,176 @@
+# Типы, значения которых можно присоединять к строке оператором +
+CONCAT_TYPES = ('string', 'int', 'float', 'bool')
+
+# Наибольшее число аргументов join (первый - разделитель)
+MAX_JOIN_ARGUMENTS = 255
+
+
+class Rope:
+    """
+    Значение типа string, собранное конкатенацией: части (str или Rope) и общая длина
+    Строка собирается (''.join) только при первом обращении к тексту и запоминается
+    Части хранятся в списке, общем для цепочки s = s + x: если s - последнее
+    значение цепочки, новая часть дописывается в тот же список (O(1)), а прежние
+    значения видят только свои первые count частей. Поэтому построение строки
+    из n частей в рекурсии или цикле занимает линейное время
+    """
+    __slots__ = ('parts', 'count', 'length', 'flat')
+
+    def __init__(self, parts, count, length):
+        self.parts = parts
+        self.count = count
+        self.length = length
+        self.flat = None
+
+    def __str__(self):
+        flat = self.flat
+        if flat is None:
+            # Обход без рекурсии: вложенность частей может быть любой глубины
+            pieces = []
+            stack = [self]
+            while stack:
+                item = stack.pop()
+                if item.__class__ is str:
+                    pieces.append(item)
+                elif item.flat is not None:
+                    pieces.append(item.flat)
+                else:
+                    stack.extend(reversed(item.parts[:item.count]))
+            flat = self.flat = ''.join(pieces)
+        return flat
+
+    def __repr__(self):
+        return repr(str(self))
+
+    def __len__(self):
+        return self.length
+
+    def __eq__(self, other):
+        if other.__class__ is Rope or other.__class__ is str:
+            return str(self) == str(other)
+        return NotImplemented
+
+    def __hash__(self):
+        # Ключи кэша чистых функций: равен хэшу собранной строки
+        return hash(str(self))
+
+    def __reduce__(self):
+        # В снимки и кэш сохраняется собранная строка
+        return str, (str(self),)
+
+
+def is_string_literal(expression):
+    """
+    Выражение - один строковый литерал "..." (а не, например, "a" + "b")
+    """
+    return len(expression) >= 2 and expression[0] == '"' and expression[-1] == '"' and expression.count('"') == 2
+
+
+def text(value):
+    """
+    str для значения типа string (str или Rope)
+    """
+    return value if value.__class__ is str else str(value)
+
+
+def length(value):
+    return value.length if value.__class__ is Rope else len(value)
+
+
+def _part(value, value_type):
+    if value_type == 'string':
+        return value
+    return str(value)
+
+
+def concat(left, right):
+    """
+    Конкатенация s + x, где хотя бы один операнд - string, а другой - string, число или bool
+    Результат - (Rope, 'string'); строка не собирается
+    """
+    left_val, left_type = left
+    right_val, right_type = right
+    if left_type not in CONCAT_TYPES or right_type not in CONCAT_TYPES:
+        raise TypeError(f"Нельзя применить оператор '+' к типам '{left_type}' и '{right_type}'")
+
+    left_part = _part(left_val, left_type)
+    right_part = _part(right_val, right_type)
+    size = length(left_part) + length(right_part)
+
+    if left_part.__class__ is Rope and left_part.count == len(left_part.parts):
+        # Левый операнд - конец своей цепочки: дописываем часть в общий список
+        parts = left_part.parts
+        parts.append(right_part)
+        return Rope(parts, len(parts), size), 'string'
+    return Rope([left_part, right_part], 2, size), 'string'
+
+
+def _require_string(name, argument):
+    value, value_type = argument
+    if value_type != 'string':
+        raise TypeError(f"Функция {name} ожидает string, получен '{value_type}'")
+    return value
+
+
+def _require_index(name, argument):
+    value, value_type = argument
+    if value_type != 'int':
+        raise TypeError(f"Функция {name} ожидает int, получен '{value_type}'")
+    return value
+
+
+def builtin_substr(string, start, stop=None):
+    """
+    Подстрока substr(s, i) или substr(s, i, j) (как срез s[i:j])
+    """
+    value = text(_require_string('substr', string))
+    start = _require_index('substr', start)
+    if stop is None:
+        return value[start:], 'string'
+    return value[start:_require_index('substr', stop)], 'string'
+
+
+def builtin_join(separator, *items):
+    """
+    join(", ", a, b, ...) - значения через разделитель; массив добавляет все свои элементы
+    Строка собирается один раз, без промежуточных конкатенаций
+    """
+    separator = text(_require_string('join', separator))
+    pieces = []
+    for value, value_type in items:
+        if value_type.endswith('[]'):
+            pieces.extend(map(str, value))
+        elif value_type in CONCAT_TYPES:
+            pieces.append(text(value) if value_type == 'string' else str(value))
+        else:
+            raise TypeError(f"Функция join: нельзя соединить значение типа '{value_type}'")
+    return separator.join(pieces), 'string'
+
+
+def builtin_format(number, digits=None):
+    """
+    Запись числа строкой: format(x) или format(x, n) - n знаков после точки
+    """
+    value, value_type = number
+    if value_type not in ('int', 'float'):
+        raise TypeError(f"Функция format ожидает число, получен '{value_type}'")
+    if digits is None:
+        return str(value), 'string'
+    digits = _require_index('format', digits)
+    if digits < 0:
+        raise ValueError(f"Функция format: отрицательное число знаков {digits}")
+    return f"{value:.{digits}f}", 'string'
+
+
+# Встроенные функции строк: имя -> допустимое число аргументов (см. typed_arrays.BUILTINS)
+STRING_BUILTINS = {
+    'substr': (2, 3),
+    'join': range(2, MAX_JOIN_ARGUMENTS + 1),
+    'format': (1, 2),
+}
+
+STRING_BUILTIN_FUNCTIONS = {
+    'substr': builtin_substr,
+    'join': builtin_join,
+    'format': builtin_format,
+}
@@ -1,5 +1,24 @@
+from block_index import BlockIndex
+from expression_compiler import compile_expression, compile_variable, expression_names
+from frame import Frame, build_layout
+from front_end import parse_call, parse_function_header, parse_program, split_statement
+from memoization import MEMO_PARAM_TYPES, MemoCache
+from output import Output
+from program_optimizer import ProgramOptimizer
+from objects import Instance, InlineCache, build_class_layout, field_entry, parse_field, receiver_instance
+from type_inference import TypeChecker, checked_conversion, convert_to_type, convert_value
+
+
+# Версия интерпретатора: увеличивать при изменении формата функций/инструкций
+# (входит в ключ кэша скомпилированных программ, см. program_cache.py)
+INTERPRETER_VERSION = 8
+
+# Глубина вызовов функций по умолчанию (см. SimpleInterpreter.max_call_depth)
+MAX_CALL_DEPTH = 100000
+
+
 class SimpleInterpreter:
-    def __init__(self):
+    def __init__(self, output=None):
         # Словарь для хранения переменных: {'name': {'value': val, 'type': type}}
         self.variables = {}
         
@@ -9,180 +28,542 @@ class SimpleInterpreter:
         # Словарь для хранения классов
         self.classes = {}
         
-        # Стек вызовов для функций (локальные переменные)
+        # Стек вызовов для функций: кадры Frame с локальными переменными по слотам
         self.call_stack = []
         
         # Поддерживаемые типы данных
-        self.valid_types = ['int', 'float', 'string', 'bool', 'void']
+        self.valid_types = ['int', 'float', 'string', 'bool', 'void', 'int[]', 'float[]']
         
         # Флаг - находимся ли мы внутри класса при парсинге
         self.current_class = None
 
+        # Ограничение глубины вызовов: стек Python не используется, предел защищает
+        # от бесконечной рекурсии в программе (None - ограничена только памятью)
+        self.max_call_depth = MAX_CALL_DEPTH
+
+        # Номер выполняемой строки основной программы (для сообщений и профилировщика)
+        self.current_line = 0
+
+        # Индекс блоков {...} последнего разобранного списка строк (см. block_index.py)
+        self.block_index = None
+
+        # Ошибки статической проверки типов последней загруженной программы (см. check_types)
+        self.type_errors = []
+        # Проверка типов определений потокового режима (см. check_definitions)
+        self.checker = None
+
+        # Вывод программы и служебных сообщений (уровень подробности и буфер, см. output.py)
+        self.output = output if output is not None else Output()
+
     def convert_to_type(self, value_str, target_type):
         """
-        Преобразует строковое значение в нужный тип
+        Преобразует строковое значение в нужный тип (см. type_inference.convert_to_type)
         """
-        try:
-            if target_type == 'int':
-                return int(value_str)
-            elif target_type == 'float':
-                return float(value_str)
-            elif target_type == 'string':
-                # Убираем кавычки если есть
-                if value_str.startswith('"') and value_str.endswith('"'):
-                    return value_str[1:-1]
-                return str(value_str)
-            elif target_type == 'bool':
-                if value_str.lower() in ['true', '1']:
-                    return True
-                elif value_str.lower() in ['false', '0']:
-                    return False
-                else:
-                    raise ValueError(f"'{value_str}' не является корректным bool значением")
-            else:
-                raise TypeError(f"Неизвестный тип '{target_type}'")
-        except ValueError as e:
-            if "invalid literal" in str(e) or "could not convert" in str(e):
-                raise ValueError(f"Не удалось преобразовать '{value_str}' в тип '{target_type}'")
-            else:
-                # Перебрасываем наше собственное исключение
-                raise
-    
+        return convert_to_type(value_str, target_type)
+
+    def convert_value(self, value, value_type, target_type):
+        """
+        Преобразует значение типа value_type в target_type прямым преобразованием
+        (числа не разбираются через строку, массивы - целиком, см. type_inference.conversion)
+        """
+        return convert_value(value, value_type, target_type)
+
     def get_variable_info(self, var_name):
         """
         Получает информацию о переменной (значение и тип)
         Возвращает словарь {'value': val, 'type': type} или None
         """
         # Сначала ищем в локальных переменных
-        if self.call_stack and var_name in self.call_stack[-1]:
-            return self.call_stack[-1][var_name]
+        if self.call_stack:
+            local = self.call_stack[-1].get(var_name)
+            if local is not None:
+                return {'value': local[0], 'type': local[1]}
         # Потом в глобальных
-        elif var_name in self.variables:
-            return self.variables[var_name]
-        else:
-            return None
+        return self.variables.get(var_name)
     
+    def get_block_index(self, lines):
+        """
+        Возвращает индекс блоков для списка строк, строит его один раз на список
+        """
+        if self.block_index is None or self.block_index.lines is not lines:
+            self.block_index = BlockIndex(lines)
+        return self.block_index
+
     def find_matching_brace(self, lines, start_index):
         """
         Находит закрывающую фигурную скобку для открывающей на start_index
         Возвращает индекс строки с закрывающей скобкой
         """
-        brace_count = 0
-        for i in range(start_index, len(lines)):
-            line = lines[i].strip()
-            if '{' in line:
-                brace_count += line.count('{')
-            if '}' in line:
-                brace_count -= line.count('}')
-                if brace_count == 0:
-                    return i
-        return -1  # Не найдена
-    
+        return self.get_block_index(lines).end_of(start_index)
+
+    def interpretation(self, code, optimize=False):
+        """
+        ФАЗА 1: разбирает исходный код (front_end.parse_program), регистрирует функции и классы
+        Тела функций компилируются один раз при регистрации, затем проверяются типы (check_types)
+        optimize - свертка констант и удаление мертвого кода (см. program_optimizer.py)
+        Возвращает список строк программы для execute_lines
+        """
+        program = parse_program(code)
+        if optimize:
+            optimizer = ProgramOptimizer(self.valid_types)
+            optimizer.optimize_program(program)
+            self.output.trace(f"Оптимизация: свернуто выражений {optimizer.folded}, подставлено констант "
+                              f"{optimizer.propagated}, удалено инструкций {optimizer.removed}")
+        lines = self.load_program(program)
+        self.check_types(program)
+        return lines
+
+    def load_program(self, program):
+        """
+        Регистрирует классы и функции разобранной программы (front_end.ParsedProgram)
+        Возвращает строки программы для execute_lines
+        """
+        lines = program.lines
+        block_index = self.block_index = program.block_index
+
+        # Имена классов - типы переменных и параметров, в том числе в функциях выше объявления класса
+        for kind, start, end_index in program.definitions:
+            words = program.words[start]
+            if kind == 'class' and len(words) >= 2 and words[1] not in self.classes:
+                self.classes[words[1]] = {'name': words[1], 'methods': {}, 'variables': {},
+                                          'defaults': [], 'field_converts': []}
+                build_class_layout(self.classes[words[1]], [])
+
+        for kind, start, end_index in program.definitions:
+            line = lines[start].strip()
+
+            # Обработка объявления класса
+            if kind == 'class':
+                words = program.words[start]
+                if len(words) < 2:
+                    self.output.error("Ошибка: не указано имя класса")
+                    continue
+
+                class_name = words[1]
+                self.current_class = class_name
+                self.classes[class_name] = {'name': class_name, 'methods': {}, 'variables': {}}
+                self.output.trace(f"Найден класс: {class_name}")
+
+                if end_index == -1:
+                    self.output.error("Ошибка: не найдена закрывающая скобка для класса")
+                    break
+
+                self.parse_class_content(lines[start + 1:end_index], block_index.view(start + 1))
+                self.current_class = None
+                continue
+
+            # Обработка объявления функции (pure function - чистая функция с кэшем результатов)
+            func_info = self.parse_function_declaration(line)
+            if func_info is None:
+                continue
+
+            if end_index == -1:
+                self.output.error("Ошибка: не найдена закрывающая скобка для функции")
+                break
+
+            self.register_function(func_info, lines[start + 1:end_index], program.words[start + 1:end_index])
+            if program.source_lines is not lines:
+                # Тело до оптимизации: по нему TypeChecker сообщает об ошибках типов
+                func_info['source_body'], func_info['source_body_words'] = self.body_statements(
+                    program.source_lines[start + 1:end_index], program.source_words[start + 1:end_index])
+
+        self.output.flush()
+        return lines
+
+    def load_phase1(self, phase1):
+        """
+        ФАЗА 2 для результата LexicalAnalysis, загруженного из .phase1 (см. phase1_format):
+        функции и классы уже найдены, остается скомпилировать их тела
+        Возвращает список строк программы для execute_lines
+        """
+        self.block_index = phase1.program.block_index
+
+        # Классы раньше функций: имена классов нужны как типы при компиляции тел
+        for class_name, class_info in phase1.classes.items():
+            self.classes[class_name] = class_info
+            self.output.trace(f"Найден класс: {class_name}")
+
+        for func_info in phase1.functions.values():
+            self.register_function(func_info, func_info['body'])
+
+        for class_info in phase1.classes.values():
+            self.define_fields(class_info, class_info['fields'])
+            for method_info in class_info['methods'].values():
+                method_info['class_name'] = class_info['name']
+                self.compile_function(method_info)
+
+        self.check_types(phase1.program)
+        return phase1.program.lines
+
+    def check_types(self, program=None):
+        """
+        Статическая проверка типов (см. type_inference.TypeChecker): специализирует
+        преобразования в еще не проверенных функциях и методах и сообщает об ошибках
+        типов до выполнения; program - основная программа для проверки (front_end.ParsedProgram)
+        """
+        checker = TypeChecker(self.valid_types, self.functions, self.classes)
+        functions = list(self.functions.values())
+        for class_info in self.classes.values():
+            functions.extend(class_info['methods'].values())
+        for func_info in functions:
+            if func_info.get('code') is not None and not func_info.get('typed'):
+                checker.check_function(func_info)
+                func_info['typed'] = True
+        if program is not None:
+            checker.check_program(program)
+
+        self.type_errors = checker.errors
+        self.report_type_errors()
+
+    def check_definitions(self, functions):
+        """
+        Проверка типов только что зарегистрированных функций или методов (потоковый режим):
+        TypeChecker один на весь поток, таблицы functions и classes не обходятся заново
+        """
+        checker = self.checker
+        if checker is None or checker.functions is not self.functions or checker.classes is not self.classes:
+            # Таблицы заменены (snapshot.restore) - проверяем по новым
+            checker = self.checker = TypeChecker(self.valid_types, self.functions, self.classes)
+        checker.errors = []
+        for func_info in functions:
+            if func_info.get('code') is not None and not func_info.get('typed'):
+                checker.check_function(func_info)
+                func_info['typed'] = True
+
+        self.type_errors = checker.errors
+        self.report_type_errors()
+
+    def report_type_errors(self):
+        for error in self.type_errors:
+            self.output.error(error)
+        self.output.flush()
+
+    def body_statements(self, body_lines, body_words=None):
+        """
+        Непустые строки тела (без отступов) и их слова; body_words - уже разобранные
+        слова строк (front_end.ParsedProgram.words), иначе строки разбираются здесь
+        """
+        if body_words is None:
+            body_words = [split_statement(body_line) for body_line in body_lines]
+        func_body = []
+        func_words = []
+        for body_line, words in zip(body_lines, body_words):
+            body_line = body_line.strip()
+            if body_line:
+                func_body.append(body_line)
+                func_words.append(words)
+        return func_body, func_words
+
+    def register_function(self, func_info, body_lines, body_words=None):
+        """
+        Компилирует тело функции (строки между заголовком и закрывающей скобкой)
+        и добавляет функцию в таблицу functions
+        body_words - слова строк тела, если программа уже разобрана (см. body_statements)
+        """
+        func_info['body'], func_info['body_words'] = self.body_statements(body_lines, body_words)
+        self.compile_function(func_info)
+        self.functions[func_info['name']] = func_info
+        if self.output.tracing:
+            self.output.trace(f"Найдена функция {func_info['name']}({', '.join([f'{name}: {type_}' for name, type_ in func_info['params'].items()])}) -> {func_info['return_type']}")
+
+    def decode_line(self, line, layout=()):
+        return self.decode_statement(split_statement(line), layout)
+
+    def decode_statement(self, words, layout=(), return_type=None):
+        """
+        Декодирует строку кода в инструкцию с уже разобранными операндами
+        Форматы инструкций:
+            ('declare', var_type, var_name, expression, slot, convert)
+            ('print', var_name, load)
+            ('call', func_name, [arg1, arg2, ...], binding)
+            ('call_method', receiver_name, load, method_name, [arg1, ...], cache)
+            ('set_field', receiver_name, load, field_name, expression, cache)
+            ('return', expression или None, convert)
+            ('error', сообщение)
+        Выражения и аргументы уже скомпилированы (compile_expression).
+        convert - преобразование значения к объявленному типу (None - не нужно),
+        до проверки типов оно сравнивает типы при выполнении (type_inference.checked_conversion);
+        binding - функция и преобразования аргументов, связанные проверкой типов, или None
+        cache - кэш места вызова метода или присваивания полю (objects.InlineCache)
+        layout - слоты локальных переменных функции; для объявлений вне функции slot равен None
+        return_type - тип возврата функции, к которому приводит return
+        words - слова инструкции (front_end.split_statement)
+        Для пустых и неизвестных строк возвращает None
+        """
+        if not words:
+            return None
+
+        # Объявление переменной: тип имя = выражение (тип - встроенный или имя класса)
+        if (words[0] in self.valid_types or words[0] in self.classes) and words[0] != 'void':
+            if len(words) < 4 or words[2] != '=':
+                return ('error', "Ошибка: неправильный синтаксис объявления переменной")
+            var_name = words[1]
+            slot = layout.index(var_name) if var_name in layout else None
+            return ('declare', words[0], var_name, compile_expression(' '.join(words[3:]), layout), slot,
+                    checked_conversion(words[0]))
+
+        elif words[0] == 'print':
+            if len(words) < 2:
+                return ('error', "Ошибка: не указана переменная для вывода")
+            return ('print', words[1], compile_variable(words[1], layout))
+
+        elif words[0] == 'call':
+            return self.decode_call(' '.join(words[1:]), layout)
+
+        # Присваивание полю объекта: p.x = выражение
+        elif len(words) >= 3 and words[1] == '=' and parse_field(words[0]) is not None:
+            receiver_name, field_name = parse_field(words[0])
+            return ('set_field', receiver_name, compile_variable(receiver_name, layout), field_name,
+                    compile_expression(' '.join(words[2:]), layout), InlineCache())
+
+        elif words[0] == 'return':
+            if len(words) == 1:
+                return ('return', None, None)
+            convert = checked_conversion(return_type) if return_type not in (None, 'void') else None
+            return ('return', compile_expression(' '.join(words[1:]), layout), convert)
+
+        return None
+
+    def decode_call(self, func_call_str, layout=()):
+        """
+        Декодирует вызов функции вида name(arg1, arg2) в инструкцию 'call'
+        или вызов метода вида p.name(arg1, arg2) в инструкцию 'call_method'
+        """
+        call = parse_call(func_call_str)
+        if call is None:
+            return ('error', "Ошибка: неправильный формат вызова функции")
+
+        func_name, args = call
+        args = [compile_expression(arg, layout) for arg in args]
+        method = parse_field(func_name)
+        if method is not None:
+            # Вызов метода p.move(1, 2): метод ищется по классу объекта при выполнении
+            receiver_name, method_name = method
+            return ('call_method', receiver_name, compile_variable(receiver_name, layout), method_name, args,
+                    InlineCache())
+        return ('call', func_name, args, None)
+
+    def compile_function(self, func_info):
+        """
+        Компилирует тело функции в список инструкций (один раз при регистрации)
+        Параметрам и локальным переменным назначаются слоты кадра (см. frame.build_layout)
+        Результат сохраняется в func_info['code'], раскладка слотов - в
+        func_info['layout'], func_info['slots'] и func_info['frame_types'],
+        номера строк тела для каждой инструкции - в func_info['code_lines']
+        Слова строк тела берутся из func_info['body_words'] (разбираются, если их нет)
+        """
+        body_words = func_info.get('body_words')
+        if body_words is None:
+            body_words = func_info['body_words'] = [split_statement(body_line) for body_line in func_info['body']]
+        # У метода есть локальная переменная self - объект, для которого он вызван
+        declarations = ['self'] if func_info.get('is_method') else []
+        for words in body_words:
+            if len(words) >= 4 and (words[0] in self.valid_types or words[0] in self.classes) and words[2] == '=':
+                declarations.append(words[1])
+
+        layout, slots, frame_types = build_layout(func_info['params'], declarations)
+
+        code = []
+        code_lines = []
+        for body_index, words in enumerate(body_words):
+            instruction = self.decode_statement(words, layout, func_info['return_type'])
+            if instruction is not None:
+                code.append(instruction)
+                code_lines.append(body_index)
+
+        func_info['layout'] = layout
+        func_info['self_slot'] = slots['self'] if func_info.get('is_method') else None
+        func_info['slots'] = slots
+        func_info['frame_types'] = frame_types
+        func_info['code'] = code
+        func_info['code_lines'] = code_lines
+        func_info['memo'] = MemoCache() if self.is_pure_function(func_info) else None
+        return code
+
+    def is_pure_function(self, func_info):
+        """
+        Можно ли кэшировать результаты функции по аргументам:
+        - функция объявлена как pure function (ответственность за чистоту на авторе программы)
+        - или тело только объявляет локальные переменные и возвращает значение,
+          читая лишь параметры и ранее объявленные локальные переменные
+        В обоих случаях все параметры должны быть скалярами, а функция - не void
+        """
+        if func_info['return_type'] == 'void' or func_info.get('is_method'):
+            return False
+        if any(param_type not in MEMO_PARAM_TYPES for param_type in func_info['params'].values()):
+            return False
+        if func_info.get('pure'):
+            return True
+
+        known = set(func_info['params'])
+        for words in func_info['body_words']:
+            if not words:
+                continue
+            if words[0] == 'return':
+                expression = ' '.join(words[1:])
+            elif len(words) >= 4 and words[0] in self.valid_types and words[0] != 'void' and words[2] == '=':
+                expression = ' '.join(words[3:])
+            else:
+                # print, call и прочие инструкции - побочные эффекты
+                return False
+            if not expression_names(expression) <= known:
+                return False
+            if words[0] == 'return':
+                return True
+            known.add(words[1])
+        return True
+
+    def memo_stats(self):
+        """
+        Статистика кэшей чистых функций: имя -> {'hits', 'misses', 'size', 'maxsize'}
+        """
+        return {name: func_info['memo'].stats() for name, func_info in self.functions.items()
+                if func_info.get('memo') is not None}
+
     def parse_function_declaration(self, line):
         """
-        Парсит объявление функции или метода
+        Парсит объявление функции или метода (см. front_end.parse_function_header)
         Формат: function name(param1: type1, param2: type2) -> return_type {
         Пример: function add(x: int, y: int) -> int {
         """
-        # Убираем { в конце если есть
-        line = line.replace('{', '').strip()
-        
-        parts = line.split()
-        if len(parts) < 2:
-            return None
-            
-        keyword = parts[0]  # function или method
-        func_declaration = ' '.join(parts[1:])
-        
-        # Разделяем на имя с параметрами и тип возврата
-        if '->' in func_declaration:
-            func_part, return_type = func_declaration.split('->', 1)
-            return_type = return_type.strip()
-        else:
-            print("Ошибка: не указан тип возвращаемого значения (используйте ->)")
-            return None
-        
-        # Парсим имя функции и параметры
-        paren_pos = func_part.find('(')
-        if paren_pos == -1:
-            print("Ошибка: неправильный формат объявления функции")
-            return None
-            
-        func_name = func_part[:paren_pos].strip()
-        params_str = func_part[paren_pos+1:func_part.rfind(')')].strip()
-        
-        # Парсим параметры
-        params = {}
-        if params_str:
-            param_list = [p.strip() for p in params_str.split(',')]
-            for param in param_list:
-                if ':' not in param:
-                    print(f"Ошибка: параметр '{param}' должен иметь тип (используйте name: type)")
-                    return None
-                param_name, param_type = param.split(':', 1)
-                param_name = param_name.strip()
-                param_type = param_type.strip()
-                
-                if param_type not in self.valid_types:
-                    print(f"Ошибка: неизвестный тип '{param_type}' для параметра '{param_name}'")
-                    return None
-                    
-                params[param_name] = param_type
-        
-        if return_type not in self.valid_types:
-            print(f"Ошибка: неизвестный тип возврата '{return_type}'")
-            return None
-        
-        return {
-            'name': func_name,
-            'params': params,
-            'return_type': return_type,
-            'body': [],
-            'is_method': keyword == 'method'
-        }
-
+        valid_types = self.valid_types + list(self.classes) if self.classes else self.valid_types
+        func_info, error = parse_function_header(line, valid_types)
+        if error is not None:
+            self.output.error(error)
+        return func_info
 
-    def execute_lines(self, lines):
-        # ФАЗА 2: Выполнение основного кода
-        in_function_or_class = False
-        brace_count = 0
+    def execute_lines(self, lines, source_lines=None):
+        """
+        ФАЗА 2: Выполнение основного кода
+        source_lines - строки исходного текста с той же нумерацией (ParsedProgram.source_lines),
+        если lines переписаны оптимизатором: сообщения об ошибках цитируют исходный текст
+        """
+        block_index = self.get_block_index(lines)
 
-        for line_number, line in enumerate(lines, start=1):
-            stripped_line = line.strip()
+        i = 0
+        while i < len(lines):
+            line_number = i + 1
+            stripped_line = lines[i].strip()
 
             if not stripped_line:
+                i += 1
                 continue
 
-            # Отслеживаем скобки для пропуска кода внутри функций/классов
+            # Пропускаем тела функций/классов по индексу блоков
             if '{' in stripped_line:
                 words = stripped_line.split()
-                if words and words[0] in ['function', 'method', 'class']:
-                    in_function_or_class = True
-                    brace_count = 1
+                if words and words[0] in ['function', 'method', 'class', 'pure']:
+                    end_index = block_index.end_of(i)
+                    i = end_index + 1 if end_index != -1 else len(lines)
                     continue
-                elif in_function_or_class:
-                    brace_count += stripped_line.count('{')
-
-            if in_function_or_class:
-                if '}' in stripped_line:
-                    brace_count -= stripped_line.count('}')
-                    if brace_count == 0:
-                        in_function_or_class = False
-                continue
+
+            i += 1
+            self.current_line = line_number
 
             # Выполняем обычные команды
             try:
                 self.execute_line(stripped_line)
             except Exception as e:
-                print(f"\n❌ Ошибка на строке {line_number}: {stripped_line}")
-                print(f"📌 Сообщение об ошибке: {e}\n")
+                if source_lines is not None:
+                    stripped_line = source_lines[line_number - 1].strip()
+                # Заголовок и текст ошибки - одно сообщение: Output.error_count считает ошибки
+                self.output.error(f"\n❌ Ошибка на строке {line_number}: {stripped_line}\n"
+                                  f"📌 Сообщение об ошибке: {e}\n")
                 break  # или continue — зависит от логики
 
-    
-    def parse_class_content(self, class_lines):
+        self.output.flush()
+
+    def execute_stream(self, source):
+        """
+        Потоковое выполнение: source - итератор строк (например, открытый файл)
+        Определения функций и классов регистрируются по мере чтения, когда закрывается
+        их блок, инструкции верхнего уровня выполняются сразу. В памяти хранится только
+        текущее определение, а не весь файл.
+        В отличие от interpretation + execute_lines, функция должна быть определена
+        до первого вызова: определения ниже по файлу еще не прочитаны
+        """
+        line_number = 0
+        block = None    # строки незакрытого определения
+        depth = 0
+
+        for line in source:
+            comment_pos = line.find('//')
+            if comment_pos != -1:
+                line = line[:comment_pos]
+            line = line.rstrip()
+            stripped_line = line.strip()
+            if not stripped_line:
+                continue
+            # Нумерация строк та же, что в interpretation (без пустых строк и комментариев)
+            line_number += 1
+
+            if block is not None:
+                block.append(line)
+                depth += line.count('{') - line.count('}')
+                if depth <= 0:
+                    self.register_block(block)
+                    block = None
+                continue
+
+            if '{' in stripped_line:
+                words = stripped_line.split()
+                if words[0] in ['function', 'method', 'class', 'pure']:
+                    block = [line]
+                    depth = line.count('{') - line.count('}')
+                    if depth <= 0:
+                        self.register_block(block)
+                        block = None
+                    continue
+
+            self.current_line = line_number
+            try:
+                self.execute_line(stripped_line)
+            except Exception as e:
+                self.output.error(f"\n❌ Ошибка на строке {line_number}: {stripped_line}\n"
+                                  f"📌 Сообщение об ошибке: {e}\n")
+                break
+
+        if block is not None:
+            self.output.error("Ошибка: не найдена закрывающая скобка для определения")
+        self.output.flush()
+
+    def register_block(self, block_lines):
+        """
+        Регистрирует определение, прочитанное в потоковом режиме (строки от заголовка
+        до закрывающей скобки включительно); блоки method вне класса пропускаются, как в execute_lines
+        """
+        header = block_lines[0].strip()
+        words = header.split()
+
+        if words[0] == 'class':
+            if len(words) < 2:
+                self.output.error("Ошибка: не указано имя класса")
+                return
+            class_name = words[1]
+            self.current_class = class_name
+            self.classes[class_name] = {'name': class_name, 'methods': {}, 'variables': {}}
+            self.output.trace(f"Найден класс: {class_name}")
+            self.parse_class_content(block_lines[1:-1])
+            self.current_class = None
+            self.check_definitions(self.classes[class_name]['methods'].values())
+
+        elif words[0] == 'function' or words[:2] == ['pure', 'function']:
+            func_info = self.parse_function_declaration(header)
+            if func_info is not None:
+                self.register_function(func_info, block_lines[1:-1])
+                self.check_definitions((func_info,))
+
+    def parse_class_content(self, class_lines, block_index=None):
         """
-        Парсит содержимое класса
+        Парсит содержимое класса: поля (тип имя = значение по умолчанию;) и методы
+        block_index - индекс блоков для class_lines (обычно view общего индекса файла)
         """
+        if block_index is None:
+            block_index = BlockIndex(class_lines)
+
+        class_info = self.classes[self.current_class]
+        fields = []
+
         i = 0
         while i < len(class_lines):
             line = class_lines[i].strip()
@@ -202,9 +583,9 @@ class SimpleInterpreter:
                     continue
                 
                 # Найти конец метода по скобкам
-                end_index = self.find_matching_brace(class_lines, i)
+                end_index = block_index.end_of(i)
                 if end_index == -1:
-                    print("Ошибка: не найдена закрывающая скобка для метода")
+                    self.output.error("Ошибка: не найдена закрывающая скобка для метода")
                     break
                 
                 # Читаем тело метода
@@ -215,210 +596,364 @@ class SimpleInterpreter:
                         method_body.append(body_line)
                 
                 func_info['body'] = method_body
-                self.classes[self.current_class]['methods'][func_info['name']] = func_info
-                print(f"Найден метод {self.current_class}.{func_info['name']}({', '.join([f'{name}: {type_}' for name, type_ in func_info['params'].items()])}) -> {func_info['return_type']}")
+                func_info['class_name'] = self.current_class
+                self.compile_function(func_info)
+                class_info['methods'][func_info['name']] = func_info
+                if self.output.tracing:
+                    self.output.trace(f"Найден метод {self.current_class}.{func_info['name']}({', '.join([f'{name}: {type_}' for name, type_ in func_info['params'].items()])}) -> {func_info['return_type']}")
                 
                 i = end_index + 1
             else:
+                field = self.parse_field_declaration(split_statement(line))
+                if field is not None:
+                    fields.append(field)
                 i += 1
 
-    def evaluate_expression(self, expression_str):
+        self.define_fields(class_info, fields)
+
+    def parse_field_declaration(self, words):
         """
-        Вычисляет выражение и возвращает {'value': val, 'type': type}
+        Поле класса 'тип имя = значение;' -> (имя, тип, выражение значения по умолчанию) или None
         """
-        expression_str = expression_str.strip()
+        if not words or not (words[0] in self.valid_types or words[0] in self.classes) or words[0] == 'void':
+            return None
+        if len(words) < 4 or words[2] != '=':
+            self.output.error(f"Ошибка: поле класса {self.current_class} должно иметь значение по умолчанию "
+                              f"(тип имя = значение)")
+            return None
+        if self.output.tracing:
+            self.output.trace(f"Найдено поле {self.current_class}.{words[1]}: {words[0]}")
+        return words[1], words[0], ' '.join(words[3:])
 
-        # Сначала проверяем, является ли это строковым литералом
-        if expression_str.startswith('"') and expression_str.endswith('"'):
-            return {'value': expression_str[1:-1], 'type': 'string'}
+    def define_fields(self, class_info, fields):
+        """
+        Раскладка полей класса по слотам (см. objects.build_class_layout)
+        Значения по умолчанию вычисляются при создании каждого объекта
+        """
+        defaults = build_class_layout(class_info, fields)
+        class_info['defaults'] = [compile_expression(default) for default in defaults]
+        class_info['field_converts'] = [checked_conversion(field_type) for field_type in class_info['field_types']]
 
-        # Затем разбиваем по пробелам для других случаев
-        parts = expression_str.split()
+    def new_instance(self, class_name, arguments):
+        """
+        Создает объект класса: arguments - значения (значение, тип) первых полей по порядку,
+        остальные поля получают значения по умолчанию
+        Возвращает (объект, имя класса)
+        """
+        class_info = self.classes.get(class_name)
+        if class_info is None:
+            raise NameError(f"Класс '{class_name}' не найден")
+        defaults = class_info['defaults']
+        if len(arguments) > len(defaults):
+            raise TypeError(f"Класс {class_name} имеет {len(defaults)} полей, передано значений: {len(arguments)}")
 
-        if len(parts) == 1:
-            # Простое значение
-            word = parts[0]
+        fields = []
+        for slot, convert in enumerate(class_info['field_converts']):
+            value, value_type = arguments[slot] if slot < len(arguments) else defaults[slot](self)
+            fields.append(convert(value, value_type))
+        return Instance(class_info, fields), class_name
+
+    def evaluate_expression(self, expression_str):
+        """
+        Вычисляет выражение и возвращает {'value': val, 'type': type}
+        Выражение компилируется один раз (см. expression_compiler) и берется из кэша
+        """
+        layout = tuple(self.call_stack[-1].slots) if self.call_stack else ()
+        value, value_type = compile_expression(expression_str, layout)(self)
+        return {'value': value, 'type': value_type}
 
-            # Проверяем является ли это литералом
-            if word.isdigit() or (word.startswith('-') and word[1:].isdigit()):
-                return {'value': int(word), 'type': 'int'}
-            elif word.replace('.', '', 1).replace('-', '', 1).isdigit() and word.count('.') == 1:
-                return {'value': float(word), 'type': 'float'}
-            elif word.lower() in ['true', 'false']:
-                return {'value': word.lower() == 'true', 'type': 'bool'}
-            else:
-                # Это переменная
-                var_info = self.get_variable_info(word)
-                if var_info is None:
-                    raise NameError(f"Переменная '{word}' не найдена")
-                return var_info
-
-        elif len(parts) == 3:
-            # Арифметическое выражение
-            left_info = self.evaluate_expression(parts[0])
-            operator = parts[1]
-            right_info = self.evaluate_expression(parts[2])
-
-            # Проверяем совместимость типов
-            if operator in ['+', '-', '*', '/']:
-                if left_info['type'] in ['int', 'float'] and right_info['type'] in ['int', 'float']:
-                    left_val = left_info['value']
-                    right_val = right_info['value']
-
-                    if operator == '+':
-                        result = left_val + right_val
-                    elif operator == '-':
-                        result = left_val - right_val
-                    elif operator == '*':
-                        result = left_val * right_val
-                    elif operator == '/':
-                        if right_val == 0:
-                            raise ZeroDivisionError("Деление на ноль")
-                        result = left_val / right_val
-                        if isinstance(result, float) and result.is_integer():
-                            result = int(result)
-
-                    result_type = 'float' if isinstance(result, float) else 'int'
-                    return {'value': result, 'type': result_type}
-                else:
-                    raise TypeError(
-                        f"Нельзя применить оператор '{operator}' к типам '{left_info['type']}' и '{right_info['type']}'")
-
-        raise ValueError(f"Не удалось вычислить выражение: '{expression_str}'")
-    
     def execute_line(self, line):
         """
         Выполняет одну строку кода
         """
-        line = line.rstrip(';').strip()  # Убираем ; в конце
-        words = line.split()
-        
-        if not words:
-            return
-        
+        instruction = self.decode_line(line)
+        if instruction is not None:
+            self.execute_instruction(instruction)
+
+    def execute_instruction(self, instruction):
+        """
+        Выполняет одну декодированную инструкцию (см. decode_line)
+        """
+        op = instruction[0]
+
         # Объявление переменной: тип имя = выражение
-        if words[0] in self.valid_types and words[0] != 'void':
-            if len(words) < 4 or words[2] != '=':
-                print(f"Ошибка: неправильный синтаксис объявления переменной")
-                return
-                
-            var_type = words[0]
-            var_name = words[1]
-            expression = ' '.join(words[3:])
-            
+        if op == 'declare':
+            _, var_type, var_name, expression, slot, convert = instruction
+
             # Вычисляем выражение
-            expr_result = self.evaluate_expression(expression)
-            
-            # Проверяем совместимость типов
-            if var_type != expr_result['type']:
-                # Пытаемся преобразовать
-                converted_value = self.convert_to_type(str(expr_result['value']), var_type)
-                if converted_value is None:
-                    return
-                expr_result = {'value': converted_value, 'type': var_type}
-            
-            # Сохраняем переменную
-            if self.call_stack:
-                self.call_stack[-1][var_name] = expr_result
+            value, value_type = expression(self)
+
+            # Преобразование к объявленному типу выбрано заранее (см. check_types)
+            if convert is not None:
+                value = convert(value, value_type)
+
+            # Сохраняем переменную: локальную - в слот кадра, глобальную - в словарь
+            if slot is not None:
+                frame = self.call_stack[-1]
+                frame.values[slot] = value
+                frame.types[slot] = var_type
             else:
-                self.variables[var_name] = expr_result
-                
-            print(f"Создана переменная {var_name}: {var_type} = {expr_result['value']}")
-        
-        elif words[0] == 'print':
+                self.variables[var_name] = {'value': value, 'type': var_type}
+
+            if self.output.tracing:
+                self.output.trace(f"Создана переменная {var_name}: {var_type} = {value}")
+
+        elif op == 'print':
             # Вывод переменной
-            if len(words) < 2:
-                print("Ошибка: не указана переменная для вывода")
-                return
-                
-            var_name = words[1]
-            var_info = self.get_variable_info(var_name)
+            var_name = instruction[1]
+            var_info = instruction[2](self)
             if var_info is not None:
-                print(f"{var_name} ({var_info['type']}): {var_info['value']}")
+                self.output.program(f"{var_name} ({var_info[1]}): {var_info[0]}")
             else:
-                print(f"Ошибка: переменная {var_name} не найдена")
-        
-        elif words[0] == 'call':
-            # Вызов функции
-            func_call = ' '.join(words[1:])
-            result = self.call_function(func_call)
-            if result is not None and result['type'] != 'void':
-                print(f"Функция вернула ({result['type']}): {result['value']}")
-    
+                self.output.error(f"Ошибка: переменная {var_name} не найдена")
+
+        elif op == 'call' or op == 'call_method':
+            # Вызов функции или метода
+            base_depth = len(self.call_stack)
+            if op == 'call':
+                entered = self.enter_function(instruction[1], instruction[2], instruction[3])
+            else:
+                entered = self.enter_method(instruction[1], instruction[2], instruction[3], instruction[4],
+                                            instruction[5])
+            result = self.run_call(base_depth, entered)
+            if result is not None and result[1] != 'void':
+                self.output.program(f"Функция вернула ({result[1]}): {result[0]}")
+
+        elif op == 'set_field':
+            # Присваивание полю: слот и преобразование к типу поля берутся из кэша для класса объекта
+            _, receiver_name, load, field_name, expression, cache = instruction
+            value, value_type = expression(self)
+            instance = receiver_instance(receiver_name, load(self))
+            if cache.cls is not instance.cls:
+                slot, field_type = field_entry(instance.cls, field_name)
+                cache.entry = (slot, instance.cls['field_converts'][slot])
+                cache.cls = instance.cls
+            slot, convert = cache.entry
+            value = instance.fields[slot] = convert(value, value_type)
+
+            if self.output.tracing:
+                self.output.trace(f"Поле {receiver_name}.{field_name} = {value}")
+
+        elif op == 'error':
+            self.output.error(instruction[1])
+
     def call_function(self, func_call_str):
         """
-        Вызывает функцию
+        Вызывает функцию по строке вида name(arg1, arg2)
+        Возвращает {'value': val, 'type': type} или None
         """
-        paren_pos = func_call_str.find('(')
-        if paren_pos == -1:
-            print("Ошибка: неправильный формат вызова функции")
+        layout = tuple(self.call_stack[-1].slots) if self.call_stack else ()
+        instruction = self.decode_call(func_call_str, layout)
+        if instruction[0] == 'error':
+            self.output.error(instruction[1])
             return None
-            
-        func_name = func_call_str[:paren_pos].strip()
-        args_str = func_call_str[paren_pos+1:-1].strip()
-        
-        if args_str:
-            args = [arg.strip() for arg in args_str.split(',')]
-        else:
-            args = []
-        
+        result = self.invoke_function(instruction[1], instruction[2])
+        if result is None:
+            return None
+        return {'value': result[0], 'type': result[1]}
+
+    def invoke_function(self, func_name, args, binding=None):
+        """
+        Вызывает функцию с уже скомпилированными аргументами
+        Возвращает (значение, тип) или None при ошибке вызова
+        """
+        base_depth = len(self.call_stack)
+        return self.run_call(base_depth, self.enter_function(func_name, args, binding))
+
+    def run_call(self, base_depth, entered):
+        """
+        Выполняет вызов, начатый enter_function или enter_method, до возврата на глубину base_depth
+        """
+        if entered.__class__ is not Frame:
+            # Ошибка вызова (None) или результат из кэша чистой функции
+            return entered
+        try:
+            return self.run_frames(base_depth)
+        except Exception:
+            # Снимаем кадры прерванных вызовов
+            while len(self.call_stack) > base_depth:
+                self.leave_function(self.call_stack[-1])
+            raise
+
+    def enter_function(self, func_name, args, binding=None):
+        """
+        Начинает вызов: проверяет функцию и аргументы, создает кадр и кладет его в call_stack
+        Аргументы вычисляются в кадре вызывающей функции
+        binding - (func_info, преобразования аргументов) из проверки типов; используется,
+        только если имя по-прежнему означает ту же функцию
+        Возвращает новый кадр, None при ошибке вызова или (значение, тип),
+        если результат чистой функции для этих аргументов уже есть в кэше
+        """
         if func_name not in self.functions:
-            print(f"Ошибка: функция {func_name} не найдена")
+            self.output.error(f"Ошибка: функция {func_name} не найдена")
             return None
-            
+
         func_info = self.functions[func_name]
-        param_names = list(func_info['params'].keys())
-        
-        if len(args) != len(param_names):
-            print(f"Ошибка: функция {func_name} ожидает {len(param_names)} аргументов, получено {len(args)}")
+        frame = self.new_frame(func_info, args, binding)
+        if frame is None:
             return None
-        
-        # Создаем локальный контекст
-        local_vars = {}
-        
-        # Присваиваем значения параметрам с проверкой типов
-        for i, param_name in enumerate(param_names):
-            param_type = func_info['params'][param_name]
-            arg_info = self.evaluate_expression(args[i])
-            
-            # Проверяем и преобразуем тип если нужно
-            if param_type != arg_info['type']:
-                converted_value = self.convert_to_type(str(arg_info['value']), param_type)
-                if converted_value is None:
-                    return None
-                arg_info = {'value': converted_value, 'type': param_type}
-            
-            local_vars[param_name] = arg_info
-        
-        self.call_stack.append(local_vars)
-        
-        print(f"Вызов функции {func_name} с параметрами: {[(name, info['value']) for name, info in local_vars.items()]}")
-        
-        # Выполняем тело функции
-        return_value = {'value': None, 'type': func_info['return_type']}
-        
-        for body_line in func_info['body']:
-            # ИСПРАВЛЕНИЕ: Убираем точку с запятой из строки перед обработкой
-            body_line = body_line.rstrip(';').strip()
-            words = body_line.split()
-            if words and words[0] == 'return':
-                if len(words) > 1:
-                    expression = ' '.join(words[1:])
-                    expr_result = self.evaluate_expression(expression)
-                    
-                    # Проверяем тип возврата
-                    if func_info['return_type'] != 'void':
-                        if expr_result['type'] != func_info['return_type']:
-                            converted_value = self.convert_to_type(str(expr_result['value']), func_info['return_type'])
-                            if converted_value is not None:
-                                return_value = {'value': converted_value, 'type': func_info['return_type']}
-                            else:
-                                print(f"Ошибка: нельзя вернуть {expr_result['type']} из функции типа {func_info['return_type']}")
-                        else:
-                            return_value = expr_result
-                break
-            else:
-                self.execute_line(body_line)
-        
+
+        memo = func_info.get('memo')
+        if memo is not None:
+            key = tuple(frame.values[:len(func_info['params'])])
+            result = memo.get(key)
+            if result is not None:
+                if self.output.tracing:
+                    self.output.trace(f"Результат {func_name}({', '.join(map(str, key))}) взят из кэша")
+                return result
+            frame.memo_key = key
+
+        self.call_stack.append(frame)
+
+        if self.output.tracing:
+            self.output.trace(f"Вызов функции {func_name} с параметрами: {frame.items()}")
+
+        return frame
+
+    def new_frame(self, func_info, args, binding=None):
+        """
+        Создает кадр вызова функции или метода и вычисляет аргументы в кадре вызывающей функции
+        Возвращает кадр (еще не в call_stack) или None при ошибке вызова
+        """
+
+        # Тело компилируется при регистрации; функции, добавленные вручную, компилируем здесь
+        if func_info.get('code') is None:
+            self.compile_function(func_info)
+
+        param_types = list(func_info['params'].values())
+
+        if len(args) != len(param_types):
+            self.output.error(f"Ошибка: функция {func_info['name']} ожидает {len(param_types)} аргументов, получено {len(args)}")
+            return None
+
+        if self.max_call_depth is not None and len(self.call_stack) >= self.max_call_depth:
+            raise RecursionError(f"Превышена максимальная глубина вызовов ({self.max_call_depth})")
+
+        # Создаем кадр: параметры занимают первые слоты
+        frame = Frame(func_info['slots'], func_info['frame_types'])
+        frame.function = func_info
+        values = frame.values
+
+        if binding is not None and binding[0] is func_info:
+            # Преобразования выбраны проверкой типов, типы при вызове не сравниваются
+            for i, convert in enumerate(binding[1]):
+                value, value_type = args[i](self)
+                values[i] = value if convert is None else convert(value, value_type)
+        else:
+            # Присваиваем значения параметрам с проверкой типов
+            for i, param_type in enumerate(param_types):
+                value, value_type = args[i](self)
+
+                # Проверяем и преобразуем тип если нужно
+                if param_type != value_type:
+                    value = convert_value(value, value_type, param_type)
+
+                values[i] = value
+
+        return frame
+
+    def enter_method(self, receiver_name, load, method_name, args, cache):
+        """
+        Начинает вызов метода объекта (инструкция 'call_method'); метод ищется по классу
+        объекта, пока класс в этом месте вызова не меняется - берется из cache
+        Возвращает новый кадр или None при ошибке вызова
+        """
+        instance = receiver_instance(receiver_name, load(self))
+        class_info = instance.cls
+        if cache.cls is class_info:
+            method_info = cache.entry
+        else:
+            method_info = class_info['methods'].get(method_name)
+            if method_info is None:
+                self.output.error(f"Ошибка: метод {class_info['name']}.{method_name} не найден")
+                return None
+            cache.cls = class_info
+            cache.entry = method_info
+
+        frame = self.new_frame(method_info, args)
+        if frame is None:
+            return None
+        self_slot = method_info['self_slot']
+        frame.values[self_slot] = instance
+        frame.types[self_slot] = class_info['name']
+        self.call_stack.append(frame)
+
+        if self.output.tracing:
+            self.output.trace(f"Вызов метода {class_info['name']}.{method_name} с параметрами: {frame.items()}")
+
+        return frame
+
+    def leave_function(self, frame):
+        """
+        Завершает вызов: снимает кадр с call_stack
+        """
         self.call_stack.pop()
-        return return_value
\ No newline at end of file
+
+    def run_frames(self, base_depth):
+        """
+        Выполняет кадры call_stack выше base_depth без рекурсии Python:
+        вызов внутри тела кладет новый кадр и продолжает цикл, return снимает кадр
+        и возвращается к инструкции вызывающей функции (frame.pc)
+        Возвращает результат функции, кадр которой лежал на глубине base_depth
+        """
+        call_stack = self.call_stack
+        frame = call_stack[-1]
+        code = frame.function['code']
+
+        while True:
+            pc = frame.pc
+            if pc < len(code):
+                instruction = code[pc]
+                frame.pc = pc + 1
+                op = instruction[0]
+
+                if op == 'call' or op == 'call_method':
+                    if op == 'call':
+                        entered = self.enter_function(instruction[1], instruction[2], instruction[3])
+                    else:
+                        entered = self.enter_method(instruction[1], instruction[2], instruction[3], instruction[4],
+                                                    instruction[5])
+                    if entered.__class__ is Frame:
+                        frame = entered
+                        code = frame.function['code']
+                    elif entered is not None and entered[1] != 'void':
+                        # Результат из кэша чистой функции
+                        self.output.program(f"Функция вернула ({entered[1]}): {entered[0]}")
+                    continue
+
+                if op != 'return':
+                    self.execute_instruction(instruction)
+                    continue
+
+                result = self.return_value(frame, instruction[1], instruction[2])
+            else:
+                # Тело закончилось без return
+                result = (None, frame.function['return_type'])
+
+            if frame.memo_key is not None:
+                frame.function['memo'].put(frame.memo_key, result)
+            self.leave_function(frame)
+            if len(call_stack) == base_depth:
+                return result
+
+            # Возвращаемся в вызывающую функцию; call - инструкция, результат выводится сразу
+            frame = call_stack[-1]
+            code = frame.function['code']
+            if result[1] != 'void':
+                self.output.program(f"Функция вернула ({result[1]}): {result[0]}")
+
+    def return_value(self, frame, expression, convert=None):
+        """
+        Вычисляет значение return и приводит его к типу возврата (convert, см. decode_statement)
+        """
+        return_type = frame.function['return_type']
+        if expression is None:
+            return (None, return_type)
+
+        value, value_type = expression(self)
+        if return_type == 'void':
+            return (None, return_type)
+
+        if convert is not None:
+            value = convert(value, value_type)
+        return (value, return_type)
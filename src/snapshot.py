@@ -0,0 +1,128 @@
+import copy
+import io
+import os
+import pickle
+
+from objects import Instance
+from output import Output
+from program_cache import _ProgramPickler
+from simple_interpreter import INTERPRETER_VERSION, SimpleInterpreter
+
+
+class InterpreterSnapshot:
+    """
+    Снимок интерпретатора после загрузки общей части программ (prelude):
+    таблицы функций и классов со скомпилированными телами и глобальные переменные
+    clone() создает готовый интерпретатор за время копирования словарей верхнего уровня:
+    функции и классы не разбираются и не компилируются заново, их описания общие для всех копий
+    (глобальные переменные копируются поверхностно; изменяемы только объекты классов -
+    они копируются для каждой копии, см. copy_variables)
+    """
+
+    def __init__(self, interpreter):
+        self.functions = dict(interpreter.functions)
+        self.classes = dict(interpreter.classes)
+        self.variables = copy_variables(interpreter.variables)
+        self.max_call_depth = interpreter.max_call_depth
+
+    def clone(self, output=None):
+        """
+        Новый интерпретатор в состоянии снимка; функции и классы, объявленные
+        в нем позже, не попадают в снимок и в другие копии
+        """
+        interpreter = SimpleInterpreter(output)
+        interpreter.functions = dict(self.functions)
+        interpreter.classes = dict(self.classes)
+        interpreter.variables = copy_variables(self.variables)
+        interpreter.max_call_depth = self.max_call_depth
+        return interpreter
+
+    def run(self, code, output=None):
+        """
+        Выполняет программу в копии снимка; возвращает использованный интерпретатор
+        """
+        interpreter = self.clone(output)
+        lines = interpreter.interpretation(code)
+        interpreter.execute_lines(lines)
+        return interpreter
+
+    def run_forked(self, code, verbosity="program"):
+        """
+        Выполняет программу в дочернем процессе (os.fork): память с загруженным снимком
+        разделяется с родителем по copy-on-write, изменения дочернего процесса
+        на родителя не влияют. Возвращает вывод программы строкой
+        Только для систем с os.fork (Linux, macOS)
+        """
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            exit_code = 0
+            try:
+                with os.fdopen(write_fd, 'w', encoding='utf-8') as stream:
+                    output = Output(verbosity, stream=stream)
+                    self.run(code, output)
+                    output.flush()
+            except BaseException:
+                exit_code = 1
+            finally:
+                # Без очистки интерпретатора родителя (atexit, буферы stdout)
+                os._exit(exit_code)
+
+        os.close(write_fd)
+        with os.fdopen(read_fd, 'r', encoding='utf-8') as stream:
+            result = stream.read()
+        os.waitpid(pid, 0)
+        return result
+
+    def dumps(self):
+        """
+        Сериализованный снимок (скомпилированные выражения сохраняются рецептами, см. program_cache)
+        """
+        buffer = io.BytesIO()
+        _ProgramPickler(buffer, protocol=pickle.HIGHEST_PROTOCOL).dump({
+            'version': INTERPRETER_VERSION,
+            'functions': self.functions,
+            'classes': self.classes,
+            'variables': self.variables,
+            'max_call_depth': self.max_call_depth,
+        })
+        return buffer.getvalue()
+
+    @classmethod
+    def loads(cls, data):
+        """
+        Восстанавливает снимок из dumps(); ValueError, если он создан другой версией интерпретатора
+        """
+        state = pickle.loads(data)
+        if state.get('version') != INTERPRETER_VERSION:
+            raise ValueError(f"Снимок создан версией интерпретатора {state.get('version')}, "
+                             f"текущая версия {INTERPRETER_VERSION}")
+        snapshot = cls.__new__(cls)
+        snapshot.functions = state['functions']
+        snapshot.classes = state['classes']
+        snapshot.variables = state['variables']
+        snapshot.max_call_depth = state['max_call_depth']
+        return snapshot
+
+
+def copy_variables(variables):
+    """
+    Копия таблицы глобальных переменных: объекты классов (поля изменяются присваиванием)
+    копируются с сохранением общих ссылок между ними, остальные значения общие
+    """
+    memo = {}
+    return {name: {'value': copy.deepcopy(var_info['value'], memo), 'type': var_info['type']}
+            if var_info['value'].__class__ is Instance else var_info
+            for name, var_info in variables.items()}
+
+
+def load_prelude(code, output=None):
+    """
+    Загружает общую часть программ (prelude) и возвращает ее снимок
+    Инструкции верхнего уровня prelude выполняются (например, объявления глобальных констант)
+    """
+    interpreter = SimpleInterpreter(output if output is not None else Output("silent"))
+    lines = interpreter.interpretation(code)
+    interpreter.execute_lines(lines)
+    return InterpreterSnapshot(interpreter)
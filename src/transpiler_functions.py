@@ -1,3 +1,9 @@
+from block_index import BlockIndex
+from front_end import parse_call, parse_function_header, parse_program
+from objects import parse_new
+from program_optimizer import ProgramOptimizer
+
+
 class CodeTranspiler:
     def __init__(self):
         self.variables = {}
@@ -5,29 +11,33 @@ class CodeTranspiler:
         self.classes = {}
         self.generated_code = []
         self.indent_level = 0
+        self.uses_functools = False
 
     def add_line(self, code_line):
         """Добавляет строку с правильными отступами"""
         indent = "    " * self.indent_level
         self.generated_code.append(f"{indent}{code_line}")
 
-    def transpile_to_python(self, your_lang_code):
+    def transpile_to_python(self, your_lang_code, optimize=True):
         """
         Главная функция - транспилирует ваш код в Python
         Возвращает строку с Python кодом
+        optimize - сначала свернуть константы и удалить мертвый код (см. program_optimizer.py)
         """
+        program = parse_program(your_lang_code)
+        if optimize:
+            ProgramOptimizer().optimize_program(program)
+
         self.generated_code = []
+        self.uses_functools = False
 
         # Добавляем заголовок
         self.add_line("# Автоматически сгенерированный Python код")
         self.add_line("# Сгенерировано из вашего языка программирования")
         self.add_line("")
 
-        lines = your_lang_code.strip().split('\n')
-        lines = self.preprocess_lines(lines)
-
         # Фаза 1: Транспиляция функций и классов
-        transpiled_lines = self.transpile_definitions(lines)
+        transpiled_lines = self.transpile_definitions(program)
 
         # Фаза 2: Транспиляция основного кода
         self.add_line("# Основной код")
@@ -46,57 +56,37 @@ class CodeTranspiler:
         self.add_line("if __name__ == '__main__':")
         self.add_line("    main()")
 
-        return '\n'.join(self.generated_code)
-
-    def preprocess_lines(self, lines):
-        """Предобработка - удаление комментариев и пустых строк"""
-        processed_lines = []
-        for line in lines:
-            # Убираем комментарии
-            comment_pos = line.find('//')
-            if comment_pos != -1:
-                line = line[:comment_pos].rstrip()
-
-            # Добавляем только непустые строки
-            if line.strip():
-                processed_lines.append(line)
-
-        return processed_lines
+        # Импорт для кэша чистых функций (pure function)
+        if self.uses_functools:
+            self.generated_code.insert(2, "import functools")
 
-    def transpile_definitions(self, lines):
-        """Транспилирует определения функций и классов"""
-        remaining_lines = []
-        i = 0
-
-        while i < len(lines):
-            line = lines[i].strip()
-            words = line.split()
+        return '\n'.join(self.generated_code)
 
-            if not words:
-                i += 1
+    def transpile_definitions(self, program):
+        """
+        Транспилирует определения функций и классов (front_end.ParsedProgram)
+        Возвращает строки основного кода
+        """
+        lines = program.lines
+        # Имена классов - типы объявлений в функциях, в том числе выше объявления класса
+        for kind, start, end_index in program.definitions:
+            if kind == 'class' and len(program.words[start]) >= 2:
+                self.classes[program.words[start][1]] = {}
+
+        for kind, start, end_index in program.definitions:
+            if end_index == -1:
                 continue
 
             # Транспиляция функций
-            if words[0] == 'function':
-                end_index = self.find_matching_brace(lines, i)
-                if end_index != -1:
-                    self.transpile_function(lines[i:end_index + 1])
-                    i = end_index + 1
-                    continue
+            if kind == 'function':
+                self.transpile_function(lines[start:end_index + 1])
 
             # Транспиляция классов
-            elif words[0] == 'class':
-                end_index = self.find_matching_brace(lines, i)
-                if end_index != -1:
-                    self.transpile_class(lines[i:end_index + 1])
-                    i = end_index + 1
-                    continue
-
-            # Остальные строки для основного кода
-            remaining_lines.append(line)
-            i += 1
+            else:
+                self.transpile_class(lines[start:end_index + 1], program.block_index.view(start))
 
-        return remaining_lines
+        # Остальные строки для основного кода
+        return [lines[index].strip() for index in program.main]
 
     def transpile_function(self, func_lines):
         """Транспилирует функцию в Python"""
@@ -107,6 +97,11 @@ class CodeTranspiler:
         if not func_info:
             return
 
+        # pure function - результаты кэшируются, как в интерпретаторе
+        if func_info['pure']:
+            self.uses_functools = True
+            self.add_line("@functools.lru_cache(maxsize=1024)")
+
         # Генерируем Python функцию
         params_str = ', '.join(func_info['params'].keys())
         self.add_line(f"def {func_info['name']}({params_str}):")
@@ -118,17 +113,16 @@ class CodeTranspiler:
 
         # Транспилируем тело функции
         body_lines = func_lines[1:-1]  # Убираем заголовок и закрывающую скобку
-        if body_lines:
-            for body_line in body_lines:
-                self.transpile_statement(body_line.strip())
-        else:
-            self.add_line("pass")
+        self.transpile_body(body_lines)
 
         self.indent_level -= 1
         self.add_line("")
 
-    def transpile_class(self, class_lines):
+    def transpile_class(self, class_lines, block_index=None):
         """Транспилирует класс в Python"""
+        if block_index is None:
+            block_index = BlockIndex(class_lines)
+
         header = class_lines[0].strip()
         words = header.split()
         class_name = words[1] if len(words) > 1 else "UnknownClass"
@@ -136,13 +130,34 @@ class CodeTranspiler:
         self.add_line(f"class {class_name}:")
         self.indent_level += 1
 
+        # Поля: тип имя = значение по умолчанию; new Point(1, 2) задает первые поля по порядку
+        fields = []
+        i = 1
+        while i < len(class_lines) - 1:
+            words = class_lines[i].strip().rstrip(';').split()
+            if words and words[0] == 'method' and block_index.end_of(i) != -1:
+                i = block_index.end_of(i) + 1
+                continue
+            if len(words) >= 4 and words[2] == '=':
+                fields.append((words[1], self.transpile_expression(' '.join(words[3:]))))
+            i += 1
+        if fields:
+            self.add_line(f"def __init__(self, {', '.join(f'{name}={default}' for name, default in fields)}):")
+            for name, _ in fields:
+                self.add_line(f"    self.{name} = {name}")
+            self.add_line("")
+            field_list = ', '.join(f'{name}={{self.{name}}}' for name, _ in fields)
+            self.add_line("def __str__(self):")
+            self.add_line(f"    return f'{class_name}({field_list})'")
+            self.add_line("")
+
         # Транспилируем методы класса
         i = 1
-        has_methods = False
+        has_methods = bool(fields)
         while i < len(class_lines) - 1:
             line = class_lines[i].strip()
             if line.startswith('method'):
-                end_index = self.find_matching_brace(class_lines, i)
+                end_index = block_index.end_of(i)
                 if end_index != -1:
                     method_lines = class_lines[i:end_index + 1]
                     self.transpile_method(method_lines)
@@ -161,8 +176,8 @@ class CodeTranspiler:
         """Транспилирует метод класса в Python"""
         header = method_lines[0].strip()
 
-        # Парсим заголовок метода (похож на функцию, но добавляем self)
-        func_info = self.parse_function_header(header.replace('method', 'function'))
+        # Парсим заголовок метода (как у функции, но добавляем self)
+        func_info = self.parse_function_header(header)
         if not func_info:
             return
 
@@ -174,15 +189,22 @@ class CodeTranspiler:
 
         # Транспилируем тело метода
         body_lines = method_lines[1:-1]
-        if body_lines:
-            for body_line in body_lines:
-                self.transpile_statement(body_line.strip())
-        else:
-            self.add_line("pass")
+        self.transpile_body(body_lines)
 
         self.indent_level -= 1
         self.add_line("")
 
+    def transpile_body(self, body_lines):
+        """
+        Тело функции или метода; pass, если не сгенерировано ни одной инструкции
+        (пустое тело или только удаленные оптимизатором инструкции ';')
+        """
+        start = len(self.generated_code)
+        for body_line in body_lines:
+            self.transpile_statement(body_line.strip())
+        if all(line.strip().startswith('#') for line in self.generated_code[start:]):
+            self.add_line("pass")
+
     def transpile_main_code(self, lines):
         """Транспилирует основной код программы"""
         if not lines:
@@ -204,7 +226,7 @@ class CodeTranspiler:
             return
 
         # Объявление переменной: тип имя = выражение
-        if words[0] in ['int', 'float', 'string', 'bool']:
+        if words[0] in ['int', 'float', 'string', 'bool', 'int[]', 'float[]'] or words[0] in self.classes:
             self.transpile_variable_declaration(line)
 
         # Команда print
@@ -267,17 +289,10 @@ class CodeTranspiler:
 
     def transpile_function_call(self, line):
         """Транспилирует вызов функции"""
-        func_call = line[5:].strip()  # Убираем 'call '
-        paren_pos = func_call.find('(')
-        if paren_pos != -1:
-            func_name = func_call[:paren_pos]
-            args_str = func_call[paren_pos + 1:-1]
-
-            if args_str.strip():
-                py_args = [self.transpile_expression(arg.strip()) for arg in args_str.split(',')]
-                args_str = ', '.join(py_args)
-            else:
-                args_str = ''
+        call = parse_call(line[5:])  # Убираем 'call '
+        if call is not None:
+            func_name, args = call
+            args_str = ', '.join(self.transpile_expression(arg) for arg in args)
 
             self.add_line(f"func_result = {func_name}({args_str})")
             self.add_line(f"if func_result is not None:")
@@ -311,6 +326,13 @@ class CodeTranspiler:
         if expression.replace('.', '', 1).replace('-', '', 1).isdigit():
             return expression
 
+        # Создание объекта: new Point(1, 2) -> Point(1, 2)
+        parts = expression.split(None, 1)
+        new_call = parse_new(parts) if len(parts) == 2 else None
+        if new_call is not None:
+            class_name, args = new_call
+            return f"{class_name}({', '.join(self.transpile_expression(arg) for arg in args)})"
+
         # Арифметические выражения
         parts = expression.split()
         if len(parts) == 3:
@@ -323,54 +345,13 @@ class CodeTranspiler:
         return expression
 
     def parse_function_header(self, header):
-        """Парсит заголовок функции (упрощенная версия из оригинала)"""
-        header = header.replace('{', '').strip()
-        parts = header.split()
-
-        if len(parts) < 2:
-            return None
-
-        func_declaration = ' '.join(parts[1:])
-
-        if '->' not in func_declaration:
-            return None
-
-        func_part, return_type = func_declaration.split('->', 1)
-        return_type = return_type.strip()
-
-        paren_pos = func_part.find('(')
-        if paren_pos == -1:
-            return None
-
-        func_name = func_part[:paren_pos].strip()
-        params_str = func_part[paren_pos + 1:func_part.rfind(')')].strip()
-
-        params = {}
-        if params_str:
-            param_list = [p.strip() for p in params_str.split(',')]
-            for param in param_list:
-                if ':' in param:
-                    param_name, param_type = param.split(':', 1)
-                    params[param_name.strip()] = param_type.strip()
-
-        return {
-            'name': func_name,
-            'params': params,
-            'return_type': return_type
-        }
+        """Парсит заголовок функции или метода (общий разбор front_end, типы не проверяются)"""
+        func_info, _ = parse_function_header(header)
+        return func_info
 
     def find_matching_brace(self, lines, start_index):
         """Находит соответствующую закрывающую скобку"""
-        brace_count = 0
-        for i in range(start_index, len(lines)):
-            line = lines[i].strip()
-            if '{' in line:
-                brace_count += line.count('{')
-            if '}' in line:
-                brace_count -= line.count('}')
-                if brace_count == 0:
-                    return i
-        return -1
+        return BlockIndex(lines).end_of(start_index)
 
     def save_to_file(self, python_code, filename="generated_code.py"):
         """Сохраняет сгенерированный Python код в файл"""
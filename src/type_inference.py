@@ -0,0 +1,413 @@
+from functools import lru_cache
+
+from front_end import parse_call
+from objects import parse_field, parse_new
+from rope_strings import CONCAT_TYPES, STRING_BUILTINS, is_string_literal
+from typed_arrays import (ARRAY_TYPES, ELEMENT_TYPES, convert_array, parse_array_literal, parse_builtin_call,
+                          parse_subscript, split_words)
+
+NUMERIC_TYPES = ('int', 'float')
+# Встроенные типы значений; остальные типы - имена классов (значения - objects.Instance)
+VALUE_TYPES = {'int', 'float', 'string', 'bool'} | set(ARRAY_TYPES)
+
+# Преобразования, которые всегда завершаются ошибкой (значение любого вида не разберется)
+# Например, str(1.5) и str(2.0) не являются записью int, str(True) - записью числа
+_IMPOSSIBLE = {
+    ('float', 'int'), ('float', 'bool'), ('bool', 'int'), ('bool', 'float'),
+}
+
+
+def convert_to_type(value_str, target_type):
+    """
+    Преобразует строковое значение в нужный тип
+    """
+    try:
+        if target_type == 'int':
+            return int(value_str)
+        elif target_type == 'float':
+            return float(value_str)
+        elif target_type == 'string':
+            # Убираем кавычки если есть
+            if value_str.startswith('"') and value_str.endswith('"'):
+                return value_str[1:-1]
+            return str(value_str)
+        elif target_type == 'bool':
+            if value_str.lower() in ['true', '1']:
+                return True
+            elif value_str.lower() in ['false', '0']:
+                return False
+            else:
+                raise ValueError(f"'{value_str}' не является корректным bool значением")
+        else:
+            raise TypeError(f"Неизвестный тип '{target_type}'")
+    except ValueError as e:
+        if "invalid literal" in str(e) or "could not convert" in str(e):
+            raise ValueError(f"Не удалось преобразовать '{value_str}' в тип '{target_type}'")
+        else:
+            # Перебрасываем наше собственное исключение
+            raise
+
+
+def _bool_from_int(value, value_type):
+    # Как convert_to_type(str(value), 'bool'): допустимы только 1 и 0
+    if value == 1:
+        return True
+    elif value == 0:
+        return False
+    raise ValueError(f"'{value}' не является корректным bool значением")
+
+
+def _object_conversion(source_type, target_type):
+    def convert(value, value_type):
+        raise TypeError(f"Нельзя преобразовать значение типа '{value_type}' в тип '{target_type}'")
+    return convert
+
+
+def _make_conversion(source_type, target_type):
+    if source_type not in VALUE_TYPES or target_type not in VALUE_TYPES:
+        # Объекты не преобразуются: тип объекта должен совпадать с объявленным
+        return _object_conversion(source_type, target_type)
+    if source_type in ARRAY_TYPES or target_type in ARRAY_TYPES:
+        return lambda value, value_type: convert_array(value, value_type, target_type)
+    if target_type == 'string':
+        # str() чисел и bool не содержит кавычек, разбор строки не нужен
+        return lambda value, value_type: str(value)
+    if source_type == 'int' and target_type == 'float':
+        return lambda value, value_type: float(value)
+    if source_type == 'int' and target_type == 'bool':
+        return _bool_from_int
+    if source_type == 'string':
+        # Значение string - str или rope_strings.Rope
+        return lambda value, value_type: convert_to_type(str(value), target_type)
+    # Остальные сочетания (в том числе заведомо невозможные) - разбор записи значения
+    return lambda value, value_type: convert_to_type(str(value), target_type)
+
+
+@lru_cache(maxsize=None)
+def conversion(source_type, target_type):
+    """
+    Функция convert(value, value_type) - прямое преобразование значения типа
+    source_type в target_type без сравнения типов при вызове
+    Числа не преобразуются через строку; результат и ошибки те же, что у convert_to_type(str(value))
+    """
+    convert = _make_conversion(source_type, target_type)
+    convert.compiled_from = (conversion, (source_type, target_type))
+    return convert
+
+
+@lru_cache(maxsize=None)
+def checked_conversion(target_type):
+    """
+    Преобразование к target_type для значения, тип которого известен только при выполнении
+    (например, глобальной переменной): сравнивает типы и выбирает прямое преобразование
+    """
+    def convert(value, value_type):
+        if value_type == target_type:
+            return value
+        return conversion(value_type, target_type)(value, value_type)
+    convert.compiled_from = (checked_conversion, (target_type,))
+    return convert
+
+
+def convert_value(value, value_type, target_type):
+    """
+    Преобразует значение типа value_type в target_type (типы различаются)
+    """
+    return conversion(value_type, target_type)(value, value_type)
+
+
+def conversion_for(static_type, target_type):
+    """
+    Преобразование для инструкции, где тип значения выведен заранее:
+    None - преобразование не нужно, иначе функция convert(value, value_type)
+    static_type None - тип станет известен при выполнении
+    """
+    if static_type is None:
+        return checked_conversion(target_type)
+    if static_type == target_type:
+        return None
+    return conversion(static_type, target_type)
+
+
+def conversion_error(static_type, target_type):
+    """
+    Сообщение, если значение типа static_type никогда не преобразуется в target_type, иначе None
+    """
+    if static_type is None or static_type == target_type:
+        return None
+    if (static_type not in VALUE_TYPES or target_type not in VALUE_TYPES
+            or (static_type in ARRAY_TYPES) != (target_type in ARRAY_TYPES)
+            or (static_type, target_type) in _IMPOSSIBLE):
+        return f"значение типа '{static_type}' нельзя преобразовать в '{target_type}'"
+    return None
+
+
+def _literal_type(word):
+    """
+    Тип числового или логического литерала (правила _compile_word) или None
+    """
+    if word.isdigit() or (word.startswith('-') and word[1:].isdigit()):
+        return 'int'
+    elif word.replace('.', '', 1).replace('-', '', 1).isdigit() and word.count('.') == 1:
+        return 'float'
+    elif word.lower() in ['true', 'false']:
+        return 'bool'
+    return None
+
+
+def _binary_type(op, left_type, right_type):
+    if left_type is None or right_type is None:
+        return None
+    if op == '+' and 'string' in (left_type, right_type):
+        # Конкатенация (rope_strings.concat)
+        return 'string' if left_type in CONCAT_TYPES and right_type in CONCAT_TYPES else None
+    if left_type in NUMERIC_TYPES and right_type in NUMERIC_TYPES:
+        # Деление дает int, если результат целый (см. _compile_binary)
+        if op in ('+', '-', '*'):
+            return 'float' if 'float' in (left_type, right_type) else 'int'
+        return None
+    if op not in ('+', '-', '*', '/'):
+        return None
+    numeric = ('int', 'float', 'int[]', 'float[]')
+    if left_type not in numeric or right_type not in numeric or (
+            left_type not in ARRAY_TYPES and right_type not in ARRAY_TYPES):
+        return None
+    # Правила typed_arrays.binary
+    if op == '/' or 'float' in (left_type, right_type) or 'float[]' in (left_type, right_type):
+        return 'float[]'
+    return 'int[]'
+
+
+def _builtin_type(name, argument_types):
+    if name == 'len':
+        return 'int'
+    elif name == 'range':
+        return 'int[]'
+    elif name == 'zeros':
+        return 'float[]'
+    elif name in STRING_BUILTINS:
+        return 'string'
+    elif name == 'dot':
+        if all(argument_type in ARRAY_TYPES for argument_type in argument_types):
+            return 'float' if 'float[]' in argument_types else 'int'
+        return None
+    # sum, min, max - тип элемента массива
+    return ELEMENT_TYPES.get(argument_types[0]) if argument_types else None
+
+
+def infer_type(expression_str, env, classes=None):
+    """
+    Тип значения выражения, известный до выполнения, или None
+    env - типы переменных в месте вычисления (имя -> тип); имени нет - тип неизвестен
+    classes - таблица классов для типов полей (None - типы полей неизвестны)
+    Если выражение при выполнении завершится ошибкой, тип тоже может быть любым
+    """
+    expression = expression_str.strip()
+    if is_string_literal(expression):
+        return 'string'
+
+    parts = split_words(expression)
+    if len(parts) == 3:
+        return _binary_type(parts[1], infer_type(parts[0], env, classes), infer_type(parts[2], env, classes))
+    new_call = parse_new(parts)
+    if new_call is not None:
+        return new_call[0] if classes is not None and new_call[0] in classes else None
+    if len(parts) != 1:
+        return None
+
+    word = parts[0]
+    items = parse_array_literal(word)
+    if items is not None:
+        item_types = [infer_type(item, env, classes) for item in items]
+        if any(item_type not in NUMERIC_TYPES for item_type in item_types):
+            return None
+        return 'float[]' if 'float' in item_types else 'int[]'
+
+    builtin_call = parse_builtin_call(word)
+    if builtin_call is not None:
+        name, arguments = builtin_call
+        return _builtin_type(name, [infer_type(argument, env, classes) for argument in arguments])
+
+    subscript = parse_subscript(word)
+    if subscript is not None:
+        name, bounds = subscript
+        container_type = env.get(name)
+        if container_type not in ARRAY_TYPES:
+            return None
+        return ELEMENT_TYPES[container_type] if len(bounds) == 1 else container_type
+
+    field = parse_field(word)
+    if field is not None:
+        class_info = classes.get(env.get(field[0])) if classes is not None else None
+        if class_info is None or field[1] not in class_info['field_slots']:
+            return None
+        return class_info['field_types'][class_info['field_slots'][field[1]]]
+
+    literal_type = _literal_type(word)
+    if literal_type is not None:
+        return literal_type
+    return env.get(word)
+
+
+class TypeChecker:
+    """
+    Статическая проверка типов тел функций и основной программы до выполнения:
+    - выводит типы выражений (infer_type) по объявлениям, выполняемым по порядку
+      (в языке нет ветвлений, поэтому тип переменной в каждой инструкции известен)
+    - заменяет преобразования в скомпилированных инструкциях declare, return и call
+      прямыми (conversion) или убирает их, если типы совпадают; проверка типа при
+      выполнении остается только там, где тип неизвестен (глобальные переменные в функциях)
+    - собирает ошибки: преобразования, которые не выполнятся ни для какого значения
+    Глобальные переменные в телах функций не выводятся: функция может быть вызвана
+    до объявления переменной или после ее переобъявления с другим типом
+    Имена классов - тоже типы; типы полей берутся из раскладки класса (objects.build_class_layout)
+    """
+
+    def __init__(self, valid_types, functions, classes=None):
+        self.valid_types = valid_types
+        self.functions = functions
+        self.classes = classes if classes is not None else {}
+        self.errors = []
+        # False - инструкции только специализируются, ошибки уже собраны по исходному тексту
+        self.reporting = True
+
+    def declaration(self, words):
+        """
+        (тип, имя, выражение) для объявления 'тип имя = выражение' или None
+        """
+        if (len(words) >= 4 and (words[0] in self.valid_types or words[0] in self.classes)
+                and words[0] != 'void' and words[2] == '='):
+            return words[0], words[1], ' '.join(words[3:])
+        return None
+
+    def report(self, where, statement, message):
+        if self.reporting:
+            self.errors.append(f"Ошибка типов {where}: {statement} - {message}")
+
+    def check_field_assignment(self, words, env, where, statement):
+        """
+        Присваивание полю 'p.x = выражение': сообщает, если значение не преобразуется в тип поля
+        """
+        receiver_name, field_name = parse_field(words[0])
+        class_info = self.classes.get(env.get(receiver_name))
+        if class_info is None:
+            return
+        slot = class_info['field_slots'].get(field_name)
+        if slot is None:
+            self.report(where, statement, f"у класса {class_info['name']} нет поля '{field_name}'")
+            return
+        message = conversion_error(infer_type(' '.join(words[2:]), env, self.classes), class_info['field_types'][slot])
+        if message is not None:
+            self.report(where, statement, f"поле {field_name}: {message}")
+
+    def call_binding(self, call_str, env, where, statement):
+        """
+        Связывание вызова с функцией: (func_info, преобразования аргументов) или None
+        """
+        call = parse_call(call_str)
+        if call is None:
+            return None
+        func_name, args = call
+        func_info = self.functions.get(func_name)
+        if func_info is None or len(args) != len(func_info['params']):
+            # Ошибка вызова сообщается при выполнении
+            return None
+
+        converters = []
+        for arg, (param_name, param_type) in zip(args, func_info['params'].items()):
+            arg_type = infer_type(arg, env, self.classes)
+            message = conversion_error(arg_type, param_type)
+            if message is not None:
+                self.report(where, statement, f"аргумент {param_name} функции {func_info['name']}: {message}")
+            converters.append(conversion_for(arg_type, param_type))
+        return func_info, tuple(converters)
+
+    def check_function(self, func_info):
+        """
+        Проверяет тело скомпилированной функции и специализирует ее инструкции
+        """
+        where = f"в {'методе' if func_info.get('is_method') else 'функции'} {func_info['name']}"
+        env = dict(func_info['params'])
+        if func_info.get('class_name') is not None:
+            env['self'] = func_info['class_name']
+        source_body = func_info.get('source_body')
+        if source_body is not None:
+            # Тело переписано оптимизатором: ошибки - по исходному тексту, чтобы результат
+            # проверки не зависел от свертки констант (int w = 10 / 4 -> int w = 2.5)
+            source_env = dict(env)
+            for statement, words in zip(source_body, func_info['source_body_words']):
+                self.check_statement(words, source_env, where, statement, func_info['return_type'])
+            self.reporting = False
+        try:
+            self.specialize(func_info, env, where)
+        finally:
+            self.reporting = True
+
+    def specialize(self, func_info, env, where):
+        """
+        Заменяет преобразования в инструкциях declare, return и call по выведенным типам
+        """
+        return_type = func_info['return_type']
+        code = func_info['code']
+        for position, body_index in enumerate(func_info['code_lines']):
+            statement = func_info['body'][body_index]
+            words = func_info['body_words'][body_index]
+            instruction = code[position]
+            op = instruction[0]
+
+            if op == 'declare':
+                var_type, var_name, expression = self.declaration(words)
+                value_type = infer_type(expression, env, self.classes)
+                message = conversion_error(value_type, var_type)
+                if message is not None:
+                    self.report(where, statement, message)
+                code[position] = instruction[:5] + (conversion_for(value_type, var_type),)
+                env[var_name] = var_type
+
+            elif op == 'return' and instruction[1] is not None and return_type != 'void':
+                value_type = infer_type(' '.join(words[1:]), env, self.classes)
+                message = conversion_error(value_type, return_type)
+                if message is not None:
+                    self.report(where, statement, f"тип возврата: {message}")
+                code[position] = ('return', instruction[1], conversion_for(value_type, return_type))
+
+            elif op == 'call':
+                binding = self.call_binding(' '.join(words[1:]), env, where, statement)
+                code[position] = instruction[:3] + (binding,)
+
+            elif op == 'set_field':
+                self.check_field_assignment(words, env, where, statement)
+
+    def check_statement(self, words, env, where, statement, return_type=None):
+        """
+        Собирает ошибки типов инструкции по ее тексту; return_type - тип возврата функции
+        (None для основной программы)
+        """
+        declaration = self.declaration(words)
+        if declaration is not None:
+            var_type, var_name, expression = declaration
+            message = conversion_error(infer_type(expression, env, self.classes), var_type)
+            if message is not None:
+                self.report(where, statement, message)
+            env[var_name] = var_type
+        elif words[0] == 'return' and len(words) > 1 and return_type not in (None, 'void'):
+            message = conversion_error(infer_type(' '.join(words[1:]), env, self.classes), return_type)
+            if message is not None:
+                self.report(where, statement, f"тип возврата: {message}")
+        elif words[0] == 'call':
+            self.call_binding(' '.join(words[1:]), env, where, statement)
+        elif len(words) >= 3 and words[1] == '=' and parse_field(words[0]) is not None:
+            self.check_field_assignment(words, env, where, statement)
+
+    def check_program(self, program):
+        """
+        Проверяет инструкции основной программы (front_end.ParsedProgram); они выполняются
+        построчно, поэтому здесь только собираются ошибки
+        Проверяется исходный текст (source_lines), а не результат ProgramOptimizer
+        """
+        env = {}
+        for index in program.main:
+            words = program.source_words[index]
+            if not words:
+                continue
+            self.check_statement(words, env, f"на строке {index + 1}", program.source_lines[index].strip())
@@ -0,0 +1,350 @@
+from array import array
+from itertools import repeat
+import operator
+
+from rope_strings import STRING_BUILTIN_FUNCTIONS, STRING_BUILTINS, concat, length
+
+try:
+    import numpy
+except ImportError:     # NumPy необязателен: без него массовые операции выполняются через array и map
+    numpy = None
+
+# Типы массивов языка -> код типа array.array
+ARRAY_TYPES = {
+    'int[]': 'q',
+    'float[]': 'd',
+}
+
+# Тип массива -> тип элемента
+ELEMENT_TYPES = {
+    'int[]': 'int',
+    'float[]': 'float',
+}
+
+# Встроенные функции выражений над массивами и строками: имя -> допустимое число аргументов
+BUILTINS = {
+    'sum': (1,),
+    'min': (1,),
+    'max': (1,),
+    'len': (1,),
+    'dot': (2,),
+    'range': (1, 2),
+    'zeros': (1,),
+    **STRING_BUILTINS,
+}
+
+_OPERATORS = {
+    '+': operator.add,
+    '-': operator.sub,
+    '*': operator.mul,
+    '/': operator.truediv,
+}
+
+
+class TypedArray(array):
+    """
+    Значение типа int[] или float[]: array.array с выводом в виде [1, 2, 3]
+    Элементы хранятся в одном непрерывном буфере (int64 или double),
+    поэтому NumPy работает с ними без копирования (numpy.frombuffer)
+    """
+    __slots__ = ()
+
+    @property
+    def array_type(self):
+        return 'int[]' if self.typecode == 'q' else 'float[]'
+
+    def __str__(self):
+        return '[' + ', '.join(map(str, self)) + ']'
+
+    def __repr__(self):
+        return f"{self.array_type} {self}"
+
+
+def make_array(array_type, values=()):
+    return TypedArray(ARRAY_TYPES[array_type], values)
+
+
+def _from_numpy(array_type, result):
+    values = TypedArray(ARRAY_TYPES[array_type])
+    values.frombytes(result.astype(ARRAY_TYPES[array_type], copy=False).tobytes())
+    return values
+
+
+def _view(values):
+    return numpy.frombuffer(values, dtype=values.typecode)
+
+
+def split_words(expression):
+    """
+    Делит выражение на слова по пробелам, не разрывая скобки и строковые литералы:
+    'dot(a, b) + [1, 2]' -> ['dot(a, b)', '+', '[1, 2]'], '"a b" + s' -> ['"a b"', '+', 's']
+    """
+    words = []
+    current = []
+    depth = 0
+    quoted = False
+    for char in expression:
+        if char == '"':
+            quoted = not quoted
+        elif not quoted:
+            if char in '([':
+                depth += 1
+            elif char in ')]':
+                depth -= 1
+        if char.isspace() and depth == 0 and not quoted:
+            if current:
+                words.append(''.join(current))
+                current = []
+        else:
+            current.append(char)
+    if current:
+        words.append(''.join(current))
+    return words
+
+
+def split_arguments(arguments_str):
+    """
+    Делит список аргументов по запятым верхнего уровня: 'dot(a, b), 1' -> ['dot(a, b)', '1']
+    Запятые внутри строковых литералов не разделяют аргументы
+    """
+    arguments = []
+    current = []
+    depth = 0
+    quoted = False
+    for char in arguments_str:
+        if char == '"':
+            quoted = not quoted
+        elif not quoted:
+            if char in '([':
+                depth += 1
+            elif char in ')]':
+                depth -= 1
+        if char == ',' and depth == 0 and not quoted:
+            arguments.append(''.join(current).strip())
+            current = []
+        else:
+            current.append(char)
+    last = ''.join(current).strip()
+    if last or arguments:
+        arguments.append(last)
+    return arguments
+
+
+def parse_array_literal(word):
+    """
+    '[1, 2, x]' -> ['1', '2', 'x'], иначе None
+    """
+    if word.startswith('[') and word.endswith(']'):
+        return split_arguments(word[1:-1])
+    return None
+
+
+def parse_builtin_call(word):
+    """
+    'dot(a, b)' -> ('dot', ['a', 'b']) для встроенных функций, иначе None
+    """
+    paren_pos = word.find('(')
+    if paren_pos <= 0 or not word.endswith(')'):
+        return None
+    name = word[:paren_pos]
+    if name not in BUILTINS:
+        return None
+    return name, split_arguments(word[paren_pos + 1:-1])
+
+
+def parse_subscript(word):
+    """
+    'a[2]' -> ('a', ['2']), 'a[1:3]' -> ('a', ['1', '3']), 'a[:n]' -> ('a', ['', 'n']), иначе None
+    """
+    bracket_pos = word.find('[')
+    if bracket_pos <= 0 or not word.endswith(']'):
+        return None
+    index = word[bracket_pos + 1:-1]
+    bounds = [bound.strip() for bound in index.split(':')] if ':' in index else [index.strip()]
+    if len(bounds) > 2:
+        return None
+    return word[:bracket_pos], bounds
+
+
+def build_array(items):
+    """
+    Литерал массива из вычисленных элементов (значение, тип):
+    float[], если есть хотя бы один float, иначе int[]
+    """
+    array_type = 'int[]'
+    for value, value_type in items:
+        if value_type == 'float':
+            array_type = 'float[]'
+        elif value_type != 'int':
+            raise TypeError(f"Элемент массива должен быть числом, получен '{value_type}'")
+    return make_array(array_type, [value for value, _ in items]), array_type
+
+
+def convert_array(value, value_type, target_type):
+    """
+    Преобразование массива в другой тип массива (одной операцией над буфером)
+    """
+    if value_type not in ARRAY_TYPES or target_type not in ARRAY_TYPES:
+        raise TypeError(f"Нельзя преобразовать '{value_type}' в тип '{target_type}'")
+    if target_type == 'int[]':
+        if numpy is not None:
+            return _from_numpy(target_type, numpy.trunc(_view(value)))
+        return make_array(target_type, map(int, value))
+    return make_array(target_type, value)
+
+
+def binary(op, left, right):
+    """
+    Поэлементная операция над массивами: массив с массивом той же длины
+    или массив с числом. Результат / всегда float[], остальные операции
+    дают float[], если хотя бы один операнд вещественный
+    + со строкой - конкатенация (rope_strings.concat)
+    """
+    left_val, left_type = left
+    right_val, right_type = right
+    if op == '+' and (left_type == 'string' or right_type == 'string'):
+        return concat(left, right)
+    if op not in _OPERATORS or not (
+            (left_type in ARRAY_TYPES or left_type in ELEMENT_TYPES.values()) and
+            (right_type in ARRAY_TYPES or right_type in ELEMENT_TYPES.values()) and
+            (left_type in ARRAY_TYPES or right_type in ARRAY_TYPES)):
+        raise TypeError(f"Нельзя применить оператор '{op}' к типам '{left_type}' и '{right_type}'")
+
+    if op == '/' or 'float' in (left_type, right_type) or 'float[]' in (left_type, right_type):
+        result_type = 'float[]'
+    else:
+        result_type = 'int[]'
+
+    left_is_array = left_type in ARRAY_TYPES
+    right_is_array = right_type in ARRAY_TYPES
+    if left_is_array and right_is_array and len(left_val) != len(right_val):
+        raise ValueError(f"Размеры массивов не совпадают: {len(left_val)} и {len(right_val)}")
+
+    if op == '/':
+        if (0 in right_val) if right_is_array else right_val == 0:
+            raise ZeroDivisionError("Деление на ноль")
+
+    apply = _OPERATORS[op]
+    if numpy is not None:
+        left_operand = _view(left_val) if left_is_array else left_val
+        right_operand = _view(right_val) if right_is_array else right_val
+        return _from_numpy(result_type, apply(left_operand, right_operand)), result_type
+
+    if left_is_array and right_is_array:
+        values = map(apply, left_val, right_val)
+    elif left_is_array:
+        values = map(apply, left_val, repeat(right_val))
+    else:
+        values = map(apply, repeat(left_val), right_val)
+    return make_array(result_type, values), result_type
+
+
+def _require_array(name, argument):
+    value, value_type = argument
+    if value_type not in ARRAY_TYPES:
+        raise TypeError(f"Функция {name} ожидает массив, получен '{value_type}'")
+    return value
+
+
+def _require_int(name, argument):
+    value, value_type = argument
+    if value_type != 'int':
+        raise TypeError(f"Функция {name} ожидает int, получен '{value_type}'")
+    return value
+
+
+def _scalar(value, array_type):
+    # Значения NumPy (numpy.int64, numpy.float64) приводим к числам Python
+    if ELEMENT_TYPES[array_type] == 'int':
+        return int(value), 'int'
+    return float(value), 'float'
+
+
+def builtin_sum(argument):
+    values = _require_array('sum', argument)
+    if numpy is not None:
+        return _scalar(_view(values).sum(), argument[1])
+    return _scalar(sum(values), argument[1])
+
+
+def builtin_min(argument):
+    values = _require_array('min', argument)
+    if not values:
+        raise ValueError("Функция min: пустой массив")
+    return _scalar(_view(values).min() if numpy is not None else min(values), argument[1])
+
+
+def builtin_max(argument):
+    values = _require_array('max', argument)
+    if not values:
+        raise ValueError("Функция max: пустой массив")
+    return _scalar(_view(values).max() if numpy is not None else max(values), argument[1])
+
+
+def builtin_len(argument):
+    if argument[1] == 'string':
+        return length(argument[0]), 'int'
+    return len(_require_array('len', argument)), 'int'
+
+
+def builtin_dot(left, right):
+    left_val = _require_array('dot', left)
+    right_val = _require_array('dot', right)
+    if len(left_val) != len(right_val):
+        raise ValueError(f"Размеры массивов не совпадают: {len(left_val)} и {len(right_val)}")
+    result_type = 'float[]' if 'float[]' in (left[1], right[1]) else 'int[]'
+    if numpy is not None:
+        return _scalar(numpy.dot(_view(left_val), _view(right_val)), result_type)
+    return _scalar(sum(map(operator.mul, left_val, right_val)), result_type)
+
+
+def builtin_range(first, second=None):
+    if second is None:
+        start, stop = 0, _require_int('range', first)
+    else:
+        start, stop = _require_int('range', first), _require_int('range', second)
+    if numpy is not None:
+        return _from_numpy('int[]', numpy.arange(start, stop, dtype='q')), 'int[]'
+    return make_array('int[]', range(start, stop)), 'int[]'
+
+
+def builtin_zeros(argument):
+    size = _require_int('zeros', argument)
+    if size < 0:
+        raise ValueError(f"Функция zeros: отрицательный размер {size}")
+    values = TypedArray('d')
+    values.frombytes(bytes(8 * size))    # нулевые байты - это 0.0 для double
+    return values, 'float[]'
+
+
+def index(container, position):
+    """
+    Элемент массива a[i] (отрицательные индексы - с конца)
+    """
+    values = _require_array('[]', container)
+    i = _require_int('[]', position)
+    if not -len(values) <= i < len(values):
+        raise IndexError(f"Индекс {i} вне массива длины {len(values)}")
+    return values[i], ELEMENT_TYPES[container[1]]
+
+
+def slice_array(container, start, stop):
+    """
+    Срез массива a[i:j]; границы (None, None) означают начало и конец
+    """
+    values = _require_array('[:]', container)
+    start = None if start[1] is None else _require_int('[:]', start)
+    stop = None if stop[1] is None else _require_int('[:]', stop)
+    return TypedArray(values.typecode, values[start:stop]), container[1]
+
+
+BUILTIN_FUNCTIONS = {
+    'sum': builtin_sum,
+    'min': builtin_min,
+    'max': builtin_max,
+    'len': builtin_len,
+    'dot': builtin_dot,
+    'range': builtin_range,
+    'zeros': builtin_zeros,
+    **STRING_BUILTIN_FUNCTIONS,
+}